@@ -0,0 +1,173 @@
+"""Deterministic stand-ins for fbref schedule and match report pages.
+
+The markup follows fbref's: tables carry the same ids and data-stat
+attributes, most match report tables sit inside HTML comments, and Super Lig
+pages have no xG columns and only the basic summary and goalkeeper tables.
+Recorded pages (see record.py) are served instead whenever they exist.
+"""
+import hashlib
+import random
+from datetime import date, timedelta
+from typing import List, Tuple
+
+SUMMARY_ADVANCED = [
+    ('player', 'Player'), ('shirtnumber', '#'), ('nationality', 'Nation'), ('position', 'Pos'),
+    ('age', 'Age'), ('minutes', 'Min'), ('goals', 'Gls'), ('assists', 'Ast'), ('pens_made', 'PK'),
+    ('pens_att', 'PKatt'), ('shots', 'Sh'), ('shots_on_target', 'SoT'), ('cards_yellow', 'CrdY'),
+    ('cards_red', 'CrdR'), ('touches', 'Touches'), ('tackles', 'Tkl'), ('interceptions', 'Int'),
+    ('blocks', 'Blocks'), ('xg', 'xG'), ('npxg', 'npxG'), ('xg_assist', 'xAG'), ('sca', 'SCA'),
+    ('gca', 'GCA'), ('passes_completed', 'Cmp'), ('passes', 'Att'), ('passes_pct', 'Cmp%'),
+    ('progressive_passes', 'PrgP'), ('carries', 'Carries'), ('progressive_carries', 'PrgC'),
+    ('take_ons', 'Att'), ('take_ons_won', 'Succ'),
+]
+SUMMARY_BASIC = [
+    ('player', 'Player'), ('shirtnumber', '#'), ('nationality', 'Nation'), ('position', 'Pos'),
+    ('age', 'Age'), ('minutes', 'Min'), ('goals', 'Gls'), ('assists', 'Ast'), ('pens_made', 'PK'),
+    ('pens_att', 'PKatt'), ('shots', 'Sh'), ('shots_on_target', 'SoT'), ('cards_yellow', 'CrdY'),
+    ('cards_red', 'CrdR'), ('fouls', 'Fls'), ('fouled', 'Fld'), ('offsides', 'Off'), ('crosses', 'Crs'),
+    ('tackles_won', 'TklW'), ('interceptions', 'Int'), ('own_goals', 'OG'), ('pens_won', 'PKwon'),
+    ('pens_conceded', 'PKcon'),
+]
+KEEPER = [
+    ('player', 'Player'), ('nationality', 'Nation'), ('age', 'Age'), ('minutes', 'Min'),
+    ('gk_shots_on_target_against', 'SoTA'), ('gk_goals_against', 'GA'), ('gk_saves', 'Saves'),
+    ('gk_save_pct', 'Save%'), ('gk_psxg', 'PSxG'), ('gk_passes_completed_launched', 'Cmp'),
+    ('gk_passes_launched', 'Att'), ('gk_passes_pct_launched', 'Cmp%'), ('gk_passes', 'Att (GK)'),
+    ('gk_passes_throws', 'Thr'), ('gk_pct_passes_launched', 'Launch%'), ('gk_passes_length_avg', 'AvgLen'),
+    ('gk_goal_kicks', 'Att'), ('gk_pct_goal_kicks_launched', 'Launch%'), ('gk_goal_kick_length_avg', 'AvgLen'),
+    ('gk_crosses', 'Opp'), ('gk_crosses_stopped', 'Stp'), ('gk_crosses_stopped_pct', 'Stp%'),
+    ('gk_def_actions_outside_pen_area', '#OPA'), ('gk_avg_distance_def_actions', 'AvgDist'),
+]
+ADVANCED_KINDS = ['passing', 'passing_types', 'defense', 'possession', 'misc']
+TEXT_STATS = {'player', 'nationality', 'position', 'age'}
+POSITIONS = ['FW', 'LW', 'RW', 'AM', 'CM', 'DM', 'LB', 'CB', 'RB']
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+          'September', 'October', 'November', 'December']
+
+LEAGUES = {
+    'Premier-League': ('9', 20),
+    'Super-Lig': ('26', 18),
+}
+
+
+def has_xg(league: str) -> bool:
+    return league != 'Super-Lig'
+
+
+def match_id(league: str, season: str, number: int) -> str:
+    return hashlib.sha1(f'{league}/{season}/{number}'.encode()).hexdigest()[:8]
+
+
+def fixtures(league: str, season: str, matches: int) -> List[Tuple[str, str, str, date]]:
+    """(match id, home, away, date) of the first `matches` games of a generated season"""
+    _, teams = LEAGUES.get(league, ('0', 20))
+    names = [f'{league.split("-")[0]} Team {i + 1}' for i in range(teams)]
+    rng = random.Random(f'{league}/{season}')
+    start = date(int(season[:4]), 8, 10)
+    result = []
+    for number in range(matches):
+        home, away = rng.sample(names, 2)
+        result.append((match_id(league, season, number), home, away, start + timedelta(days=number // 10 * 7)))
+    return result
+
+
+def match_path(league: str, mid: str, home: str, away: str, day: date) -> str:
+    slug = f'{home}-{away}-{MONTHS[day.month - 1]}-{day.day}-{day.year}-{league}'.replace(' ', '-')
+    return f'/en/matches/{mid}/{slug}'
+
+
+def schedule_page(league: str, season: str, matches: int) -> str:
+    rng = random.Random(f'schedule/{league}/{season}')
+    xg = has_xg(league)
+    rows = []
+    for number, (mid, home, away, day) in enumerate(fixtures(league, season, matches)):
+        if number and number % 10 == 0:
+            rows.append('<tr class="spacer partial_table result_all"><td colspan="14"></td></tr>')
+            rows.append('<tr class="thead"><th>Wk</th></tr>')
+        cells = [
+            f'<th scope="row" class="right" data-stat="gameweek">{number // 10 + 1}</th>',
+            f'<td class="left" data-stat="dayofweek">{day.strftime("%a")}</td>',
+            f'<td class="left" data-stat="date" csk="{day:%Y%m%d}"><a href="/en/matches/{day}">{day}</a></td>',
+            '<td class="right" data-stat="start_time"><span class="venuetime">15:00</span> '
+            '<span class="localtime" data-label="your time"></span></td>',
+            f'<td class="right" data-stat="home_team"><a href="/en/squads/x/{home}-Stats">{home}</a></td>',
+        ]
+        path = match_path(league, mid, home, away, day)
+        if xg:
+            cells.append(f'<td class="center" data-stat="home_xg">{rng.uniform(0.2, 3):.1f}</td>')
+        cells.append(f'<td class="center" data-stat="score"><a href="{path}">'
+                     f'{rng.randint(0, 4)}&ndash;{rng.randint(0, 3)}</a></td>')
+        if xg:
+            cells.append(f'<td class="center" data-stat="away_xg">{rng.uniform(0.2, 3):.1f}</td>')
+        cells += [
+            f'<td class="left" data-stat="away_team"><a href="/en/squads/y/{away}-Stats">{away}</a></td>',
+            f'<td class="right" data-stat="attendance">{rng.randint(5000, 70000):,}</td>',
+            '<td class="left" data-stat="venue">Stadium</td>',
+            '<td class="left" data-stat="referee">Referee</td>',
+            f'<td class="left" data-stat="match_report"><a href="{path}">Match Report</a></td>',
+            '<td class="left iz" data-stat="notes"></td>',
+        ]
+        rows.append('<tr>' + ''.join(cells) + '</tr>')
+    table_id = f'sched_{season}_{LEAGUES.get(league, ("0",))[0]}_1'
+    return (f'<html><head><title>{season} {league} Scores and Fixtures</title></head><body>'
+            f'<div id="content"><div class="table_container"><table id="{table_id}" class="stats_table">'
+            '<thead><tr><th data-stat="gameweek">Wk</th></tr></thead>'
+            f'<tbody>{"".join(rows)}</tbody></table></div></div></body></html>')
+
+
+def _stats_table(table_id: str, columns: List[Tuple[str, str]], players: List[str],
+                 rng: random.Random) -> str:
+    header = ''.join(f'<th data-stat="{stat}">{label}</th>' for stat, label in columns)
+    rows = []
+    for player in players:
+        cells = []
+        for stat, _ in columns:
+            if stat == 'player':
+                cells.append(f'<th scope="row" data-stat="player"><a href="/en/players/{player[:8]}">{player}</a></th>')
+                continue
+            if stat == 'nationality':
+                value = '<a href="/en/country/ENG"><span class="f-i f-eng">eng</span></a> ENG'
+            elif stat == 'position':
+                value = rng.choice(POSITIONS)
+            elif stat == 'age':
+                value = f'{rng.randint(18, 36)}-{rng.randint(0, 364):03d}'
+            elif stat.endswith('pct') or stat.startswith('x') or stat.startswith('npxg') or stat == 'gk_psxg':
+                value = f'{rng.uniform(0, 100 if stat.endswith("pct") else 2):.1f}'
+            else:
+                value = str(rng.randint(0, 90 if stat == 'minutes' else 60))
+            cells.append(f'<td data-stat="{stat}">{value}</td>')
+        rows.append('<tr>' + ''.join(cells) + '</tr>')
+    return (f'<table id="{table_id}" class="stats_table sortable">'
+            f'<thead><tr class="over_header"><th colspan="6"></th><th colspan="8">Performance</th></tr>'
+            f'<tr>{header}</tr></thead><tbody>{"".join(rows)}</tbody>'
+            f'<tfoot><tr><th data-stat="player">{len(players)} Players</th></tr></tfoot></table>')
+
+
+def match_page(path: str) -> str:
+    """Match report for a match path generated above"""
+    rng = random.Random(path)
+    advanced = 'Super-Lig' not in path
+    parts = []
+    for side in range(2):
+        team = hashlib.sha1(f'{path}/{side}'.encode()).hexdigest()[:8]
+        players = [f'Player {team} {i}' for i in range(rng.randint(13, 16))]
+        summary = SUMMARY_ADVANCED if advanced else SUMMARY_BASIC
+        parts.append(f'<div id="all_stats_{team}_summary">'
+                     + _stats_table(f'stats_{team}_summary', summary, players, rng) + '</div>')
+        if advanced:
+            for kind in ADVANCED_KINDS:
+                columns = SUMMARY_ADVANCED[:6] + [(f'{kind}_{i}', f'S{i}') for i in range(20)]
+                parts.append(f'<div id="all_stats_{team}_{kind}"><!--\n'
+                             + _stats_table(f'stats_{team}_{kind}', columns, players, rng) + '\n--></div>')
+        parts.append(f'<div id="all_keeper_stats_{team}"><!--\n'
+                     + _stats_table(f'keeper_stats_{team}', KEEPER, players[:1], rng) + '\n--></div>')
+    if advanced:
+        shots = [('minute', 'Minute'), ('player', 'Player'), ('squad', 'Squad'), ('xg_shot', 'xG'),
+                 ('outcome', 'Outcome'), ('distance', 'Distance')]
+        parts.append('<div id="all_shots_all"><!--\n'
+                     + _stats_table('shots_all', shots, [f'Shooter {i}' for i in range(25)], rng) + '\n--></div>')
+    # Navigation, scorebox and scripts make up most of a real page
+    filler = '<div class="filler">' + 'x' * 200 + '</div>'
+    return ('<html><head><title>Match Report</title>' + '<script>var a=1;</script>' * 50 + '</head><body>'
+            + '<div id="header">' + filler * 200 + '</div><div id="content">'
+            + ''.join(parts) + '</div><div id="footer">' + filler * 100 + '</div></body></html>')
@@ -0,0 +1,199 @@
+"""Benchmark the player stat store against concatenating the player CSVs with pandas.
+
+A synthetic history of player and fixture CSVs is generated first (every
+league of fbref/leagues.py, Super Lig without xG, a squad that turns over
+part of its players each season), then each step runs in a fresh process:
+
+  build   python -m fbref players build over all the CSVs
+  store   open the store, per_90 and team_totals of every player and team,
+          player_rows of one player
+  pandas  read and concatenate the CSVs, then per-90 stats per player and
+          stats per team with groupby
+
+recording seconds per step and the peak resident memory of each process.
+Results are written as JSON:
+
+    python playerstore.py --seasons 8 --output playerstore.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+# The fbref package is imported from the checkout, installed or not
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fbref.datafiles import LEAGUE_NAMES  # noqa: E402
+from fbref.parsers import PLAYER_COLUMNS  # noqa: E402
+from fbref.playerstore import PlayerStore, build, load_season  # noqa: E402
+from corpus import match_id  # noqa: E402
+from run import peak_rss_mb  # noqa: E402
+
+STATS = ['Gls', 'xG', 'xAG']
+OUTFIELD = 16  # starters and substitutes with a row per team and match
+KEEPER_STATS = ['SoTA', 'GA', 'Saves', 'Save%', 'PSxG']
+XG_STATS = ['xG', 'npxG', 'xAG']
+
+
+def season_files(directory: str, league: str, season: int, teams: int, squad: int, turnover: int,
+                 rng: np.random.Generator) -> None:
+    """Write one league season's fixture and player CSVs, a double round robin of teams"""
+    season_name = f'{season}-{season + 1}'
+    names = [f'{league} {i:02d}' for i in range(teams)]
+    pairs = [(home, away) for home in range(teams) for away in range(teams) if home != away]
+    start = date(season, 8, 10)
+    fixtures = pd.DataFrame({
+        'Date': [(start + timedelta(days=7 * (i * 2 * (teams - 1) // len(pairs)))).isoformat()
+                 for i in range(len(pairs))],
+        'Home': [names[home] for home, _ in pairs],
+        'Away': [names[away] for _, away in pairs],
+        'Score': [f'{a}–{b}' for a, b in rng.poisson(1.4, (len(pairs), 2))],
+        'game_id': [match_id(league, season_name, i) for i in range(len(pairs))],
+    })
+    prefix = os.path.join(directory, f'{league.lower()}_{season_name}')
+    fixtures.to_csv(f'{prefix}_fixture_data.csv', index=False)
+
+    # Player k of a team this season; turnover new names a season, so careers span several seasons
+    rows_per_side = OUTFIELD + 1
+    sides = len(pairs) * 2
+    team = np.array([[home, away] for home, away in pairs]).ravel()
+    squad_slot = np.stack([rng.permutation(squad - 1)[:OUTFIELD] + 1 for _ in range(sides)])
+    slots = np.concatenate([squad_slot, np.zeros((sides, 1), dtype=int)], axis=1).ravel()
+    teams_of_rows = np.repeat(team, rows_per_side)
+    player = [f'{names[t]} player {s + turnover * (season - 2000)}' for t, s in zip(teams_of_rows, slots)]
+    keeper = np.tile(np.arange(rows_per_side) == OUTFIELD, sides)
+    count = len(player)
+
+    df = pd.DataFrame(np.nan, index=range(count), columns=PLAYER_COLUMNS)
+    df = df.astype({'Player': object, 'Nation': object, 'Pos': object, 'Age': object, 'game_id': object})
+    df['Player'] = player
+    df['Nation'] = np.where(slots % 3, 'eng ENG', 'fr FRA')
+    df['Age'] = [f'{20 + s % 15}-{s * 7 % 365:03d}' for s in slots]
+    df['#'] = slots + 1
+    df['Min'] = np.where(keeper | (rng.random(count) < 0.7), 90, rng.integers(1, 90, count))
+    df['home'] = np.tile(np.repeat([1, 0], rows_per_side), len(pairs))
+    df['game_id'] = np.repeat(fixtures['game_id'].to_numpy(), 2 * rows_per_side)
+    outfield = ~keeper
+    df.loc[outfield, 'Pos'] = np.array(['FW', 'MF', 'DF'])[slots[outfield] % 3]
+    for column in ('Gls', 'Ast', 'Sh', 'SoT', 'Tkl', 'Int', 'Touches', 'Cmp', 'Att'):
+        df.loc[outfield, column] = rng.poisson(1.0 if column in ('Gls', 'Ast', 'SoT') else 20, outfield.sum())
+    if league != 'Super-Lig':
+        for column in XG_STATS:
+            df.loc[outfield, column] = rng.gamma(0.5, 0.3, outfield.sum()).round(1)
+    for column in KEEPER_STATS:
+        df.loc[keeper, column] = rng.poisson(3, keeper.sum())
+    # The keeper also has a summary row, its keeper row is folded into it by the store
+    keeper_summary = df[keeper].assign(**{column: np.nan for column in KEEPER_STATS}, Pos='GK')
+    pd.concat([df, keeper_summary], ignore_index=True).to_csv(f'{prefix}_player_data.csv', index=False)
+
+
+def generate(directory: str, seasons: int, teams: int, squad: int, turnover: int, seed: int) -> List[str]:
+    rng = np.random.default_rng(seed)
+    for league in LEAGUE_NAMES:
+        for season in range(2024 - seasons, 2024):
+            season_files(directory, league, season, teams, squad, turnover, rng)
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if 'player_data' in name)
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, round(time.perf_counter() - started, 4)
+
+
+def run_child(step: str, data_dir: str, store_dir: str) -> Dict:
+    paths = sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir) if 'player_data' in name)
+    result: Dict = {}
+    if step == 'build':
+        result['rows'], result['build_s'] = timed(build, paths, store_dir)
+    elif step == 'store':
+        store, result['open_s'] = timed(PlayerStore, store_dir)
+        per_90, result['per_90_s'] = timed(store.per_90, STATS)
+        _, result['team_totals_s'] = timed(store.team_totals, STATS)
+        _, result['player_rows_s'] = timed(store.player_rows, per_90['Min'].idxmax())
+        result.update(rows=len(store), players=len(store.players), seasons=len(store.seasons))
+    else:
+        # What the store replaces: every CSV read and merged, then grouped per player and team
+        frames, result['read_s'] = timed(
+            lambda: pd.concat([load_season(path, path.replace('_player_data', '_fixture_data')) for path in paths],
+                              ignore_index=True))
+        started = time.perf_counter()
+        totals = frames.groupby('Player')[['Min', *STATS]].sum(min_count=1)
+        per_90 = totals[STATS].div(totals['Min'], axis=0) * 90
+        frames.groupby('team')[['Min', *STATS]].sum(min_count=1)
+        result['group_s'] = round(time.perf_counter() - started, 4)
+        result['rows'], result['players'] = len(frames), len(per_90)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def in_child(step: str, data_dir: str, store_dir: str) -> Dict:
+    """Run one step in a fresh interpreter so its peak RSS is its own"""
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = os.path.join(tmp, 'result.json')
+        command = [sys.executable, os.path.abspath(__file__), '--child', step, '--data-dir', data_dir,
+                   '--store-dir', store_dir, '--result', result_path]
+        process = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if process.returncode != 0:
+            return {'error': process.stderr.strip().splitlines()[-1] if process.stderr.strip() else 'failed'}
+        with open(result_path) as f:
+            return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the player stat store against pandas over the CSVs.')
+    parser.add_argument('--seasons', type=int, default=8, help='seasons per league (default: %(default)s)')
+    parser.add_argument('--teams', type=int, default=20, help='teams per league (default: %(default)s)')
+    parser.add_argument('--squad', type=int, default=30, help='players per team and season (default: %(default)s)')
+    parser.add_argument('--turnover', type=int, default=10,
+                        help='new players per team and season (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='playerstore_results.json')
+    parser.add_argument('--child', choices=['build', 'store', 'pandas'], help=argparse.SUPPRESS)
+    parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    parser.add_argument('--store-dir', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        result = run_child(args.child, args.data_dir, args.store_dir)
+        with open(args.result, 'w') as f:
+            json.dump(result, f)
+        return 0
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items()
+                   if key not in ('child', 'data_dir', 'store_dir', 'result')},
+    }
+    with tempfile.TemporaryDirectory(prefix='fbref_bench_') as tmp:
+        data_dir = os.path.join(tmp, 'csv')
+        os.makedirs(data_dir)
+        print('Generating CSVs...')
+        paths = generate(data_dir, args.seasons, args.teams, args.squad, args.turnover, args.seed)
+        results['csv_mb'] = round(sum(os.path.getsize(path) for path in paths) / 1024 ** 2, 1)
+        store_dir = os.path.join(tmp, 'fbref_players')
+        for step in ('build', 'store', 'pandas'):
+            results[step] = result = in_child(step, data_dir, store_dir)
+            print(f'{step}: ' + ', '.join(f'{key} {value}' for key, value in result.items()))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
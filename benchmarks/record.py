@@ -0,0 +1,51 @@
+"""Copy pages from the scraper's response cache into a benchmark corpus.
+
+Run a normal scrape of a season first (for example one Premier League season
+and one Super Lig season), then record what it downloaded:
+
+    python record.py --cache ../fbref/.fbref_cache --corpus corpus
+
+stub_server.py and run.py --corpus serve these pages in place of the
+generated ones.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import zlib
+from urllib.parse import urlsplit
+
+
+def record(cache_dir: str, corpus_dir: str, contains: str = '') -> int:
+    db = sqlite3.connect(os.path.join(cache_dir, 'index.db'))
+    saved = 0
+    for url, digest in db.execute('SELECT url, digest FROM entries ORDER BY stored_at'):
+        if contains not in url:
+            continue
+        try:
+            with open(os.path.join(cache_dir, 'objects', digest[:2], digest[2:]), 'rb') as f:
+                text = zlib.decompress(f.read()).decode('utf-8')
+        except (OSError, zlib.error):
+            continue
+        path = os.path.join(corpus_dir, urlsplit(url).path.strip('/') + '.html')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        saved += 1
+    db.close()
+    return saved
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Record cached fbref pages into a benchmark corpus.')
+    parser.add_argument('--cache', default=os.environ.get('FBREF_CACHE_DIR', '.fbref_cache'))
+    parser.add_argument('--corpus', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus'))
+    parser.add_argument('--contains', default='', help='only record URLs containing this text')
+    args = parser.parse_args()
+    saved = record(args.cache, args.corpus, args.contains)
+    print(f'Recorded {saved} pages into {args.corpus}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""Benchmark the three scraping entry points against a local fbref stand-in.
+
+For each entry point (the FBRefScraper class in fbreffull.py and the module
+functions of fbrefscarper.py and fbrefwithgui.py) and each league (Premier
+League with xG, Super Lig without) a full season is scraped from the stub
+server in a fresh process with an empty cache, recording:
+
+  season_seconds  end-to-end time of fixtures + match links + player data
+  pages_per_sec   pages collected per second over that time
+  peak_rss_mb     peak resident memory of the process
+  requests / throttled / mb_served  as seen by the stub server
+
+Parsing is timed separately, offline, in ms per page. Results are written
+as JSON so runs can be compared:
+
+    python run.py --matches 380 --latency 0.2 --error-rate 0.02 --output before.json
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+# The fbref package is imported from the checkout, installed or not
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from stub_server import StubServer  # noqa: E402
+
+ENTRY_POINTS = ['fbreffull', 'fbrefscarper', 'fbrefwithgui']
+BENCH_LEAGUES = {'Premier League': 'Premier-League', 'Super Lig': 'Super-Lig'}
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 ** 2 if sys.platform == 'darwin' else 1024), 1)
+
+
+def use_rate(requests_per_minute: float) -> None:
+    """Give the module level scraping functions the benchmark's request rate"""
+    from fbref import ratecontrol
+    from fbref.fetcher import HostRateLimiter
+
+    ratecontrol._default_controller = ratecontrol.AimdRateController(
+        HostRateLimiter(requests_per_minute), max_rpm=requests_per_minute)
+
+
+def schedule_url(base_url: str, league: str, season: str) -> str:
+    from fbref.leagues import schedule_url
+
+    return schedule_url(league, season, base_url)
+
+
+def scrape_season(entry: str, base_url: str, league: str, season: str,
+                  concurrency: int, requests_per_minute: float) -> Dict:
+    """Scrape one season with an entry point, run inside a fresh process and working directory"""
+    url = schedule_url(base_url, league, season)
+    league_name = BENCH_LEAGUES[league]
+    started = time.perf_counter()
+    if entry in ('fbreffull', 'fbrefwithgui'):
+        from fbref.cache import ResponseCache
+        from fbref.fbreffull import FBRefScraper
+
+        scraper = FBRefScraper(concurrency=concurrency, requests_per_minute=requests_per_minute,
+                               base_url=base_url, cache=ResponseCache('cache'))
+        if entry == 'fbreffull':
+            fixtures = scraper.get_fixture_data(url, league_name, season)
+            scraper.get_player_data(scraper.get_match_links(fixtures), league_name, season)
+        else:
+            # The GUI's jobs are thin wrappers over the scraper
+            module = importlib.import_module(f'fbref.{entry}')
+            fixtures = module.get_fixture_data(scraper, league_name, season)
+            module.player_data(scraper, scraper.get_match_links(fixtures), league_name, season)
+    else:
+        use_rate(requests_per_minute)
+        module = importlib.import_module(f'fbref.{entry}')
+        fixtures = module.get_fixture_data(url, league_name, season)
+        module.player_data(module.get_match_links(fixtures), league_name, season)
+    elapsed = time.perf_counter() - started
+
+    player_csv = f'{league_name.lower()}_{season}_player_data.csv'
+    with open(player_csv + '.done') as f:
+        matches = sum(1 for _ in f)
+    with open(player_csv, encoding='utf-8') as f:
+        rows = sum(1 for _ in f) - 1
+    pages = matches + 1
+    return {
+        'season_seconds': round(elapsed, 3),
+        'pages': pages,
+        'pages_per_sec': round(pages / elapsed, 2),
+        'matches_written': matches,
+        'rows_written': rows,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def time_parsers(base_url: str, season: str, pages: int, repeat: int) -> Dict:
+    """ms per page of the schedule and match report parsers, on pages downloaded once up front"""
+    import pandas as pd
+    import requests
+    from fbref.parsers import extract_match_tables, match_player_rows, match_id_from_url, parse_schedule
+
+    def ms_per_call(func, items) -> float:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for item in items:
+                func(item)
+        return round((time.perf_counter() - started) * 1000 / (repeat * len(items)), 2)
+
+    results = {}
+    for league in BENCH_LEAGUES:
+        schedule = requests.get(schedule_url(base_url, league, season)).text
+        links = parse_schedule(schedule, base_url)['match_url'].dropna().tolist()[:pages]
+        matches = [(requests.get(link).text, match_id_from_url(link)) for link in links]
+        results[league] = {
+            'schedule_kb': round(len(schedule) / 1024, 1),
+            'match_report_kb': round(sum(len(html) for html, _ in matches) / len(matches) / 1024, 1),
+            'parse_schedule_ms': ms_per_call(lambda html: parse_schedule(html, base_url), [schedule]),
+            # What the scrapers did before parse_schedule: every table on the page through read_html
+            'read_html_schedule_ms': ms_per_call(lambda html: pd.read_html(io.StringIO(html)), [schedule]),
+            'extract_match_tables_ms': ms_per_call(lambda page: extract_match_tables(page[0]), matches),
+            'match_player_rows_ms': ms_per_call(lambda page: match_player_rows(*page), matches),
+        }
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+def run_child(args: argparse.Namespace) -> int:
+    os.chdir(tempfile.mkdtemp(prefix='fbref_bench_'))
+    # Scrapers print progress per match, keep it out of the measurements
+    with contextlib.redirect_stdout(io.StringIO()):
+        if args.child == 'parse':
+            result = time_parsers(args.base_url, args.season, args.parse_pages, args.repeat)
+        else:
+            result = scrape_season(args.child, args.base_url, args.league, args.season,
+                                   args.concurrency, args.requests_per_minute)
+    with open(args.result, 'w') as f:
+        json.dump(result, f)
+    return 0
+
+
+def in_child(args: argparse.Namespace, server: StubServer, child: str, league: str = '') -> Dict:
+    """Run one measurement in a fresh interpreter so peak RSS and the cache start from zero"""
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = os.path.join(tmp, 'result.json')
+        env = dict(os.environ, FBREF_CACHE_DIR=os.path.join(tmp, 'cache'))
+        command = [sys.executable, os.path.abspath(__file__), '--child', child, '--base-url', server.base_url,
+                   '--league', league, '--season', args.season, '--result', result_path,
+                   '--concurrency', str(args.concurrency), '--requests-per-minute', str(args.requests_per_minute),
+                   '--parse-pages', str(args.parse_pages), '--repeat', str(args.repeat)]
+        server.reset_counters()
+        process = subprocess.run(command, env=env, stderr=subprocess.PIPE, text=True)
+        if process.returncode != 0:
+            return {'error': process.stderr.strip().splitlines()[-1] if process.stderr.strip() else 'failed'}
+        with open(result_path) as f:
+            result = json.load(f)
+    result.update(requests=server.requests, throttled=server.throttled,
+                  mb_served=round(server.bytes_sent / 1024 ** 2, 2))
+    return result
+
+
+def gui_available() -> bool:
+    try:
+        import PyQt5.QtWidgets  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the scrapers against a local fbref stand-in.')
+    parser.add_argument('--entry-points', nargs='+', choices=ENTRY_POINTS, default=ENTRY_POINTS)
+    parser.add_argument('--season', default='2022-2023')
+    parser.add_argument('--matches', type=int, default=380, help='matches per season (default: %(default)s)')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='seconds added to every response (default: %(default)s)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='share of requests answered with 429 (default: %(default)s)')
+    parser.add_argument('--retry-after', type=int, default=1,
+                        help='Retry-After seconds sent with injected 429s (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests-per-minute', type=float, default=6000,
+                        help='the real site allows 10, the stand-in is only limited by its latency')
+    parser.add_argument('--parse-pages', type=int, default=20, help='match reports timed per league')
+    parser.add_argument('--repeat', type=int, default=3, help='parser timing repetitions')
+    parser.add_argument('--corpus', default=os.path.join(BENCH_DIR, 'corpus'),
+                        help='recorded pages, see record.py (default: %(default)s)')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    parser.add_argument('--league', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return run_child(args)
+
+    server = StubServer(args.matches, args.latency, args.error_rate, args.retry_after,
+                        args.corpus if os.path.isdir(args.corpus) else None).start()
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items()
+                   if key not in ('child', 'base_url', 'league', 'result')},
+        'corpus': 'recorded' if server.corpus_dir else 'generated',
+        'entry_points': {},
+    }
+    try:
+        print('Timing parsers...')
+        results['parsing'] = in_child(args, server, 'parse')
+        for entry in args.entry_points:
+            if entry == 'fbrefwithgui' and not gui_available():
+                results['entry_points'][entry] = {'skipped': 'PyQt5 is not installed'}
+                print(f'{entry}: skipped, PyQt5 is not installed')
+                continue
+            results['entry_points'][entry] = {}
+            for league in BENCH_LEAGUES:
+                result = in_child(args, server, entry, league)
+                results['entry_points'][entry][league] = result
+                if 'error' in result:
+                    print(f'{entry} {league}: error - {result["error"]}')
+                else:
+                    print(f'{entry} {league}: {result["season_seconds"]:.1f}s, {result["pages_per_sec"]:.1f} pages/s, '
+                          f'peak RSS {result["peak_rss_mb"]} MB')
+    finally:
+        server.stop()
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
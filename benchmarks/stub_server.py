@@ -0,0 +1,115 @@
+"""Local HTTP stand-in for fbref with configurable latency and 429 injection."""
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import corpus
+
+SCHEDULE_RE = re.compile(r'^/en/comps/\d+/(\d{4}-\d{4})/schedule/\d{4}-\d{4}-(.+)-Scores-and-Fixtures$')
+
+
+class StubServer:
+    """Serves recorded pages from corpus_dir when present, generated ones otherwise.
+
+    latency is added to every response, and error_rate of the requests are
+    answered with 429 and a Retry-After of retry_after seconds.
+    """
+
+    def __init__(self, matches: int = 380, latency: float = 0.0, error_rate: float = 0.0,
+                 retry_after: int = 1, corpus_dir: Optional[str] = None, seed: int = 0):
+        self.matches = matches
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.corpus_dir = corpus_dir
+        self.requests = 0
+        self.throttled = 0
+        self.bytes_sent = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def page(self, path: str) -> Optional[str]:
+        if self.corpus_dir:
+            recorded = os.path.join(self.corpus_dir, path.strip('/') + '.html')
+            if os.path.exists(recorded):
+                with open(recorded, encoding='utf-8') as f:
+                    return f.read()
+        schedule = SCHEDULE_RE.match(path)
+        if schedule:
+            return corpus.schedule_page(schedule.group(2), schedule.group(1), self.matches)
+        if path.startswith('/en/matches/'):
+            return corpus.match_page(path)
+        return None
+
+    def start(self) -> 'StubServer':
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    throttle = stub._rng.random() < stub.error_rate
+                    stub.throttled += throttle
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if throttle:
+                    self.send_response(429)
+                    self.send_header('Retry-After', str(stub.retry_after))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                page = stub.page(self.path)
+                body = (page or 'Not Found').encode('utf-8')
+                self.send_response(200 if page is not None else 404)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with stub._lock:
+                    stub.bytes_sent += len(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests = self.throttled = self.bytes_sent = 0
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve fbref stand-in pages on localhost.')
+    parser.add_argument('--matches', type=int, default=380)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--corpus', default=None)
+    args = parser.parse_args()
+    server = StubServer(args.matches, args.latency, args.error_rate, corpus_dir=args.corpus).start()
+    print(f'Serving on {server.base_url}, Ctrl+C to stop')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
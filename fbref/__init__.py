@@ -0,0 +1,52 @@
+"""Scraping, storage and analysis of fbref fixtures and player stats.
+
+The modules import each other relative to the package. Every command runs
+through python -m fbref (or the fbref script once installed with
+pip install -e .), and the package is used from code like this:
+
+    import fbref
+
+    scraper = fbref.FBRefScraper()
+    analysis = fbref.analyze_match_data(['all-csv-fixture.csv'])
+
+Names are resolved on first use, importing fbref itself loads neither
+pandas nor requests. python -m fbref runs the command line of cli.py.
+"""
+import importlib
+import os
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+# name -> module it lives in
+_EXPORTS = {
+    'LEAGUES': 'leagues',
+    'league_info': 'leagues',
+    'schedule_url': 'leagues',
+    'season_urls': 'leagues',
+    'FBRefScraper': 'fbreffull',
+    'Fixture': 'fbreffull',
+    'MatchRows': 'fbreffull',
+    'ResponseCache': 'cache',
+    'CrawlManifest': 'manifest',
+    'PageArchive': 'archive',
+    'FootballDatabase': 'database',
+    'PlayerStore': 'playerstore',
+    'load_fixtures': 'fixtures',
+    'Standings': 'standings',
+    'MatchAnalysis': 'fbref_analysis',
+    'analyze_match_data': 'fbref_analysis',
+}
+_MODULES = {name[:-3] for name in os.listdir(_HERE) if name.endswith('.py') and not name.startswith('_')}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    # fbref.crawl works without an explicit import fbref.crawl, like the exported names
+    if name in _MODULES:
+        return importlib.import_module(f'.{name}', __name__)
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
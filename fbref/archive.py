@@ -0,0 +1,335 @@
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows, where only one process may write a file anyway
+    fcntl = None
+
+from .telemetry import url_kind
+
+# Empty turns archiving off
+ARCHIVE_DIR = os.environ.get('FBREF_ARCHIVE_DIR', 'fbref_archive')
+
+# /en/comps/9/2023-2024/schedule/2023-2024-Premier-League-Scores-and-Fixtures
+SCHEDULE_URL_RE = re.compile(r'/en/comps/\d+/(\d{4}-\d{4})/schedule/\d{4}-\d{4}-(.+)-Scores-and-Fixtures')
+# /en/matches/3a6836b4/Burnley-Manchester-City-August-11-2023-Premier-League
+MATCH_URL_RE = re.compile(r'-([A-Z][a-z]+)-(\d{1,2})-(\d{4})-([^/]+)$')
+DEFAULT_TABLES = ('summary', 'keeper')
+# Match reports parsed by one process pool task
+CHUNK_PAGES = 32
+
+
+def describe_url(url: str) -> Tuple[str, Optional[str], Optional[str]]:
+    """Kind, league and season of a schedule or match report URL.
+
+    Match URLs only carry their date, seasons are taken to start in July.
+    """
+    kind = url_kind(url)
+    if kind == 'schedule':
+        match = SCHEDULE_URL_RE.search(url)
+        if match:
+            return kind, match.group(2), match.group(1)
+    elif kind == 'match':
+        match = MATCH_URL_RE.search(url)
+        if match:
+            try:
+                played = datetime.strptime(' '.join(match.groups()[:3]), '%B %d %Y')
+            except ValueError:
+                return kind, match.group(4), None
+            start = played.year if played.month >= 7 else played.year - 1
+            return kind, match.group(4), f'{start}-{start + 1}'
+    return kind, None, None
+
+
+class ArchivedPage(NamedTuple):
+    url: str
+    kind: str
+    league: Optional[str]
+    season: Optional[str]
+    segment: str
+    offset: int
+    length: int
+    fetched_at: float
+
+
+def read_page(root: str, segment: str, offset: int, length: int) -> str:
+    """Text of one archived page; a plain function so process pool workers can call it"""
+    with open(os.path.join(root, segment), 'rb') as f:
+        f.seek(offset)
+        return zlib.decompress(f.read(length)).decode('utf-8')
+
+
+class PageArchive:
+    """Append-only store of every schedule and match report page downloaded.
+
+    Pages are zlib-compressed and appended to one segment file per league and
+    season (segments/<league>/<season>.pages), each record preceded by a
+    header line with its URL, digest, fetch time and length. A SQLite index
+    (index.db) maps URL, league and season to the record's offset. Nothing is
+    ever overwritten: a page that changed is appended again and the newest
+    copy wins, a page that did not change is not stored twice.
+    """
+
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+        os.makedirs(os.path.join(root, 'segments'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, 'index.db'), timeout=30, check_same_thread=False)
+        with self._db:
+            self._db.execute('''CREATE TABLE IF NOT EXISTS pages (
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                league TEXT,
+                season TEXT,
+                segment TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                fetched_at REAL NOT NULL)''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS pages_url ON pages (url, fetched_at)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS pages_season ON pages (league, season, kind)')
+
+    @contextmanager
+    def _locked(self, path: str) -> Iterator[None]:
+        # Workers in other processes append to the same segments
+        if fcntl is None:
+            yield
+            return
+        with open(path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def put(self, url: str, text: str, league: Optional[str] = None, season: Optional[str] = None,
+            fetched_at: Optional[float] = None) -> bool:
+        """Append a downloaded page, returns False if the newest archived copy is the same"""
+        kind, url_league, url_season = describe_url(url)
+        league, season = league or url_league or 'unknown', season or url_season or 'unknown'
+        body = text.encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()
+        fetched_at = fetched_at or time.time()
+        segment = os.path.join('segments', league, f'{season}.pages')
+        path = os.path.join(self.root, segment)
+        with self._lock:
+            row = self._db.execute('SELECT sha256 FROM pages WHERE url = ? ORDER BY fetched_at DESC LIMIT 1',
+                                   (url,)).fetchone()
+            if row is not None and row[0] == digest:
+                return False
+            compressed = zlib.compress(body, 9)
+            header = f'{url}\t{digest}\t{fetched_at!r}\t{len(compressed)}\n'.encode('utf-8')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self._locked(path):
+                with open(path, 'ab') as f:
+                    offset = f.tell() + len(header)
+                    f.write(header + compressed)
+                    f.flush()
+                    os.fsync(f.fileno())
+            # Indexed only once the record is on disk; a crash in between leaves unindexed bytes, nothing torn
+            with self._db:
+                self._db.execute('INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                 (url, kind, league, season, segment, offset, len(compressed), digest, fetched_at))
+        return True
+
+    def latest(self, url: str) -> Optional[ArchivedPage]:
+        with self._lock:
+            row = self._db.execute(
+                '''SELECT url, kind, league, season, segment, start, length, fetched_at FROM pages
+                   WHERE url = ? ORDER BY fetched_at DESC LIMIT 1''', (url,)).fetchone()
+        return ArchivedPage(*row) if row else None
+
+    def read(self, page: ArchivedPage) -> str:
+        return read_page(self.root, page.segment, page.offset, page.length)
+
+    def schedules(self, leagues: Optional[Sequence[str]] = None,
+                  seasons: Optional[Sequence[str]] = None) -> List[ArchivedPage]:
+        """Newest copy of every archived schedule page, by league and season"""
+        with self._lock:
+            rows = self._db.execute(
+                '''SELECT url, kind, league, season, segment, start, length, MAX(fetched_at) FROM pages
+                   WHERE kind = 'schedule' GROUP BY url ORDER BY league, season''').fetchall()
+        pages = [ArchivedPage(*row) for row in rows]
+        return [page for page in pages
+                if (not leagues or page.league.lower() in {league.lower() for league in leagues})
+                and (not seasons or page.season in seasons)]
+
+    def summary(self) -> List[Tuple[str, str, str, int, int]]:
+        """(league, season, kind, distinct pages, compressed bytes) of everything archived"""
+        with self._lock:
+            return self._db.execute(
+                '''SELECT league, season, kind, COUNT(DISTINCT url), SUM(length) FROM pages
+                   GROUP BY league, season, kind ORDER BY league, season, kind''').fetchall()
+
+    def close(self) -> None:
+        self._db.close()
+
+
+_default_archive: Optional[PageArchive] = None
+_default_lock = threading.Lock()
+
+
+def default_archive() -> Optional[PageArchive]:
+    """The process wide archive, None when FBREF_ARCHIVE_DIR is set empty"""
+    global _default_archive
+    if not ARCHIVE_DIR:
+        return None
+    with _default_lock:
+        if _default_archive is None:
+            _default_archive = PageArchive()
+    return _default_archive
+
+
+def archive_page(url: str, text: str, archive: Optional[PageArchive] = None) -> None:
+    """Keep a freshly downloaded schedule or match report page; other pages are not archived"""
+    archive = archive or default_archive()
+    if archive is not None and url_kind(url) in ('schedule', 'match'):
+        archive.put(url, text)
+
+
+def extract_chunk(root: str, pages: List[Tuple[str, str, int, int]],
+                  tables: Sequence[str]) -> List[Tuple[str, object]]:
+    """Player rows of archived match reports (match_id, segment, offset, length).
+
+    Returns (match_id, DataFrame) per page, or (match_id, error message) for
+    reports the parsers reject.
+    """
+    from .parsers import extract_match_tables, match_player_rows
+    import pandas as pd
+
+    results = []
+    for match_id, segment, offset, length in pages:
+        html = read_page(root, segment, offset, length)
+        try:
+            if tuple(tables) == DEFAULT_TABLES:
+                rows = match_player_rows(html, match_id)
+            else:
+                # Every requested table of both teams stacked, like the summary and keeper rows are
+                teams = extract_match_tables(html, tables)
+                if len(teams) != 2 or not all(teams):
+                    raise ValueError('match report has no tables for both teams')
+                rows = pd.concat([pd.concat(list(team.values()), ignore_index=True).assign(home=flag, game_id=match_id)
+                                  for team, flag in zip(teams, (1, 0))], ignore_index=True)
+            results.append((match_id, rows))
+        except (KeyError, ValueError) as e:
+            results.append((match_id, str(e)))
+    return results
+
+
+def reextract(archive: PageArchive, output_dir: str, leagues: Optional[Sequence[str]] = None,
+              seasons: Optional[Sequence[str]] = None, tables: Sequence[str] = DEFAULT_TABLES,
+              workers: Optional[int] = None) -> Dict[str, int]:
+    """Rebuild fixture and player CSVs from archived pages only, parsing match reports on a process pool.
+
+    Files of the league seasons rebuilt are replaced in output_dir; match
+    reports the archive lacks are counted as missing and left out.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    from .parsers import MATCH_ID_RE, PLAYER_COLUMNS, match_id_from_url, parse_schedule, site_root
+    from .writers import PlayerDataWriter
+
+    os.makedirs(output_dir, exist_ok=True)
+    stats = {'seasons': 0, 'matches': 0, 'missing': 0, 'failed': 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for schedule in archive.schedules(leagues, seasons):
+            prefix = os.path.join(output_dir, f'{schedule.league.lower()}_{schedule.season.lower()}')
+            fixtures = parse_schedule(archive.read(schedule), site_root(schedule.url))
+            fixtures['season'] = schedule.season
+            fixtures['game_id'] = fixtures['match_url'].str.extract(MATCH_ID_RE, expand=False)
+            fixtures.to_csv(f'{prefix}_fixture_data.csv', index=False)
+
+            played = fixtures[fixtures['Score'].notna()]['match_url'].dropna().drop_duplicates()
+            pages = []
+            for link in played:
+                page = archive.latest(link)
+                if page is None:
+                    stats['missing'] += 1
+                    continue
+                pages.append((match_id_from_url(link), page.segment, page.offset, page.length))
+
+            # A rebuild starts from empty files, not from what an earlier parser wrote
+            for path in (f'{prefix}_player_data.csv', f'{prefix}_player_data.csv.done'):
+                if os.path.exists(path):
+                    os.remove(path)
+            # Other tables than the default ones take their columns from the first match
+            writer = PlayerDataWriter(f'{prefix}_player_data.csv',
+                                      columns=PLAYER_COLUMNS if tuple(tables) == DEFAULT_TABLES else None,
+                                      labels={'league': schedule.league, 'season': schedule.season})
+            chunks = [pages[i:i + CHUNK_PAGES] for i in range(0, len(pages), CHUNK_PAGES)]
+            for results in pool.map(extract_chunk, [archive.root] * len(chunks), chunks, [tables] * len(chunks)):
+                for match_id, rows in results:
+                    if isinstance(rows, str):
+                        print(f'Error processing tables for match {match_id}: {rows}')
+                        stats['failed'] += 1
+                        continue
+                    writer.write_match(match_id, rows)
+                    stats['matches'] += 1
+            stats['seasons'] += 1
+            print(f'{schedule.league} {schedule.season}: {len(fixtures)} fixtures, '
+                  f'{len(writer.completed)} matches of {len(played)} played')
+    return stats
+
+
+def import_cache(archive: PageArchive, cache_dir: str) -> int:
+    """Archive the schedule and match pages a response cache still holds"""
+    db = sqlite3.connect(os.path.join(cache_dir, 'index.db'))
+    stored = 0
+    for url, digest, stored_at in db.execute('SELECT url, digest, stored_at FROM entries ORDER BY stored_at'):
+        if url_kind(url) not in ('schedule', 'match'):
+            continue
+        try:
+            with open(os.path.join(cache_dir, 'objects', digest[:2], digest[2:]), 'rb') as f:
+                text = zlib.decompress(f.read()).decode('utf-8')
+        except (OSError, zlib.error):
+            continue
+        stored += archive.put(url, text, fetched_at=stored_at)
+    db.close()
+    return stored
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Archive of downloaded fbref pages and offline re-extraction.')
+    parser.add_argument('--archive', default=ARCHIVE_DIR or 'fbref_archive',
+                        help='archive directory (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='pages and bytes archived per league and season')
+    importer = commands.add_parser('import-cache', help='archive the pages of a response cache')
+    importer.add_argument('--cache', default=os.environ.get('FBREF_CACHE_DIR', '.fbref_cache'))
+    rebuild = commands.add_parser('reextract', help='rebuild fixture and player CSVs from the archive, offline')
+    rebuild.add_argument('--output-dir', default='reextracted', help='where the CSVs go (default: %(default)s)')
+    rebuild.add_argument('--leagues', nargs='*', help='league URL names, e.g. Premier-League (default: all)')
+    rebuild.add_argument('--seasons', nargs='*', help='e.g. 2023-2024 (default: all)')
+    rebuild.add_argument('--tables', nargs='+', default=list(DEFAULT_TABLES),
+                         help='match report tables per team, e.g. summary keeper passing (default: %(default)s)')
+    rebuild.add_argument('--workers', type=int, default=None, help='parser processes (default: one per CPU)')
+    args = parser.parse_args(argv)
+
+    archive = PageArchive(args.archive)
+    if args.command == 'list':
+        for league, season, kind, pages, size in archive.summary():
+            print(f'{league:<16} {season:<10} {kind:<9} {pages:>6} pages {size / 1024 ** 2:>8.1f} MB')
+    elif args.command == 'import-cache':
+        print(f'Archived {import_cache(archive, args.cache)} pages from {args.cache}')
+    else:
+        started = time.perf_counter()
+        stats = reextract(archive, args.output_dir, args.leagues, args.seasons, args.tables, args.workers)
+        print(f'Rebuilt {stats["seasons"]} seasons, {stats["matches"]} matches in '
+              f'{time.perf_counter() - started:.1f}s ({stats["missing"]} not archived, {stats["failed"]} failed)')
+    archive.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date, datetime
+from typing import Dict, Optional
+
+from .archive import archive_page
+from .telemetry import default_metrics, url_kind
+
+CACHE_DIR = os.environ.get('FBREF_CACHE_DIR', '.fbref_cache')
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+# TTLs per URL class, in seconds (None means the page never changes)
+RECENT_MATCH_TTL = 60 * 60
+CURRENT_SCHEDULE_TTL = 6 * 60 * 60
+DEFAULT_TTL = 24 * 60 * 60
+
+MATCH_DATE_RE = re.compile(r'-([A-Z][a-z]+)-(\d{1,2})-(\d{4})-')
+SEASON_RE = re.compile(r'/(\d{4})-(\d{4})/')
+
+
+def season_is_closed(end_year: int, today: Optional[date] = None) -> bool:
+    """Seasons finish by the end of June, so from July on the season ending that year is closed"""
+    today = today or date.today()
+    return end_year < today.year or (end_year == today.year and today.month >= 7)
+
+
+def ttl_for(url: str, today: Optional[date] = None) -> Optional[float]:
+    """How long a cached copy of url stays fresh"""
+    today = today or date.today()
+    if '/en/matches/' in url:
+        # Match URLs end in e.g. ...-August-11-2023-Premier-League, reports of
+        # games older than a week are final
+        match = MATCH_DATE_RE.search(url)
+        if match:
+            try:
+                played = datetime.strptime(' '.join(match.groups()), '%B %d %Y').date()
+            except ValueError:
+                return DEFAULT_TTL
+            return None if (today - played).days > 7 else RECENT_MATCH_TTL
+        return DEFAULT_TTL
+    season = SEASON_RE.search(url)
+    if season:
+        return None if season_is_closed(int(season.group(2)), today) else CURRENT_SCHEDULE_TTL
+    return DEFAULT_TTL
+
+
+class ResponseCache:
+    """Compressed, content-addressed page cache with per-URL TTLs and LRU eviction.
+
+    Page bodies are stored once per sha256 digest under objects/, and a small
+    SQLite index maps each URL to its digest together with the time it was
+    stored and last read.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, 'index.db'), timeout=30,
+                                   check_same_thread=False)
+        with self._db:
+            self._db.execute('''CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY, digest TEXT NOT NULL,
+                stored_at REAL NOT NULL, accessed_at REAL NOT NULL)''')
+            self._db.execute('''CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY, size INTEGER NOT NULL)''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)')
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest[2:])
+
+    def get(self, url: str) -> Optional[str]:
+        """Return the cached page for url, or None if it is missing or stale"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT digest, stored_at FROM entries WHERE url = ?', (url,)).fetchone()
+            ttl = ttl_for(url)
+            if row is None or (ttl is not None and now - row[1] > ttl):
+                self.misses += 1
+                default_metrics().inc('fbref_cache_requests_total', kind=url_kind(url), result='miss')
+                return None
+            try:
+                with open(self._blob_path(row[0]), 'rb') as f:
+                    text = zlib.decompress(f.read()).decode('utf-8')
+            except (OSError, zlib.error):
+                self.misses += 1
+                default_metrics().inc('fbref_cache_requests_total', kind=url_kind(url), result='miss')
+                return None
+            with self._db:
+                self._db.execute('UPDATE entries SET accessed_at = ? WHERE url = ?', (now, url))
+            self.hits += 1
+            default_metrics().inc('fbref_cache_requests_total', kind=url_kind(url), result='hit')
+            return text
+
+    def is_fresh(self, url: str) -> bool:
+        """Whether a fresh copy of url is cached, checked on the index alone"""
+        with self._lock:
+            row = self._db.execute('SELECT stored_at FROM entries WHERE url = ?', (url,)).fetchone()
+        ttl = ttl_for(url)
+        return row is not None and (ttl is None or time.time() - row[0] <= ttl)
+
+    def put(self, url: str, text: str) -> None:
+        """Store a freshly downloaded page"""
+        body = text.encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        now = time.time()
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                compressed = zlib.compress(body, 6)
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp_path, path)
+                with self._db:
+                    self._db.execute('INSERT OR REPLACE INTO blobs VALUES (?, ?)',
+                                     (digest, len(compressed)))
+            old = self._db.execute('SELECT digest FROM entries WHERE url = ?', (url,)).fetchone()
+            with self._db:
+                self._db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                                 (url, digest, now, now))
+            # A page that changed leaves its previous blob behind
+            if old and old[0] != digest:
+                self._release(old[0])
+            self._evict()
+
+    def invalidate(self, url: str) -> None:
+        """Forget the cached copy of url so the next request downloads it again"""
+        with self._lock:
+            row = self._db.execute('SELECT digest FROM entries WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                return
+            with self._db:
+                self._db.execute('DELETE FROM entries WHERE url = ?', (url,))
+            self._release(row[0])
+
+    def _release(self, digest: str) -> int:
+        """Delete the blob of digest once no entry points at it, returns the bytes freed"""
+        with self._db:
+            shared = self._db.execute(
+                'SELECT 1 FROM entries WHERE digest = ? LIMIT 1', (digest,)).fetchone()
+            if shared:
+                return 0
+            size = self._db.execute(
+                'SELECT size FROM blobs WHERE digest = ?', (digest,)).fetchone()
+            self._db.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+        try:
+            os.remove(self._blob_path(digest))
+        except OSError:
+            pass
+        return size[0] if size else 0
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache is back under max_bytes"""
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for url, digest in self._db.execute(
+                'SELECT url, digest FROM entries ORDER BY accessed_at').fetchall():
+            if total <= target:
+                break
+            with self._db:
+                self._db.execute('DELETE FROM entries WHERE url = ?', (url,))
+            total -= self._release(digest)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, size = self._db.execute(
+                'SELECT COUNT(*), (SELECT COALESCE(SUM(size), 0) FROM blobs) FROM entries').fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'bytes': size}
+
+    def report(self) -> str:
+        stats = self.stats()
+        return (f"Cache: {stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['entries']} pages ({stats['bytes'] / 1024 ** 2:.1f} MB)")
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> ResponseCache:
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+    return _default_cache
+
+
+def cached_get(url: str, headers: Optional[Dict[str, str]] = None,
+               cache: Optional[ResponseCache] = None, timeout: float = 30) -> str:
+    """requests.get(url).text, served from the response cache when it is fresh.
+
+    Downloads are paced by the process wide adaptive rate controller.
+    """
+    cache = cache or default_cache()
+    text = cache.get(url)
+    if text is None:
+        # requests is only imported once something has to be downloaded
+        from .ratecontrol import default_controller, default_session
+
+        response = default_controller().get(default_session(), url,
+                                            headers=headers or DEFAULT_HEADERS, timeout=timeout)
+        text = response.text
+        cache.put(url, text)
+        archive_page(url, text)
+    return text
@@ -0,0 +1,41 @@
+import argparse
+import importlib
+import sys
+from typing import List, Optional
+
+# command -> (module whose main(argv) runs it, help); a module is only imported when its command runs,
+# so --help and runs with nothing to do never load pandas, requests, lxml or Qt
+COMMANDS = {
+    'scrape': ('fbreffull', 'scrape leagues and seasons picked at prompts'),
+    'scrape-summary': ('fbrefscarper', 'scrape the player summary of one league season picked at prompts'),
+    'crawl': ('crawl', 'crawl fixtures and player stats without prompts, resuming from the manifest'),
+    'workers': ('workers', 'spread a crawl over several worker processes or machines'),
+    'archive': ('archive', 'list archived pages, import the cache or re-extract CSVs offline'),
+    'db': ('database', 'upsert CSVs into the SQLite database or look up a player'),
+    'store': ('store', 'store CSVs in the Parquet dataset'),
+    'players': ('playerstore', 'pack player CSVs into memory-mapped arrays and aggregate them'),
+    'standings': ('standings', 'print the table of a season\'s fixture CSV'),
+    'simulate': ('simulate', 'simulate the rest of a season'),
+    'combine': ('csvcombine', 'combine fixture CSVs into one file'),
+    'reprocess': ('reprocesfiles', 'bring fixture files of any league to the same columns'),
+    'gui': ('fbrefwithgui', 'open the scraping window'),
+}
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog=prog, description='fbref scraping, storage and analysis commands.',
+                                     epilog='Run a command with --help for its options.')
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND', required=True)
+    for name, (_, help) in COMMANDS.items():
+        # Every option after the command is the command's own, help included
+        commands.add_parser(name, help=help, add_help=False, prefix_chars='\0')
+    args, rest = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+
+    module = importlib.import_module(f'.{COMMANDS[args.command][0]}', __package__)
+    # The command's parser names itself after argv[0] in usage and errors
+    sys.argv = [f'{parser.prog} {args.command}'] + rest
+    return module.main(rest) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import argparse
+import os
+import sys
+from typing import TYPE_CHECKING, List, Optional
+
+from .cache import ResponseCache, default_cache, season_is_closed
+from .leagues import END_SEASON, LEAGUES, REQUESTS_PER_MINUTE, START_SEASON, data_path, season_urls
+from .manifest import CrawlManifest
+from .telemetry import MetricsExporter, default_metrics
+
+# pandas, requests and lxml come with the scraper; a run with nothing to do never imports them
+if TYPE_CHECKING:
+    from .fbreffull import FBRefScraper
+
+
+def crawl_schedule(scraper: 'FBRefScraper', manifest: CrawlManifest, url: str, league: str,
+                   season: str, max_attempts: int, refresh: bool = False) -> bool:
+    """Fetch a season's schedule page and register its matches, unless that already happened.
+
+    With refresh the schedule is downloaded again even if it was written
+    before: matches played since are registered, and matches whose score
+    changed are queued to be fetched and written again.
+    """
+    manifest.add_schedule(url, league, season)
+    if refresh and not scraper.cache.is_fresh(url):
+        # A schedule downloaded within its TTL cannot tell anything new yet
+        manifest.reset([url])
+    unit = manifest.get(url)
+    if unit['state'] == 'written':
+        return True
+    if unit['attempts'] >= max_attempts:
+        print(f'Giving up on schedule of {league} {season}: {unit["last_error"]}')
+        return False
+
+    import pandas as pd
+
+    filename = data_path(league, season, 'fixture')
+    previous = None
+    if refresh and os.path.exists(filename):
+        previous = pd.read_csv(filename, dtype={'game_id': str})
+
+    manifest.begin(url)
+    try:
+        html_content = scraper._make_request(url, fresh=refresh)
+        manifest.mark(url, 'fetched')
+        fixtures = scraper.parse_fixtures(html_content, season)
+        manifest.mark(url, 'parsed')
+        scraper.save_fixtures(fixtures, league, season)
+    except Exception as e:
+        print(f'Error collecting fixture data for {league} {season}: {str(e)}')
+        manifest.mark(url, 'failed', str(e))
+        return False
+
+    played = fixtures[fixtures['Score'].notna() & fixtures['match_url'].notna()]
+    played = played.drop_duplicates('match_url')
+    manifest.add_matches(url, league, season, zip(played['match_url'], played['game_id']))
+
+    if previous is not None and 'game_id' in previous.columns:
+        old_scores = previous.dropna(subset=['game_id', 'Score']).set_index('game_id')['Score']
+        old_scores = old_scores[~old_scores.index.duplicated()]
+        compared = played[played['game_id'].isin(old_scores.index)]
+        changed = compared[compared['Score'].values != old_scores.loc[compared['game_id']].values]
+        if not changed.empty:
+            print(f'{len(changed)} score changes in {league} {season}, refetching those matches')
+            for match_url in changed['match_url']:
+                scraper.cache.invalidate(match_url)
+            scraper.player_writer(league, season).discard(set(changed['game_id']))
+            manifest.reset(changed['match_url'])
+    manifest.mark(url, 'written')
+    return True
+
+
+def crawl_matches(scraper: 'FBRefScraper', manifest: CrawlManifest, league: str, season: str,
+                  max_attempts: int) -> None:
+    """Fetch, parse and write every match of a season that is not written yet"""
+    writer = scraper.player_writer(league, season)
+    todo = {row['url']: row for row in manifest.todo('match', league, season, max_attempts)}
+
+    # Matches the writer committed before the manifest heard about it need no new request
+    done = [url for url, row in todo.items() if row['match_id'] in writer.completed]
+    manifest.mark_many(done, 'written')
+    for url in done:
+        del todo[url]
+    if not todo:
+        return
+
+    print(f'Getting player data for {league} {season}: {len(todo)} matches to go')
+    unflushed: List[str] = []
+    for count, (link, html_content, error) in enumerate(scraper.fetcher.iter_fetch(todo), 1):
+        manifest.begin(link)
+        if error is not None:
+            print(f'Error processing match {link}: {str(error)}')
+            manifest.mark(link, 'failed', str(error))
+            continue
+        manifest.mark(link, 'fetched')
+        try:
+            rows = scraper.parse_match(html_content, todo[link]['match_id'])
+        except (KeyError, ValueError) as e:
+            print(f'Error processing tables for match {link}: {str(e)}')
+            manifest.mark(link, 'failed', str(e))
+            continue
+        manifest.mark(link, 'parsed')
+        writer.write_match(todo[link]['match_id'], rows)
+        if scraper.database is None:
+            manifest.mark(link, 'written')
+        else:
+            # A match only counts as written once the database batch holding it is flushed
+            unflushed.append(link)
+            if scraper.database.add_match(rows, league, season):
+                manifest.mark_many(unflushed, 'written')
+                unflushed = []
+        print(f'Progress: {count}/{len(todo)} matches collected')
+    if scraper.database is not None:
+        scraper.database.flush()
+        manifest.mark_many(unflushed, 'written')
+
+
+def store_season(scraper: 'FBRefScraper', league: str, season: str, store_dir: str) -> None:
+    """Copy a season's fixture and player CSVs into the Parquet store, replacing what it held for it"""
+    # pyarrow is only needed by crawls that use the store
+    from .store import import_files
+
+    paths = [data_path(league, season, 'fixture'), scraper.player_writer(league, season).path]
+    import_files([path for path in paths if os.path.exists(path)], store_dir, league)
+
+
+def refresh_season(season: str, incremental: bool) -> bool:
+    # Only seasons still being played can have new matches or corrected scores
+    return incremental and not season_is_closed(int(season.split('-')[1]))
+
+
+def has_work(manifest: CrawlManifest, cache: ResponseCache, leagues: List[str], start_season: int,
+             end_season: int, max_attempts: int, incremental: bool = False) -> bool:
+    """Whether a crawl would do anything, answered from the manifest and the cache index alone"""
+    for league in leagues:
+        for url, league_name, season in season_urls(league, start_season, end_season):
+            unit = manifest.get(url)
+            if unit is None:
+                return True
+            if unit['state'] != 'written':
+                if unit['attempts'] < max_attempts:
+                    return True
+            elif refresh_season(season, incremental) and not cache.is_fresh(url):
+                return True
+            elif manifest.todo('match', league_name, season, max_attempts):
+                return True
+    return False
+
+
+def run(scraper: 'FBRefScraper', manifest: CrawlManifest, leagues: List[str], start_season: int,
+        end_season: int, max_attempts: int, incremental: bool = False,
+        store_dir: Optional[str] = None) -> None:
+    for league in leagues:
+        for url, league_name, season in scraper.season_urls(league, start_season, end_season):
+            print(f'\nProcessing {league_name} for season {season}')
+            refresh = refresh_season(season, incremental)
+            if crawl_schedule(scraper, manifest, url, league_name, season, max_attempts, refresh):
+                crawl_matches(scraper, manifest, league_name, season, max_attempts)
+                if store_dir:
+                    store_season(scraper, league_name, season, store_dir)
+
+
+def print_status(manifest: CrawlManifest) -> None:
+    for kind, states in sorted(manifest.counts().items()):
+        summary = ', '.join(f'{state}: {count}' for state, count in sorted(states.items()))
+        print(f'{kind}: {summary}')
+
+
+def exit_code(manifest: CrawlManifest) -> int:
+    """1 if some unit is left failed, closes the manifest"""
+    failed = any('failed' in states for states in manifest.counts().values())
+    manifest.close()
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Crawl fbref fixtures and player stats without prompts, resuming from the manifest.')
+    parser.add_argument('--leagues', nargs='+', choices=list(LEAGUES),
+                        default=list(LEAGUES), metavar='LEAGUE',
+                        help=f'leagues to crawl (default: all of {", ".join(LEAGUES)})')
+    parser.add_argument('--start-season', type=int, default=START_SEASON,
+                        help='first season by starting year (default: %(default)s)')
+    parser.add_argument('--end-season', type=int, default=END_SEASON,
+                        help='last season by starting year (default: %(default)s)')
+    parser.add_argument('--manifest', default='crawl_manifest.db',
+                        help='SQLite crawl manifest (default: %(default)s)')
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help='attempts per page before it is left as failed (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='requests in flight at once (default: %(default)s)')
+    parser.add_argument('--requests-per-minute', type=float, default=REQUESTS_PER_MINUTE,
+                        help='starting request rate, adapted to how the site responds (default: %(default)s)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='download the schedule of seasons still in progress again once the cached copy '
+                             'is stale, and fetch only matches that are new or whose score changed')
+    parser.add_argument('--parquet', metavar='STORE_DIR',
+                        help='also keep each crawled season in a Parquet dataset partitioned by league and season')
+    parser.add_argument('--sqlite', metavar='DB',
+                        help='also upsert fixtures and player rows into this SQLite database as they are written')
+    parser.add_argument('--status', action='store_true',
+                        help='only print how many units are in each state')
+    parser.add_argument('--metrics-file', default='fbref_metrics.prom',
+                        help='Prometheus text file rewritten every --metrics-interval seconds (default: %(default)s)')
+    parser.add_argument('--metrics-interval', type=float, default=15)
+    parser.add_argument('--run-summary', default='fbref_run_summary.json',
+                        help='JSON summary of the run\'s metrics, written at the end (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    manifest = CrawlManifest(args.manifest)
+    if args.status:
+        print_status(manifest)
+        return 0
+
+    if not has_work(manifest, default_cache(), args.leagues, args.start_season, args.end_season,
+                    args.max_attempts, args.incremental):
+        print('Nothing to crawl, every season is up to date')
+        print_status(manifest)
+        return exit_code(manifest)
+
+    from .database import FootballDatabase
+    from .fbreffull import FBRefScraper
+
+    database = FootballDatabase(args.sqlite) if args.sqlite else None
+    scraper = FBRefScraper(concurrency=args.concurrency, requests_per_minute=args.requests_per_minute,
+                           database=database)
+    exporter = MetricsExporter(default_metrics(), args.metrics_file, args.run_summary,
+                               args.metrics_interval).start()
+    try:
+        run(scraper, manifest, args.leagues, args.start_season, args.end_season, args.max_attempts,
+            args.incremental, args.parquet)
+    except KeyboardInterrupt:
+        print('\nInterrupted, run again to resume where this run stopped')
+        return 130
+    finally:
+        print()
+        print_status(manifest)
+        print(scraper.cache.report())
+        print(default_metrics().report())
+        exporter.stop()
+        if database is not None:
+            database.close()
+    return exit_code(manifest)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
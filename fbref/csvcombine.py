@@ -1,19 +1,239 @@
-# Import necessary packages
-import pandas as pd
+import argparse
+import codecs
+import glob
+import hashlib
+import json
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set
+
+import pandas as pd
+
+from .datafiles import describe_file
+
+# Column order of the combined file; missing columns (xG for Super Lig, match_url in
+# older files) are left empty and leftover index columns (Unnamed: 0) are dropped
+COLUMNS = ['league', 'season', 'Wk', 'Day', 'Date', 'Time', 'Home', 'Away', 'Score', 'xG', 'xG.1',
+           'game_id', 'match_url']
+TEXT_COLUMNS = ['Day', 'Home', 'Away', 'Score']
+# A match is the same match whichever file it came from
+MATCH_KEY = ['Date', 'Home', 'Away']
+CHUNK_ROWS = 50_000
+# First characters of UTF-8 multi-byte sequences that were decoded as latin-1/cp1252,
+# e.g. the en dash in "0–4" turning into "0â\x80\x934"
+MOJIBAKE_RE = r'[ÂÃÄÅâ]'
+
+
+def detect_encoding(path: str) -> str:
+    """utf-8 if the whole file decodes as UTF-8, otherwise cp1252 (or latin-1, which decodes anything)"""
+    with open(path, 'rb') as f:
+        if f.read(3) == codecs.BOM_UTF8:
+            return 'utf-8-sig'
+    for encoding in ('utf-8', 'cp1252'):
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    decoder.decode(block)
+            decoder.decode(b'', final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def _unmangle(text: str) -> str:
+    for encoding in ('cp1252', 'latin-1'):
+        try:
+            return text.encode(encoding).decode('utf-8')
+        except UnicodeError:
+            continue
+    return text
+
+
+def fix_mojibake(values: pd.Series) -> pd.Series:
+    """Undo UTF-8 text that was read with a single byte encoding; values that are fine stay as they are"""
+    mangled = values.str.contains(MOJIBAKE_RE, na=False)
+    if not mangled.any():
+        return values
+    values = values.copy()
+    values[mangled] = values[mangled].map(_unmangle)
+    return values
+
+
+def normalise(chunk: pd.DataFrame, league: Optional[str], season: Optional[str]) -> pd.DataFrame:
+    chunk = chunk.reindex(columns=COLUMNS).astype('string')
+    for column in TEXT_COLUMNS:
+        chunk[column] = fix_mojibake(chunk[column])
+    if league is not None:
+        chunk['league'] = chunk['league'].fillna(league)
+    if season is not None:
+        chunk['season'] = chunk['season'].fillna(season)
+    # Weeks and the old row-counter game ids were written as floats (1.0)
+    for column in ['Wk', 'game_id']:
+        chunk[column] = chunk[column].str.replace(r'^(\d+)\.0$', r'\1', regex=True)
+    return chunk
+
+
+def normalise_file(path: str, part_path: str) -> int:
+    """Stream one input file into a normalised UTF-8 part file, returns its row count"""
+    data_file = describe_file(path)
+    encoding = detect_encoding(path)
+    rows = 0
+    tmp_path = f'{part_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as out:
+        # Everything is read as text, values are written back exactly as they came in
+        for chunk in pd.read_csv(path, encoding=encoding, dtype=str, chunksize=CHUNK_ROWS):
+            normalise(chunk, data_file.league, data_file.season).to_csv(out, header=rows == 0, index=False)
+            rows += len(chunk)
+        if rows == 0:
+            pd.DataFrame(columns=COLUMNS).to_csv(out, index=False)
+    os.replace(tmp_path, part_path)
+    return rows
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CombineManifest:
+    """Size, mtime and sha256 of every input of a combined file, kept in <output>.manifest.json.
+
+    Each input is normalised once into <output>.parts/; later runs only
+    normalise inputs whose size or content changed.
+    """
+
+    def __init__(self, output: str):
+        self.path = output + '.manifest.json'
+        self.parts_dir = output + '.parts'
+        self.files: Dict[str, Dict] = {}
+        # Input order of the last combine, it decides which copy of a duplicated match is kept
+        self.order: List[str] = []
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+            self.files = saved['files']
+            self.order = saved.get('order', [])
+
+    def part_path(self, path: str) -> str:
+        return os.path.join(self.parts_dir, hashlib.sha1(path.encode('utf-8')).hexdigest()[:16] + '.csv')
+
+    def is_current(self, path: str) -> bool:
+        """True if path is unchanged since it was last normalised; the hash is only taken when size or mtime moved"""
+        entry = self.files.get(path)
+        if entry is None or not os.path.exists(self.part_path(path)):
+            return False
+        stat = os.stat(path)
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns != entry['mtime_ns']:
+            if file_digest(path) != entry['sha256']:
+                return False
+            # Touched but not changed
+            entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+
+    def record(self, path: str, rows: int) -> None:
+        stat = os.stat(path)
+        self.files[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_digest(path),
+                            'rows': rows}
+
+    def forget(self, paths: Set[str]) -> None:
+        for path in paths:
+            self.files.pop(path, None)
+            try:
+                os.remove(self.part_path(path))
+            except OSError:
+                pass
+
+    def save(self) -> None:
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'order': self.order, 'files': self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def write_combined(paths: List[str], manifest: CombineManifest, output: str) -> Dict[str, int]:
+    """Stream the part files into output in input order, keeping the first copy of each match"""
+    seen: Set[str] = set()
+    rows = duplicates = 0
+    tmp_path = f'{output}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as out:
+        pd.DataFrame(columns=COLUMNS).to_csv(out, index=False)
+        for path in paths:
+            for chunk in pd.read_csv(manifest.part_path(path), dtype=str, chunksize=CHUNK_ROWS):
+                keys = chunk[MATCH_KEY[0]].str.cat(chunk[MATCH_KEY[1:]], sep='|')
+                # Rows without a date or team cannot be matched up and are all kept
+                keep = keys.isna() | ~(keys.isin(seen) | keys.duplicated())
+                seen.update(keys[keep].dropna())
+                chunk[keep].to_csv(out, header=False, index=False)
+                rows += int(keep.sum())
+                duplicates += int((~keep).sum())
+    os.replace(tmp_path, output)
+    return {'rows': rows, 'duplicates': duplicates}
+
+
+def combine(paths: List[str], output: str, workers: Optional[int] = None) -> Dict[str, int]:
+    """Combine fixture CSVs into output, normalising only inputs added or changed since the last run.
+
+    Inputs whose name tells their league come first, so a match that is also
+    in an earlier combined file (no league) keeps the copy with a league.
+    """
+    paths = sorted(paths, key=lambda path: describe_file(path).league is None)
+    manifest = CombineManifest(output)
+    os.makedirs(manifest.parts_dir, exist_ok=True)
+    removed = set(manifest.files) - set(paths)
+    changed = [path for path in paths if not manifest.is_current(path)]
+
+    if changed:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            counts = pool.map(normalise_file, changed, [manifest.part_path(path) for path in changed])
+            for path, count in zip(changed, counts):
+                manifest.record(path, count)
+                print(f'{path}: {count} rows')
+    manifest.forget(removed)
+
+    if changed or removed or paths != manifest.order or not os.path.exists(output):
+        stats = write_combined(paths, manifest, output)
+        manifest.order = list(paths)
+    else:
+        stats = {'rows': None, 'duplicates': None}
+    manifest.save()
+    return {'inputs': len(paths), 'changed': len(changed), 'removed': len(removed), **stats}
+
 
-# Navigate to the folder where your CSV files are 
-os.chdir('/Users/ysk/Desktop/fbref/data/allfixture')
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Combine fixture CSVs into one file with the same columns, encoding and no duplicate matches.')
+    parser.add_argument('paths', nargs='+',
+                        help='CSV files or glob patterns; when a match is in several files the first one listed wins, '
+                             'files named after a league before the others')
+    parser.add_argument('--output', default='all-csv-fixture.csv', help='combined file (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processes normalising changed inputs (default: one per CPU)')
+    args = parser.parse_args(argv)
 
-# Create an empty dataframe
-df = pd.DataFrame([])
+    output = os.path.abspath(args.output)
+    paths = []
+    for pattern in args.paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            path = os.path.abspath(path)
+            if path != output and path not in paths:
+                paths.append(path)
 
-# Read all CSV files and append them to df
-for root, dirs, files in os.walk("."):
-   for name in files:
-       df_temp = pd.read_csv(name, encoding='latin1')
+    stats = combine(paths, output, args.workers)
+    if stats['rows'] is None:
+        print(f'{args.output} is up to date ({stats["inputs"]} inputs unchanged)')
+    else:
+        print(f'{args.output}: {stats["rows"]} matches from {stats["inputs"]} files '
+              f'({stats["changed"]} normalised, {stats["duplicates"]} duplicates dropped)')
+    return 0
 
-       df = pd.concat([df,df_temp])
 
-# Save df to a CSV file
-df.to_csv('all-csv-files.csv')
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,279 @@
+import argparse
+import glob
+import os
+import sqlite3
+import sys
+from typing import Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from .datafiles import describe_file, drop_index_columns, game_ids
+from .fixtures import parse_scores
+from .standings import match_keys
+
+DB_PATH = os.environ.get('FBREF_DB', 'fbref.db')
+# Matches buffered by add_match before they are written in one transaction
+BATCH_MATCHES = 200
+
+FIXTURE_COLUMNS = ['league', 'season', 'game_id', 'wk', 'day', 'date', 'time', 'home', 'away', 'score',
+                   'home_goals', 'away_goals', 'home_xg', 'away_xg', 'match_url']
+# Identifying columns of a player row; every other column of the player CSVs is a REAL stat column,
+# added to the table the first time a league's tables bring it
+PLAYER_COLUMNS = ['league', 'season', 'game_id', 'home', 'player', 'kind', 'team', 'nation', 'pos', 'age']
+PLAYER_RENAMES = {'Player': 'player', 'Nation': 'nation', 'Pos': 'pos', 'Age': 'age'}
+# Only the goalkeeper table has these, goalkeepers get a summary and a keeper row per match
+KEEPER_COLUMNS = ['SoTA', 'Saves']
+
+# Team of a player row, from the side of the match it played on
+TEAM_SQL = '''(SELECT CASE WHEN {home} = 1 THEN f.home ELSE f.away END FROM fixtures f
+               WHERE f.league = {league} AND f.season = {season} AND f.game_id = {game_id})'''
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _records(df: pd.DataFrame) -> List[tuple]:
+    # NaN/NA become NULL, numpy scalars plain Python values
+    return list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+
+
+class FootballDatabase:
+    """Fixtures and player rows of every scraped league season in one SQLite file.
+
+    Rows are upserted: a fixture is keyed on (league, season, game_id) and a
+    player row on (league, season, game_id, home, player, kind), so scraping
+    or importing a season again updates it in place instead of adding
+    copies. Indexes on (league, season), team and player keep lookups such as
+    every match of one player across all leagues off a full scan.
+    """
+
+    def __init__(self, path: str = DB_PATH, batch_matches: int = BATCH_MATCHES):
+        self.path = path
+        self.batch_matches = batch_matches
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        # WAL lets queries read while a crawl writes; NORMAL only syncs at checkpoints
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        # Player rows of matches not written yet, and the league season they belong to
+        self._pending: List[pd.DataFrame] = []
+        self._pending_season: Optional[Tuple[str, str]] = None
+        with self.db:
+            self.db.execute('''CREATE TABLE IF NOT EXISTS fixtures (
+                league TEXT NOT NULL, season TEXT NOT NULL, game_id TEXT NOT NULL,
+                wk INTEGER, day TEXT, date TEXT, time TEXT, home TEXT, away TEXT, score TEXT,
+                home_goals INTEGER, away_goals INTEGER, home_xg REAL, away_xg REAL, match_url TEXT,
+                PRIMARY KEY (league, season, game_id))''')
+            self.db.execute('''CREATE TABLE IF NOT EXISTS players (
+                league TEXT NOT NULL, season TEXT NOT NULL, game_id TEXT NOT NULL,
+                home INTEGER NOT NULL, player TEXT NOT NULL, kind TEXT NOT NULL,
+                team TEXT, nation TEXT, pos TEXT, age TEXT,
+                PRIMARY KEY (league, season, game_id, home, player, kind))''')
+            self.db.execute('CREATE INDEX IF NOT EXISTS fixtures_home ON fixtures (home)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS fixtures_away ON fixtures (away)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS players_team ON players (team, league, season)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS players_player ON players (player)')
+            # (league, season) lookups of both tables are served by their primary keys
+        self._stat_columns = {row['name'] for row in self.db.execute('PRAGMA table_info(players)')}
+
+    def _add_stat_columns(self, columns: List[str]) -> None:
+        known = {name.lower() for name in self._stat_columns}
+        for column in columns:
+            if column.lower() not in known:
+                self.db.execute(f'ALTER TABLE players ADD COLUMN {_quote(column)} REAL')
+                self._stat_columns.add(column)
+                known.add(column.lower())
+
+    def upsert_fixtures(self, fixtures: pd.DataFrame, league: str, season: Optional[str] = None) -> int:
+        """Insert or update fixture rows; the season comes from the season column, or season. Returns the row count"""
+        df = drop_index_columns(fixtures)
+        column = lambda name: df[name] if name in df else pd.Series(pd.NA, index=df.index, dtype='object')
+        seasons = column('season').astype('object')
+        if season is not None:
+            seasons = seasons.fillna(season)
+        goals = parse_scores(column('Score'))
+        out = pd.DataFrame({
+            'league': league,
+            'season': seasons,
+            # Old files without a usable id are keyed by date and teams, like the standings
+            'game_id': match_keys(df.assign(game_id=game_ids(df['game_id'])) if 'game_id' in df else df),
+            'wk': pd.to_numeric(column('Wk'), errors='coerce').astype('Int64'),
+            'day': column('Day'),
+            'date': pd.to_datetime(column('Date'), errors='coerce').dt.strftime('%Y-%m-%d'),
+            'time': column('Time'),
+            'home': column('Home'),
+            'away': column('Away'),
+            'score': column('Score'),
+            'home_goals': goals['home_goals'].astype('Int64'),
+            'away_goals': goals['away_goals'].astype('Int64'),
+            'home_xg': pd.to_numeric(column('xG'), errors='coerce'),
+            'away_xg': pd.to_numeric(column('xG.1'), errors='coerce'),
+            'match_url': column('match_url'),
+        }, index=df.index)[FIXTURE_COLUMNS]
+        out = out[out['season'].notna() & out['game_id'].notna()]
+
+        updates = ', '.join(f'{name} = excluded.{name}' for name in FIXTURE_COLUMNS[3:])
+        with self.db:
+            self.db.executemany(
+                f'''INSERT INTO fixtures ({", ".join(FIXTURE_COLUMNS)})
+                    VALUES ({", ".join("?" * len(FIXTURE_COLUMNS))})
+                    ON CONFLICT (league, season, game_id) DO UPDATE SET {updates}''', _records(out))
+            # Player rows written before their fixtures learn their team now
+            for league_season in out[['league', 'season']].drop_duplicates().itertuples(index=False):
+                self.db.execute(
+                    f'''UPDATE players SET team = {TEAM_SQL.format(home='players.home', league='players.league',
+                                                                    season='players.season',
+                                                                    game_id='players.game_id')}
+                        WHERE team IS NULL AND league = ? AND season = ?''', tuple(league_season))
+        return len(out)
+
+    def upsert_players(self, players: pd.DataFrame, league: str, season: str) -> int:
+        """Insert or update player rows of one season in a single transaction. Returns the row count"""
+        df = drop_index_columns(players).rename(columns=PLAYER_RENAMES)
+        df = df[df['player'].notna()]
+        keeper = df[[c for c in KEEPER_COLUMNS if c in df]].notna().any(axis=1)
+        if 'pos' in df:
+            keeper &= df['pos'].isna()
+        key = pd.DataFrame({
+            'league': league,
+            'season': season,
+            'game_id': game_ids(df['game_id']),
+            'home': pd.to_numeric(df['home'], errors='coerce').fillna(0).astype(int),
+            'player': df['player'],
+            'kind': keeper.map({True: 'keeper', False: 'summary'}),
+        }, index=df.index)
+        text = df.reindex(columns=['nation', 'pos', 'age']).astype(object)
+        stats = [c for c in df.columns if c not in PLAYER_COLUMNS]
+        values = df[stats].apply(pd.to_numeric, errors='coerce')
+        out = pd.concat([key, text, values], axis=1)
+
+        insert = ['league', 'season', 'game_id', 'home', 'player', 'kind', 'nation', 'pos', 'age'] + stats
+        placeholders = ', '.join(f'?{i}' for i in range(1, len(insert) + 1))
+        team = TEAM_SQL.format(league='?1', season='?2', game_id='?3', home='?4')
+        updates = ', '.join(f'{_quote(name)} = excluded.{_quote(name)}' for name in insert[6:])
+        with self.db:
+            self._add_stat_columns(stats)
+            self.db.executemany(
+                f'''INSERT INTO players ({", ".join(map(_quote, insert))}, team)
+                    VALUES ({placeholders}, {team})
+                    ON CONFLICT (league, season, game_id, home, player, kind)
+                    DO UPDATE SET {updates}, team = COALESCE(excluded.team, players.team)''', _records(out))
+        return len(out)
+
+    def add_match(self, rows: pd.DataFrame, league: str, season: str) -> bool:
+        """Buffer the player rows of one match; every batch_matches matches are written in one transaction.
+
+        Returns True when this call wrote the batch, this match included.
+        """
+        if self._pending_season != (league, season):
+            self.flush()
+            self._pending_season = (league, season)
+        self._pending.append(rows)
+        if len(self._pending) >= self.batch_matches:
+            self.flush()
+            return True
+        return False
+
+    def flush(self) -> int:
+        """Write the buffered player rows, returns how many"""
+        if not self._pending:
+            return 0
+        rows = pd.concat(self._pending, ignore_index=True)
+        self._pending = []
+        return self.upsert_players(rows, *self._pending_season)
+
+    def catch_up(self, path: str, match_ids: Iterable[str], league: str, season: str) -> int:
+        """Upsert the rows of matches in match_ids that the player CSV at path holds but the database lacks.
+
+        A run that stops before its batch is flushed leaves matches in the CSV
+        and its .done index, which later runs skip. Returns how many matches
+        were added.
+        """
+        stored = {row[0] for row in self.db.execute(
+            'SELECT DISTINCT game_id FROM players WHERE league = ? AND season = ?', (league, season))}
+        missing = set(match_ids) - stored
+        if not missing or not os.path.exists(path):
+            return 0
+        df = pd.read_csv(path, encoding='utf-8', encoding_errors='replace', low_memory=False)
+        df = df[game_ids(df['game_id']).isin(missing).to_numpy()]
+        if df.empty:
+            return 0
+        self.upsert_players(df, league, season)
+        return int(df['game_id'].nunique())
+
+    def player_matches(self, player: str) -> pd.DataFrame:
+        """Every row of one player, across all leagues and seasons, with the match date and opponent"""
+        return self.query('''SELECT f.date, CASE WHEN p.home = 1 THEN f.away ELSE f.home END AS opponent, p.*
+                             FROM players p LEFT JOIN fixtures f
+                               ON f.league = p.league AND f.season = p.season AND f.game_id = p.game_id
+                             WHERE p.player = ? ORDER BY f.date, p.kind DESC''', (player,))
+
+    def query(self, sql: str, params: Iterable = ()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.db, params=tuple(params))
+
+    def counts(self) -> dict:
+        return {table: self.db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('fixtures', 'players')}
+
+    def close(self) -> None:
+        self.flush()
+        self.db.close()
+
+
+def import_files(paths: List[str], database: FootballDatabase, league: Optional[str] = None) -> int:
+    """Upsert fixture and player CSVs, with league and season taken from the file names"""
+    # Fixtures first, so the player rows find their team
+    paths = sorted(paths, key=lambda path: describe_file(path).kind == 'player')
+    stored = 0
+    for path in paths:
+        data_file = describe_file(path)
+        file_league = league or data_file.league
+        if file_league is None:
+            print(f'{path}: league unknown, pass --league')
+            continue
+        df = pd.read_csv(path, encoding='utf-8', encoding_errors='replace', low_memory=False)
+        if data_file.kind == 'player':
+            if data_file.season is None:
+                print(f'{path}: season unknown, player files are named <league>_<season>_player_data.csv')
+                continue
+            rows = database.upsert_players(df, file_league, data_file.season)
+        elif data_file.season is None and 'season' not in df:
+            print(f'{path}: season unknown, the file has no season column')
+            continue
+        else:
+            rows = database.upsert_fixtures(df, file_league, data_file.season)
+        print(f'{path}: {rows} rows upserted as {file_league} {data_file.kind} data')
+        stored += 1
+    return stored
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Upsert fixture and player CSVs into a SQLite database, or look up a player in it.')
+    parser.add_argument('--db', default=DB_PATH, help='SQLite database (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help='upsert CSV files; importing a file again changes nothing')
+    import_parser.add_argument('paths', nargs='+', help='CSV files or glob patterns, e.g. "*_player_data.csv"')
+    import_parser.add_argument('--league', help='league of files whose name does not tell, e.g. Serie-A')
+    player_parser = commands.add_parser('player', help='print every match of a player across leagues')
+    player_parser.add_argument('name')
+    args = parser.parse_args(argv)
+
+    database = FootballDatabase(args.db)
+    try:
+        if args.command == 'import':
+            paths = sorted({path for pattern in args.paths for path in (glob.glob(pattern) or [pattern])})
+            stored = import_files(paths, database, args.league)
+            counts = database.counts()
+            print(f"{args.db}: {counts['fixtures']} fixtures, {counts['players']} player rows")
+            return 0 if stored == len(paths) else 1
+        with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', None):
+            print(database.player_matches(args.name))
+        return 0
+    finally:
+        database.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import os
+import re
+from typing import NamedTuple, Optional
+
+import pandas as pd
+
+# League names as they appear in fbref URLs and therefore in the scrapers' file names
+LEAGUE_NAMES = ['Premier-League', 'La-Liga', 'Serie-A', 'Ligue-1', 'Bundesliga', 'Super-Lig']
+# Names of the hand-made per-league files, e.g. bundes.csv
+LEAGUE_ALIASES = {'bundes': 'Bundesliga'}
+
+# premier-league_2022-2023_fixture_data.csv, "super lig_2019-2020_player_data.csv",
+# super-lig_2020-2021_fixture_data_processed.csv, ...
+DATA_FILE_RE = re.compile(
+    r'^(?P<league>.+?)_(?P<season>\d{4}-\d{4})_(?P<kind>fixture|player)_data(?:_processed)?\.csv$', re.IGNORECASE)
+SEASON_RE = re.compile(r'(\d{4})-(\d{4})')
+
+
+class DataFile(NamedTuple):
+    path: str
+    league: Optional[str]
+    season: Optional[str]
+    kind: str
+
+
+def canonical_league(name: str) -> Optional[str]:
+    """'premier league', 'Premier-League', 'Premierleague' -> 'Premier-League'"""
+    key = re.sub(r'[\s_-]+', '', name.strip().lower())
+    for league in LEAGUE_NAMES:
+        if key == league.replace('-', '').lower():
+            return league
+    return LEAGUE_ALIASES.get(key)
+
+
+def describe_file(path: str) -> DataFile:
+    """League, season and kind of a data file, taken from its name.
+
+    Scraper output carries all three; hand-made files like serieA.csv only
+    name the league (if that) and hold fixtures of several seasons.
+    """
+    name = os.path.basename(path)
+    match = DATA_FILE_RE.match(name)
+    if match:
+        return DataFile(path, canonical_league(match.group('league')), match.group('season'),
+                        match.group('kind').lower())
+    season = SEASON_RE.search(name)
+    return DataFile(path, canonical_league(os.path.splitext(name)[0]),
+                    season.group(0) if season else None, 'fixture')
+
+
+def game_ids(values: pd.Series) -> pd.Series:
+    """game_id values as strings: fbref match hashes unchanged, the 0.0, 1.0, ... of old files as '0', '1', ..."""
+    if pd.api.types.is_numeric_dtype(values):
+        values = values.astype('Int64')
+    return values.astype('string')
+
+
+def drop_index_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """df without the index columns earlier to_csv/reset_index calls left behind (Unnamed: 0, index)"""
+    return df.drop(columns=[c for c in df.columns if c.startswith('Unnamed:') or c == 'index'])
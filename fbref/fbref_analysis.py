@@ -0,0 +1,315 @@
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .fixtures import load_fixtures
+
+# Per team and match, from the team's point of view
+STATS = ['gf', 'ga', 'xg', 'xga', 'pts', 'gd', 'xgd']
+TABLE_COLUMNS = ['MP', 'W', 'D', 'L', 'GF', 'GA', 'GD', 'Pts']
+SPLIT_COLUMNS = ['home_MP', 'home_Pts', 'home_GF', 'home_GA', 'away_MP', 'away_Pts', 'away_GF', 'away_GA',
+                 'home_PPG', 'away_PPG']
+XG_COLUMNS = ['GF', 'xG', 'GF-xG', 'GA', 'xGA', 'xGA-GA', 'xGD']
+
+
+class MatchAnalysis:
+    """Played fixtures indexed by team, season and date, with league tables precomputed.
+
+    Every played match is stored twice, once per team, sorted by league,
+    season, team and date, so the matches of a team in a season are one
+    contiguous slice. Running sums over that order answer rolling-window and
+    as-of-date queries from a few array lookups instead of a DataFrame scan.
+    """
+
+    def __init__(self, fixtures: pd.DataFrame):
+        self.fixtures = fixtures.reset_index(drop=True)
+        played = self.fixtures['result'].notna().to_numpy()
+        rows = np.flatnonzero(played)
+        df = self.fixtures.iloc[rows]
+
+        def text(column: str) -> np.ndarray:
+            if column not in df:
+                return np.full(len(df), '', dtype=object)
+            return df[column].astype('object').fillna('').to_numpy()
+
+        home_goals = df['home_goals'].to_numpy(dtype=float)
+        away_goals = df['away_goals'].to_numpy(dtype=float)
+        # xG is stored as float32; rounding to 2 decimals after widening restores fbref's 0.1 steps
+        # and the 2 decimals of the simulated Super Lig xG
+        home_xg = df['xG'].to_numpy(dtype=float).round(2) if 'xG' in df else np.full(len(df), np.nan)
+        away_xg = df['xG.1'].to_numpy(dtype=float).round(2) if 'xG.1' in df else np.full(len(df), np.nan)
+        home_points = np.select([home_goals > away_goals, home_goals == away_goals], [3, 1], 0)
+        away_points = np.select([home_goals < away_goals, home_goals == away_goals], [3, 1], 0)
+
+        # Two rows per match: the home team's, then the away team's
+        league = np.concatenate([text('league')] * 2)
+        season = np.concatenate([text('season')] * 2)
+        team = np.concatenate([text('Home'), text('Away')])
+        opponent = np.concatenate([text('Away'), text('Home')])
+        dates = df['Date'].to_numpy(dtype='datetime64[D]') if 'Date' in df else np.full(len(df), 'NaT', 'datetime64[D]')
+        values = {
+            'gf': np.concatenate([home_goals, away_goals]),
+            'ga': np.concatenate([away_goals, home_goals]),
+            'xg': np.concatenate([home_xg, away_xg]),
+            'xga': np.concatenate([away_xg, home_xg]),
+            'pts': np.concatenate([home_points, away_points]).astype(float),
+        }
+        values['gd'] = values['gf'] - values['ga']
+        values['xgd'] = values['xg'] - values['xga']
+
+        order = np.lexsort((np.concatenate([dates, dates]), team, season, league))
+        self.league = league[order]
+        self.season = season[order]
+        self.team = team[order]
+        self.opponent = opponent[order]
+        self.match_dates = np.concatenate([dates, dates])[order]
+        self.home = np.repeat([True, False], len(df))[order]
+        self.fixture_rows = np.concatenate([rows, rows])[order]
+        self.values = {stat: column[order] for stat, column in values.items()}
+        # Running sums with a leading 0, so the sum over rows [i, j) is sums[j] - sums[i];
+        # matches without xG add nothing and are left out of the counts
+        self._sums = {stat: np.concatenate([[0.0], np.nancumsum(column)]) for stat, column in self.values.items()}
+        self._counts = {stat: np.concatenate([[0], np.cumsum(~np.isnan(column))]) for stat, column in self.values.items()}
+
+        # (team, season) -> (start, stop) of its slice; a team plays one league per season
+        key = np.char.add(np.char.add(self.team.astype(str), '\x00'), self.season.astype(str))
+        starts = np.flatnonzero(np.concatenate([[True], key[1:] != key[:-1]])) if len(key) else np.array([], int)
+        stops = np.append(starts[1:], len(key))
+        self._slices: Dict[Tuple[str, str], Tuple[int, int]] = {
+            (self.team[start], self.season[start]): (int(start), int(stop)) for start, stop in zip(starts, stops)}
+        self.summary = self._summarise(starts)
+        # (league, season) -> table, home/away and xG views, built once so a query is a dict lookup
+        self._tables: Dict[Tuple[str, str], Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]] = {}
+        for key, group in self.summary.groupby(level=[0, 1], sort=False):
+            group = group.droplevel([0, 1])
+            self._tables[key] = (group[TABLE_COLUMNS], group[SPLIT_COLUMNS],
+                                 group[XG_COLUMNS].sort_values('GF-xG', ascending=False))
+
+        # Fixtures of every season in date order, for date range queries
+        fixture_dates = self.fixtures['Date'].to_numpy(dtype='datetime64[D]') if 'Date' in self.fixtures else None
+        seasons = self.fixtures['season'].astype('object').fillna('').to_numpy() if 'season' in self.fixtures else None
+        self._by_date: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        if fixture_dates is not None:
+            for season_name in (np.unique(seasons) if seasons is not None else ['']):
+                positions = np.flatnonzero(seasons == season_name) if seasons is not None \
+                    else np.arange(len(fixture_dates))
+                positions = positions[np.argsort(fixture_dates[positions], kind='stable')]
+                self._by_date[season_name] = (fixture_dates[positions], positions)
+
+    def _summarise(self, starts: np.ndarray) -> pd.DataFrame:
+        """Totals of every team and season, one np.add.reduceat per column"""
+        if not len(starts):
+            return pd.DataFrame(columns=TABLE_COLUMNS + SPLIT_COLUMNS + XG_COLUMNS,
+                                index=pd.MultiIndex.from_arrays([[], [], []], names=['league', 'season', 'team']))
+
+        def total(column: np.ndarray) -> np.ndarray:
+            return np.add.reduceat(np.nan_to_num(column.astype(float)), starts)
+
+        pts, gf, ga = self.values['pts'], self.values['gf'], self.values['ga']
+        home = self.home.astype(float)
+        away = 1 - home
+        summary = pd.DataFrame({
+            'MP': total(np.ones(len(pts))),
+            'W': total(pts == 3), 'D': total(pts == 1), 'L': total(pts == 0),
+            'GF': total(gf), 'GA': total(ga), 'GD': total(gf - ga), 'Pts': total(pts),
+            'home_MP': total(home), 'home_Pts': total(pts * home),
+            'home_GF': total(gf * home), 'home_GA': total(ga * home),
+            'away_MP': total(away), 'away_Pts': total(pts * away),
+            'away_GF': total(gf * away), 'away_GA': total(ga * away),
+            'xG': total(self.values['xg']), 'xGA': total(self.values['xga']),
+        }, index=pd.MultiIndex.from_arrays([self.league[starts], self.season[starts], self.team[starts]],
+                                           names=['league', 'season', 'team']))
+        counts = [column for column in summary.columns if not column.startswith(('xG', 'xGA'))]
+        summary[counts] = summary[counts].astype(int)
+        summary['home_PPG'] = (summary['home_Pts'] / summary['home_MP'].where(summary['home_MP'] > 0)).round(2)
+        summary['away_PPG'] = (summary['away_Pts'] / summary['away_MP'].where(summary['away_MP'] > 0)).round(2)
+        has_xg = np.add.reduceat(~np.isnan(self.values['xg']), starts) > 0
+        summary.loc[~has_xg, ['xG', 'xGA']] = np.nan
+        summary['xG'] = summary['xG'].round(1)
+        summary['xGA'] = summary['xGA'].round(1)
+        # Positive: scored more than the chances were worth / conceded fewer than the chances against
+        summary['GF-xG'] = (summary['GF'] - summary['xG']).round(1)
+        summary['xGA-GA'] = (summary['xGA'] - summary['GA']).round(1)
+        summary['xGD'] = (summary['xG'] - summary['xGA']).round(1)
+        # Standings order inside every league and season
+        return summary.sort_values(['league', 'season', 'Pts', 'GD', 'GF'],
+                                   ascending=[True, True, False, False, False])
+
+    def _slice(self, team: str, season: str) -> Tuple[int, int]:
+        try:
+            return self._slices[(team, season)]
+        except KeyError:
+            raise KeyError(f'No played matches of {team} in {season}') from None
+
+    def _views(self, season: str, league: Optional[str]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        if league is None:
+            leagues = [key[0] for key in self._tables if key[1] == season]
+            if len(leagues) != 1:
+                raise ValueError(f'{season} has data of {len(leagues)} leagues, pass league')
+            league = leagues[0]
+        try:
+            return self._tables[(league, season)]
+        except KeyError:
+            raise KeyError(f'No played matches of {league} in {season}') from None
+
+    def table(self, season: str, league: Optional[str] = None) -> pd.DataFrame:
+        """League table of a season, ordered by points, goal difference and goals scored"""
+        return self._views(season, league)[0]
+
+    def home_away(self, season: str, league: Optional[str] = None) -> pd.DataFrame:
+        """Home and away matches, points, goals and points per game of every team"""
+        return self._views(season, league)[1]
+
+    def xg_performance(self, season: str, league: Optional[str] = None) -> pd.DataFrame:
+        """Goals against xG for every team, best finishing (GF-xG) first"""
+        return self._views(season, league)[2]
+
+    def rolling(self, team: str, season: str, stat: str = 'xgd', window: int = 5) -> np.ndarray:
+        """Mean of stat over each match and the window-1 before it, in date order (see dates()).
+
+        stat is one of gf, ga, xg, xga, pts, gd, xgd; the first matches of a
+        season average over the matches played so far.
+        """
+        start, stop = self._slice(team, season)
+        ends = np.arange(start + 1, stop + 1)
+        begins = np.maximum(ends - window, start)
+        sums, counts = self._sums[stat], self._counts[stat]
+        n = counts[ends] - counts[begins]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(n > 0, (sums[ends] - sums[begins]) / n, np.nan)
+
+    def dates(self, team: str, season: str) -> np.ndarray:
+        """Dates of the team's played matches in the season"""
+        start, stop = self._slice(team, season)
+        return self.match_dates[start:stop]
+
+    def _as_of(self, team: str, season: str, date=None) -> Tuple[int, int]:
+        # Slice of the matches played up to and including date
+        start, stop = self._slice(team, season)
+        if date is not None:
+            stop = start + int(np.searchsorted(self.match_dates[start:stop], np.datetime64(date, 'D'), side='right'))
+        return start, stop
+
+    def form(self, team: str, season: str, n: int = 5, date=None) -> str:
+        """Results of the last n matches up to date, oldest first, e.g. 'WWDLW'"""
+        start, stop = self._as_of(team, season, date)
+        points = self.values['pts'][max(start, stop - n):stop]
+        return ''.join(np.array(['L', 'D', 'D', 'W'])[points.astype(int)])
+
+    def totals(self, team: str, season: str, date=None) -> Dict[str, float]:
+        """Season totals of every stat up to and including date"""
+        start, stop = self._as_of(team, season, date)
+        return {stat: float(self._sums[stat][stop] - self._sums[stat][start]) for stat in STATS}
+
+    def matches(self, team: Optional[str] = None, season: Optional[str] = None, start=None,
+                end=None) -> pd.DataFrame:
+        """Fixtures of a team and/or season between two dates (inclusive), unplayed ones only without team"""
+        if team is not None:
+            seasons = [season] if season is not None else [key[1] for key in self._slices if key[0] == team]
+            positions, dates = [], []
+            for season_name in seasons:
+                first, last = self._slice(team, season_name)
+                positions.append(self.fixture_rows[first:last])
+                dates.append(self.match_dates[first:last])
+            positions, dates = np.concatenate(positions or [[]]).astype(int), np.concatenate(dates or [[]])
+        else:
+            seasons = [season] if season is not None else list(self._by_date)
+            parts = [self._by_date[name] for name in seasons if name in self._by_date]
+            dates = np.concatenate([part[0] for part in parts]) if parts else np.array([], 'datetime64[D]')
+            positions = np.concatenate([part[1] for part in parts]) if parts else np.array([], int)
+        keep = np.ones(len(positions), bool)
+        if start is not None:
+            keep &= dates >= np.datetime64(start, 'D')
+        if end is not None:
+            keep &= dates <= np.datetime64(end, 'D')
+        return self.fixtures.iloc[positions[keep]]
+
+    def plot_statistics(self, season: Optional[str] = None):
+        """xG against goals, home/away xG, goals per season and the teams furthest from their xG"""
+        import matplotlib.pyplot as plt
+
+        df = self.fixtures[self.fixtures['result'].notna()]
+        fig, axes = plt.subplots(2, 2, figsize=(20, 12))
+
+        ax = axes[0, 0]
+        ax.scatter(df['xG'], df['home_goals'], alpha=0.5, label='Home Teams', color='blue')
+        ax.scatter(df['xG.1'], df['away_goals'], alpha=0.5, label='Away Teams', color='red')
+        top = np.nanmax([df['xG'].max(), df['xG.1'].max(), df['home_goals'].max(), df['away_goals'].max(), 1])
+        ax.plot([0, top], [0, top], 'k--', alpha=0.5, label='Expected=Actual')
+        ax.set(xlabel='Expected Goals (xG)', ylabel='Actual Goals', title='Expected vs Actual Goals')
+        ax.legend()
+
+        ax = axes[0, 1]
+        ax.hist(df['xG'].dropna(), bins=20, alpha=0.5, label='Home xG', color='blue')
+        ax.hist(df['xG.1'].dropna(), bins=20, alpha=0.5, label='Away xG', color='red')
+        ax.set(xlabel='Expected Goals (xG)', ylabel='Number of Matches', title='Distribution of Expected Goals')
+        ax.legend()
+
+        ax = axes[1, 0]
+        total = (df['home_goals'] + df['away_goals']).astype(float)
+        seasons = sorted(df['season'].dropna().unique()) if 'season' in df else []
+        ax.boxplot([total[df['season'] == name].dropna() for name in seasons], tick_labels=seasons)
+        ax.set(xlabel='Season', ylabel='Total Goals', title='Total Goals per Match by Season')
+        ax.tick_params(axis='x', rotation=45)
+
+        ax = axes[1, 1]
+        season = season or (seasons[-1] if seasons else '')
+        performance = self.summary.xs(season, level='season').dropna(subset=['GF-xG'])
+        performance = performance['GF-xG'].droplevel('league').sort_values()
+        shown = pd.concat([performance.head(5), performance.tail(5)]) if len(performance) > 10 else performance
+        ax.barh(shown.index, shown.values, color=np.where(shown.values >= 0, 'green', 'red'))
+        ax.set(xlabel='Goals - xG', title=f'Finishing against xG, {season}')
+
+        fig.tight_layout()
+        return fig
+
+    def plot_league_comparisons(self):
+        """Goals, xG, results and home advantage of every league and season side by side"""
+        import matplotlib.pyplot as plt
+
+        df = self.fixtures[self.fixtures['result'].notna()].copy()
+        df['league'] = df['league'].astype('object').fillna('') if 'league' in df else ''
+        df['goals'] = (df['home_goals'] + df['away_goals']).astype(float)
+        df['xg'] = df['xG'] + df['xG.1']
+        per_season = df.groupby(['league', 'season'], observed=True)[['goals', 'xg']].mean()
+        results = pd.crosstab(df['league'], df['result'].astype('object'), normalize='index')
+        results = results.reindex(columns=['H', 'D', 'A'], fill_value=0)
+        fig, axes = plt.subplots(2, 2, figsize=(20, 12))
+
+        for ax, column, title in [(axes[0, 0], 'goals', 'Goals per Match'), (axes[0, 1], 'xg', 'xG per Match')]:
+            for league, values in per_season[column].groupby(level='league'):
+                values = values.droplevel('league').dropna()
+                if len(values):
+                    ax.plot(values.index.astype(str), values.values, marker='o', label=league or 'unknown')
+            ax.set(xlabel='Season', title=f'{title} by League')
+            ax.tick_params(axis='x', rotation=45)
+            ax.legend()
+
+        ax = axes[1, 0]
+        results.rename(columns={'H': 'Home win', 'D': 'Draw', 'A': 'Away win'}).plot.bar(stacked=True, ax=ax)
+        ax.set(xlabel='League', ylabel='Share of Matches', title='Match Results by League')
+
+        ax = axes[1, 1]
+        splits = self.summary.groupby(level='league')[['home_Pts', 'home_MP', 'away_Pts', 'away_MP']].sum()
+        ppg = pd.DataFrame({'Home': splits['home_Pts'] / splits['home_MP'],
+                            'Away': splits['away_Pts'] / splits['away_MP']})
+        ppg.plot.bar(ax=ax)
+        ax.set(xlabel='League', ylabel='Points per Game', title='Home Advantage by League')
+
+        fig.tight_layout()
+        return fig
+
+
+def analyze_match_data(paths: Union[str, Iterable[str]]) -> MatchAnalysis:
+    """Load fixture CSVs (see fixtures.load_fixtures) and index them for analysis.
+
+    Tables are per league; files that do not tell their league (no league
+    column, no league in the file name) end up in one table per season.
+
+        analysis = analyze_match_data(['bundes.csv', 'superlig.csv'])
+        analysis.table('2023-2024', 'Bundesliga')
+        analysis.rolling('Leverkusen', '2023-2024', 'xgd', 5)
+        analysis.plot_league_comparisons()
+    """
+    return MatchAnalysis(load_fixtures(paths))
@@ -1,29 +1,81 @@
-from bs4 import BeautifulSoup
+import argparse
+import datetime
 import requests
 import pandas as pd
-import time
-import random
 import sys
-from urllib.error import HTTPError
 from functools import reduce
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from .archive import PageArchive, archive_page
+from .cache import ResponseCache, default_cache
+from .database import FootballDatabase
+from .fetcher import AsyncFetcher, HostRateLimiter, SharedRateLimiter
+from .fixtures import parse_scores
+from .leagues import (BASE_URL, END_SEASON, LEAGUES, REQUESTS_PER_MINUTE, START_SEASON, data_path, league_info,
+                     schedule_url, season_urls)
+from .parsers import MATCH_ID_RE, PLAYER_COLUMNS, match_id_from_url, match_player_rows, parse_schedule
+from .ratecontrol import AimdRateController
+from .standings import update_standings
+from .telemetry import default_metrics
+from .writers import PlayerDataWriter
+
+
+class Fixture(NamedTuple):
+    """One row of a Scores-and-Fixtures page; unplayed games have no score, goals or match_url"""
+    league: str
+    season: str
+    wk: Optional[int]
+    day: Optional[str]
+    date: Optional[datetime.date]
+    time: Optional[str]
+    home: str
+    away: str
+    score: Optional[str]
+    home_goals: Optional[int]
+    away_goals: Optional[int]
+    home_xg: Optional[float]
+    away_xg: Optional[float]
+    match_url: Optional[str]
+    game_id: Optional[str]
+
+
+class MatchRows(NamedTuple):
+    """Player rows of both teams of one match report"""
+    match_id: str
+    url: str
+    rows: pd.DataFrame
+
+
+def _value(value):
+    # NaN and NaT of pandas rows become None in records
+    return None if pd.isna(value) else value
+
 
 class FBRefScraper:
-    LEAGUES = {
-        'Premier League': ('Premier-League', '9'),
-        'La Liga': ('La-Liga', '12'),
-        'Serie A': ('Serie-A', '11'),
-        'Ligue 1': ('Ligue-1', '13'),
-        'Bundesliga': ('Bundesliga', '20'),
-        'Super Lig': ('Super-Lig', '26')
-    }
-    START_SEASON = 2017
-    END_SEASON = 2024
-
-    def __init__(self):
+    LEAGUES = LEAGUES
+    START_SEASON = START_SEASON
+    END_SEASON = END_SEASON
+    BASE_URL = BASE_URL
+    REQUESTS_PER_MINUTE = REQUESTS_PER_MINUTE
+    MAX_REQUESTS_PER_MINUTE = 20  # Ceiling for the adaptive rate while the site answers fine
+
+    def __init__(self, concurrency: int = 4, requests_per_minute: float = REQUESTS_PER_MINUTE,
+                 base_url: str = BASE_URL, cache: ResponseCache = None,
+                 limiter: Union[HostRateLimiter, SharedRateLimiter] = None, archive: PageArchive = None,
+                 database: FootballDatabase = None):
+        self.base_url = base_url
+        self.cache = cache or default_cache()
+        # Every downloaded page is also kept for offline re-extraction, see archive.py
+        self.archive = archive
+        # Optional SQLite sink that fixtures and player rows are upserted into next to the CSVs
+        self.database = database
+        self.concurrency = concurrency
         self.session = self._create_session()
+        self.limiter = limiter or HostRateLimiter(requests_per_minute)
+        self.rate_controller = AimdRateController(
+            self.limiter, max_rpm=max(self.MAX_REQUESTS_PER_MINUTE, requests_per_minute))
+        self.fetcher = AsyncFetcher(self._make_request, concurrency)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'text/html,application/xhtml+xml',
@@ -31,32 +83,24 @@ class FBRefScraper:
         }
 
     def _create_session(self) -> requests.Session:
-        """Create a session with retry strategy"""
+        """Create a pooled session, retries are left to the rate controller"""
         session = requests.Session()
-        retry_strategy = Retry(
-            total=5,
-            backoff_factor=2,
-            status_forcelist=[429, 500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # One pooled connection per in-flight request
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
         session.mount("https://", adapter)
         session.mount("http://", adapter)
         return session
 
-    def _make_request(self, url: str) -> str:
-        """Make a request with proper error handling and rate limiting"""
-        time.sleep(random.uniform(3, 7))  # Random delay between requests
-        try:
-            response = self.session.get(url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            return response.text
-        except requests.exceptions.RequestException as e:
-            if hasattr(e.response, 'status_code') and e.response.status_code == 429:
-                wait_time = int(e.response.headers.get('Retry-After', 60))
-                print(f'Rate limited. Waiting {wait_time} seconds...')
-                time.sleep(wait_time)
-                return self._make_request(url)  # Retry after waiting
-            raise
+    def _make_request(self, url: str, fresh: bool = False) -> str:
+        """Make a request with proper error handling and rate limiting, fresh skips the cache"""
+        cached = None if fresh else self.cache.get(url)
+        if cached is not None:
+            return cached
+        # Paced by the adaptive rate controller, which also retries 429/5xx a bounded number of times
+        response = self.rate_controller.get(self.session, url, headers=self.headers, timeout=30)
+        self.cache.put(url, response.text)
+        archive_page(url, response.text, self.archive)
+        return response.text
 
     def get_data_info(self) -> List[Tuple[str, str, str]]:
         """Get league information and generate URLs"""
@@ -67,101 +111,144 @@ class FBRefScraper:
                 break
             print('League not valid, try again')
 
-        urls = []
-        for season in range(self.START_SEASON, self.END_SEASON + 1):
-            next_season = season + 1
-            url = f'https://fbref.com/en/comps/{league_id}/{season}-{next_season}/schedule/{season}-{next_season}-{league_name}-Scores-and-Fixtures'
-            urls.append((url, league_name, f"{season}-{next_season}"))
-        
-        return urls
+        return self.season_urls(league)
+
+    def league_info(self, league: str) -> Tuple[str, str]:
+        """URL name and id of a league given as 'Premier League' or 'Premier-League'"""
+        return league_info(league)
+
+    def schedule_url(self, league: str, season: str) -> str:
+        """Scores-and-Fixtures URL of a season such as '2023-2024'"""
+        return schedule_url(league, season, self.base_url)
 
-    def get_fixture_data(self, url: str, league: str, season: str) -> None:
+    def season_urls(self, league: str, start_season: int = START_SEASON,
+                    end_season: int = END_SEASON) -> List[Tuple[str, str, str]]:
+        """Scores-and-Fixtures URL, league URL name and season of every season of a league"""
+        return season_urls(league, start_season, end_season, self.base_url)
+
+    def iter_fixtures(self, league: str, season: str, fresh: bool = False) -> Iterator[Fixture]:
+        """Fixtures of a league season as typed records, without writing anything"""
+        league_name, _ = self.league_info(league)
+        fixtures = self.parse_fixtures(self._make_request(self.schedule_url(league, season), fresh), season)
+        goals = parse_scores(fixtures['Score'])
+        dates = pd.to_datetime(fixtures['Date'], errors='coerce')
+        for i, row in enumerate(fixtures.to_dict('records')):
+            home_goals, away_goals, date = goals['home_goals'].iloc[i], goals['away_goals'].iloc[i], dates.iloc[i]
+            yield Fixture(
+                league=league_name,
+                season=season,
+                wk=None if pd.isna(row['Wk']) else int(row['Wk']),
+                day=_value(row['Day']),
+                date=None if pd.isna(date) else date.date(),
+                time=_value(row['Time']),
+                home=row['Home'],
+                away=row['Away'],
+                score=_value(row['Score']),
+                home_goals=None if pd.isna(home_goals) else int(home_goals),
+                away_goals=None if pd.isna(away_goals) else int(away_goals),
+                home_xg=_value(row.get('xG')),
+                away_xg=_value(row.get('xG.1')),
+                match_url=_value(row['match_url']),
+                game_id=_value(row['game_id']),
+            )
+
+    def iter_player_rows(self, match_links: Iterable[str]) -> Iterator[MatchRows]:
+        """Player rows of each match as soon as its report is fetched and parsed.
+
+        Reports are fetched concurrently and handed back in completion order;
+        only a few pages are held while the caller works on the previous match.
+        Matches that fail to download or lack their tables are reported and
+        skipped.
+        """
+        for link, html_content, error in self.fetcher.iter_fetch(match_links):
+            if error is not None:
+                print(f'Error processing match {link}: {str(error)}')
+                continue
+            match_id = match_id_from_url(link)
+            try:
+                rows = self.parse_match(html_content, match_id)
+            except (KeyError, ValueError) as e:
+                print(f'Error processing tables for match {link}: {str(e)}')
+                continue
+            yield MatchRows(match_id, link, rows)
+
+    def get_fixture_data(self, url: str, league: str, season: str) -> Optional[pd.DataFrame]:
         """Scrape and save fixture data"""
         print(f'Getting fixture data for {league} {season}...')
         try:
             html_content = self._make_request(url)
-            tables = pd.read_html(html_content)
-            fixtures = tables[0]
-            
-            # Get available columns (some seasons might not have xG)
-            available_columns = ['Wk', 'Day', 'Date', 'Time', 'Home', 'Away', 'Score']
-            if 'xG' in fixtures.columns and 'xG.1' in fixtures.columns:
-                available_columns.extend(['xG', 'xG.1'])
-            
-            fixtures = fixtures[available_columns].dropna(subset=['Home', 'Away'])
-            fixtures['season'] = season
-            fixtures["game_id"] = fixtures.index
-            
-            filename = f'{league.lower()}_{season.lower()}_fixture_data.csv'
-            fixtures.reset_index(drop=True).to_csv(filename, index=False)
+            fixtures = self.parse_fixtures(html_content, season)
+            self.save_fixtures(fixtures, league, season)
             print(f'Fixture data collected for {season}')
             return fixtures
         except Exception as e:
             print(f'Error collecting fixture data for {season}: {str(e)}')
             return None
 
-    def get_match_links(self, url: str, league: str) -> List[str]:
-        """Get match links from the league page"""
-        print('Getting match links...')
-        try:
-            html_content = self._make_request(url)
-            soup = BeautifulSoup(html_content, "html.parser")
-            
-            match_links = [
-                'https://fbref.com' + link.get('href')
-                for link in soup.find_all('a')
-                if '/en/matches/' in link.get('href', '') and league in link.get('href', '')
-            ]
-            return list(set(match_links))
-        except Exception as e:
-            print(f'Error getting match links: {str(e)}')
-            return []
+    def parse_fixtures(self, html_content: str, season: str) -> pd.DataFrame:
+        """Fixture rows of a schedule page"""
+        # Some seasons have no xG, parse_schedule only returns the columns present
+        fixtures = parse_schedule(html_content, self.base_url)
+        fixtures['season'] = season
+        # The match hash from the report URL, it does not shift between runs like a row counter
+        fixtures["game_id"] = fixtures['match_url'].str.extract(MATCH_ID_RE, expand=False)
+        return fixtures
+
+    def save_fixtures(self, fixtures: pd.DataFrame, league: str, season: str) -> None:
+        filename = data_path(league, season, 'fixture')
+        fixtures.reset_index(drop=True).to_csv(filename, index=False)
+        # Only matches played since the last save change the table
+        update_standings(filename, fixtures)
+        if self.database is not None:
+            self.database.upsert_fixtures(fixtures, league, season)
+
+    def get_match_links(self, fixtures: pd.DataFrame) -> List[str]:
+        """Get match report links of the played fixtures"""
+        played = fixtures[fixtures['Score'].notna()]
+        return played['match_url'].dropna().drop_duplicates().tolist()
+
+    def parse_match(self, html_content: str, game_id: str) -> pd.DataFrame:
+        """Player rows of both teams from a match report, raises KeyError/ValueError if tables are missing"""
+        # Only the summary and goalkeeper tables of both teams are built
+        return match_player_rows(html_content, game_id)
+
+    def player_writer(self, league: str, season: str) -> PlayerDataWriter:
+        writer = PlayerDataWriter(data_path(league, season, 'player'), columns=PLAYER_COLUMNS,
+                                  labels={'league': league, 'season': season})
+        if self.database is not None:
+            # Matches a stopped run wrote to the CSV but never flushed to the database
+            added = self.database.catch_up(writer.path, writer.completed, league, season)
+            if added:
+                print(f'{league} {season}: {added} matches from the CSV added to the database')
+        return writer
 
     def get_player_data(self, match_links: List[str], league: str, season: str) -> None:
         """Scrape and save player data"""
         print(f'Getting player data for {league} {season}...')
-        player_data = pd.DataFrame()
+        writer = self.player_writer(league, season)
+        pending = [link for link in match_links if match_id_from_url(link) not in writer.completed]
+        if len(pending) < len(match_links):
+            print(f'Resuming: {len(match_links) - len(pending)} matches already saved')
         
-        for count, link in enumerate(match_links, 1):
+        # The CSV is one consumer of the stream: each match is appended as it arrives
+        matches = self.iter_player_rows(pending)
+        for count, match in enumerate(matches, len(match_links) - len(pending) + 1):
             try:
-                html_content = self._make_request(link)
-                tables = pd.read_html(html_content)
-                
-                # Process home team data
-                try:
-                    home_data = pd.concat([
-                        tables[3].assign(home=1, game_id=count),
-                        tables[9].assign(home=1, game_id=count)
-                    ], ignore_index=True)
-                    
-                    # Process away team data
-                    away_data = pd.concat([
-                        tables[10].assign(home=0, game_id=count),
-                        tables[16].assign(home=0, game_id=count)
-                    ], ignore_index=True)
-                    
-                    # Drop totals rows and combine data
-                    home_data = home_data[home_data['Player'] != 'Team Total']
-                    away_data = away_data[away_data['Player'] != 'Team Total']
-                    
-                    match_data = pd.concat([home_data, away_data], ignore_index=True)
-                    player_data = pd.concat([player_data, match_data], ignore_index=True)
-                    
-                    print(f'Progress: {count}/{len(match_links)} matches collected')
-                    
-                    # Save after each successful match
-                    filename = f'{league.lower()}_{season.lower()}_player_data.csv'
-                    player_data.to_csv(filename, index=False)
-                    
-                except (KeyError, IndexError) as e:
-                    print(f'Error processing tables for match {link}: {str(e)}')
-                    continue
-                    
+                # Append this match only, the file is never rewritten
+                writer.write_match(match.match_id, match.rows)
+                if self.database is not None:
+                    # Buffered, written a batch of matches per transaction
+                    self.database.add_match(match.rows, league, season)
+                print(f'Progress: {count}/{len(match_links)} matches collected')
             except Exception as e:
-                print(f'Error processing match {link}: {str(e)}')
+                print(f'Error processing match {match.url}: {str(e)}')
                 continue
+        if self.database is not None:
+            self.database.flush()
 
-def main():
+def main(argv: Optional[List[str]] = None) -> int:
+    argparse.ArgumentParser(
+        description='Scrape fixtures and player stats of leagues and seasons picked at prompts.').parse_args(argv)
     scraper = FBRefScraper()
     
     while True:
@@ -171,8 +258,9 @@ def main():
             for url, league, season in urls:
                 print(f"\nProcessing {league} for season {season}")
                 try:
-                    if scraper.get_fixture_data(url, league, season):
-                        match_links = scraper.get_match_links(url, league)
+                    fixtures = scraper.get_fixture_data(url, league, season)
+                    if fixtures is not None:
+                        match_links = scraper.get_match_links(fixtures)
                         if match_links:
                             scraper.get_player_data(match_links, league, season)
                         else:
@@ -180,10 +268,10 @@ def main():
                 except Exception as e:
                     print(f"Error processing {league} {season}: {str(e)}")
                     continue
-                
-                time.sleep(random.uniform(5, 10))  # Delay between seasons
             
             print('\nAll data collection completed! 🎉')
+            print(scraper.cache.report())
+            print(default_metrics().report())
             break
             
         except KeyboardInterrupt:
@@ -193,6 +281,7 @@ def main():
             print(f"An unexpected error occurred: {str(e)}")
             if input("Do you want to try again? (yes/no): ").lower() != 'yes':
                 break
+    return 0
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
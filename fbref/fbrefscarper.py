@@ -1,58 +1,36 @@
-from bs4 import BeautifulSoup as soup
-import requests
+import argparse
 import pandas as pd
 import time
-import re
 from functools import reduce
 import sys
-from urllib.error import HTTPError
+
+from requests import RequestException
+
+from .cache import cached_get, default_cache
+from .leagues import LEAGUES, data_path, league_info, schedule_url, season_names
+from .parsers import MATCH_ID_RE, PLAYER_COLUMNS, extract_match_tables, match_id_from_url, parse_schedule, site_root
+from .standings import update_standings
+from .writers import PlayerDataWriter
 
 
 
 def get_data_info():
     # all possible leagues and seasons Firstly started from 2017 because from 2017 there is more stats about both matchesy and player
-    leagues = ['Premier League', 'La Liga', 'Serie A', 'Ligue 1', 'Bundesliga', 'Super Lig'] 
-    seasons = ['2017-2018', '2018-2019', '2019-2020', '2020-2021', '2021-2022','2022-2023','2023-2024','2024-2025']
+    seasons = season_names()
     
     while True:
         # select league [Premier League / La Liga / Serie A / Ligue 1 / Bundesliga]
-        league = input('Select League (PrePmier League / La Liga / Serie A / Ligue 1 / Bundesliga / Super Lig): ')
+        league = input(f'Select League ({" / ".join(LEAGUES)}): ')
         
         # check if input valid
-        if league not in leagues:
+        if league not in LEAGUES:
             print('League not valid, try again')
             continue
-            
-        # assign url names and id's
-        if league == 'Premier League':
-            league = 'Premier-League'
-            league_id = '9'
-
-        if league == 'La Liga':
-            league = 'La-Liga'
-            league_id = '12'
-
-        if league == 'Serie A':
-            league = 'Serie-A'
-            league_id = '11'
-
-        if league == 'Ligue 1':
-            league = 'Ligue-1'
-            league_id = '13'
-
-        if league == 'Bundesliga':
-            league = 'Bundesliga'
-            league_id = '20'
-
-        if league == 'Super Lig':
-            league = 'Super-Lig'
-            league_id = '26'
-
         break
             
     while True: 
         # select season after 2017 as XG only available from 2017 thats why I started from 2017 I could start from 2000 but then I wouldnt have that much stats and at the end of the day I did scrap from 2000 too but as I said it is not rich as this ones
-        season = input('Select Season (2017-2018, 2018-2019, 2019-2020, 2020-2021, 2021-2022, 2022-2023, 2023-2024, 2024-2025)--> ')
+        season = input(f'Select Season ({", ".join(seasons)})--> ')
         
         # check if input valid
         if season not in seasons:
@@ -60,121 +38,88 @@ def get_data_info():
             continue
         break
 #https://fbref.com/en/comps/9/2022-2023/schedule/2022-2023-Premier-League-Scores-and-Fixtures
-    url = f'https://fbref.com/en/comps/{league_id}/{season}/schedule/{season}-{league}-Scores-and-Fixtures'
-    return url, league, season
+    return schedule_url(league, season), league_info(league)[0], season
 
 
 def get_fixture_data(url, league, season):
     print('Getting fixture data...')
-    # create empty data frame and access all tables in url
+    # download and parse the schedule page once, each fixture comes with its match report link
     fixturedata = pd.DataFrame([])
-    tables = pd.read_html(url)
+    fixtures = parse_schedule(cached_get(url, headers={'User-Agent': 'Mozilla/5.0'}), site_root(url))
     
-    # get fixtures
-    fixtures = tables[0][['Wk', 'Day', 'Date', 'Time', 'Home', 'Away', 'Score','xG', 'xG.1' ]].dropna()# for super lig there was no xg values 'xG','xG1'
+    # get fixtures, for super lig there are no xG columns so only keep the ones present
+    columns = [c for c in ['Wk', 'Day', 'Date', 'Time', 'Home', 'Away', 'Score', 'xG', 'xG.1'] if c in fixtures.columns]
+    fixtures = fixtures.dropna(subset=columns)
     fixtures['season'] = url.split('/')[6]
     fixturedata = pd.concat([fixturedata,fixtures])
     
     # assign id for each game
-    fixturedata["game_id"] = fixturedata.index
+    fixturedata["game_id"] = fixturedata['match_url'].str.extract(MATCH_ID_RE, expand=False)
     
     # export to csv file
-    fixturedata.reset_index(drop=True).to_csv(f'{league.lower()}_{season.lower()}_fixture_data.csv', 
+    fixturedata.reset_index(drop=True).to_csv(data_path(league, season, 'fixture'),
         header=True, index=False, mode='w')
+    # keep the table next to the file up to date, only new results are counted
+    update_standings(data_path(league, season, 'fixture'), fixturedata)
     print('Fixture data collected finally...')
+    return fixturedata
 
 
-def get_match_links(url, league):   
+def get_match_links(fixtures):   
     print('Getting player data...')
-    # access and download content from url containing all fixture links    
-    match_links = []
-    html = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-    links = soup(html.content, "html.parser").find_all('a')
-    
-    # filter list to return only needed links
-    key_words_good = ['/en/matches/', f'{league}']
-    for l in links:
-        href = l.get('href', '')
-        if all(x in href for x in key_words_good):
-            if 'https://fbref.com' + href not in match_links:                 
-                match_links.append('https://fbref.com' + href)
-    return match_links
+    # match report links come straight from the fixture rows, no second download needed
+    return fixtures['match_url'].dropna().drop_duplicates().tolist()
 
 def player_data(match_links, league, season):
-    # Loop through all fixtures
-    player_data = pd.DataFrame([])
+    # Loop through all fixtures, each match is appended to the csv once and skipped on the next run
+    writer = PlayerDataWriter(data_path(league, season, 'player'), columns=PLAYER_COLUMNS,
+                              labels={'league': league, 'season': season})
     for count, link in enumerate(match_links):
+        # fbref's match hash is the game id, it stays the same between runs
+        game_id = match_id_from_url(link)
+        if game_id in writer.completed:
+            continue
         try:
-            tables = pd.read_html(link)
-            
-            # Skip matches if not enough data is available
-            if len(tables) < 17:  # Adjust based on expected number of tables for other leagues
-                print(f"{link}: insufficient data for Super Lig, skipping")
-                continue
-            
-            for table in tables:
-                try:
-                    table.columns = table.columns.droplevel()
-                except Exception:
-                    continue
-
-            # Adjust the indices of tables for Super Lig
-            if league == "Super-Lig":
-                t1_idx = 3
-                t2_idx = 9
-            else:
-                t1_idx = 3
-                t2_idx = 10
+            # summary tables are looked up by id, so Super Lig (no advanced tables) needs no special indices
+            teams = extract_match_tables(cached_get(link), ('summary',))
             
             # Get player data
-            def get_team_1_player_data():
-                # Handle table availability for Super Lig
-                data_frames = [tables[t1_idx]] if len(tables) > t1_idx else []
-                if not data_frames:
+            def get_team_player_data(team, home):
+                if len(teams) <= team or 'summary' not in teams[team]:
                     return pd.DataFrame()
-                df = pd.concat(data_frames).iloc[:1]
-                return df.assign(home=1, game_id=count)
-
-            def get_team_2_player_data():
-                data_frames = [tables[t2_idx]] if len(tables) > t2_idx else []
-                if not data_frames:
-                    return pd.DataFrame()
-                df = pd.concat(data_frames).iloc[:1]
-                return df.assign(home=0, game_id=count)
+                df = teams[team]['summary'].iloc[:1]
+                return df.assign(home=home, game_id=game_id)
 
             # Combine both teams' data
-            t1 = get_team_1_player_data()
-            t2 = get_team_2_player_data()
+            t1 = get_team_player_data(0, 1)
+            t2 = get_team_player_data(1, 0)
             combined_data = pd.concat([t1, t2]).reset_index()
             
             if not combined_data.empty:
-                player_data = pd.concat([player_data, combined_data])
+                writer.write_match(game_id, combined_data)
                 print(f"{count+1}/{len(match_links)} matches collected")
-                player_data.to_csv(f'{league.lower()}_{season.lower()}_player_data.csv', 
-                                   header=True, index=False, mode='w')
             else:
                 print(f"{link}: no data collected")
 
         except Exception as e:
             print(f"{link}: error - {e}")
-        # Sleep to avoid IP being blocked
-        time.sleep(7)
+        # no sleep needed, cached_get paces requests with the adaptive rate controller
 
 
 
-# main function
-def main(): 
+def collect():
     url, league, season = get_data_info()
-    get_fixture_data(url, league, season)
-    match_links = get_match_links(url, league)
+    fixtures = get_fixture_data(url, league, season)
+    match_links = get_match_links(fixtures)
     player_data(match_links, league, season)
 
     # checks if user wants to collect more data
     print('Finally Data collected ehehe🤓')
+    print(default_cache().report())
     while True:
         answer = input('Do you want to collect more data? (yes/no): ')
         if answer == 'yes':
-            main()
+            collect()
         if answer == 'no':
             sys.exit()
         else:
@@ -182,10 +127,20 @@ def main():
             continue
 
 
-if __name__ == '__main__':
+# main function
+def main(argv=None):
+    argparse.ArgumentParser(
+        description='Scrape the player summary of one league season picked at prompts.').parse_args(argv)
     try:
-        main()
-    except HTTPError:
+        collect()
+    except RequestException:
+        # cached_get raises requests' errors, e.g. HTTPError once retries on 429/5xx run out
         print('The website refused access, try again later')
         time.sleep(5)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
 
@@ -1,16 +1,90 @@
+from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QLabel, QComboBox, QPushButton, QVBoxLayout, QWidget, QTextEdit)
+    QApplication, QMainWindow, QLabel, QComboBox, QPushButton, QVBoxLayout, QHBoxLayout, QWidget, QTextEdit,
+    QListWidget, QListWidgetItem)
 import sys
-from bs4 import BeautifulSoup as soup
-import requests
-import pandas as pd
+import threading
 import time
-from functools import reduce
+
+from .fbreffull import FBRefScraper
+from .fetcher import HostRateLimiter
+from .leagues import LEAGUES, REQUESTS_PER_MINUTE, league_info, season_names
+from .parsers import match_id_from_url
+
+# Every job draws from the same process wide request budget, more jobs at once only split it further
+MAX_CONCURRENT_JOBS = 2
+# How long closing the window waits for running jobs before it hides and lets them finish
+CLOSE_WAIT_SECONDS = 3
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--"
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m {seconds:02d}s"
+
+
+class ScrapeJob(QThread):
+    """Scrapes one league season off the UI thread and reports through signals.
+
+    cancel() is honoured between matches, so the player CSV never holds half
+    a match and the next run resumes after the last one written.
+    """
+    # matches done, matches total, pages per second, ETA in seconds (-1 while unknown)
+    progress = pyqtSignal(int, int, float, float)
+    message = pyqtSignal(str)
+
+    def __init__(self, league, season, limiter):
+        super().__init__()
+        self.league = league
+        self.season = season
+        self.limiter = limiter
+        self.status = "queued"
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        self.status = "running"
+        self.message.emit(f"Scraping fixtures for {self.league} ({self.season})...")
+        try:
+            scraper = FBRefScraper(limiter=self.limiter)
+            league_name, _ = league_info(self.league)
+            fixtures = get_fixture_data(scraper, league_name, self.season)
+            match_links = scraper.get_match_links(fixtures)
+            started = time.monotonic()
+            fetched = 0
+
+            def on_match(done, total, was_fetched):
+                nonlocal fetched
+                fetched += was_fetched
+                elapsed = time.monotonic() - started
+                rate = fetched / elapsed if fetched and elapsed > 0 else 0.0
+                eta = (total - done) / rate if rate else -1
+                self.progress.emit(done, total, rate, eta)
+
+            player_data(scraper, match_links, league_name, self.season, on_match, self._cancelled.is_set)
+            if self._cancelled.is_set():
+                self.status = "cancelled"
+                self.message.emit(f"{self.league} ({self.season}) cancelled, start it again to resume")
+            else:
+                self.status = "done"
+                self.message.emit(f"{self.league} ({self.season}): data collection completed!")
+        except Exception as e:
+            self.status = "failed"
+            self.message.emit(f"{self.league} ({self.season}) error: {e}")
+
 
 class FootballDataApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Football Data  for fbref")
+        self.queued = []
+        self.running = []
+        self.items = {}
+        self.closing = False
+        self.limiter = HostRateLimiter(REQUESTS_PER_MINUTE)
 
         # Main layout
         self.layout = QVBoxLayout()
@@ -20,9 +94,7 @@ class FootballDataApp(QMainWindow):
         self.layout.addWidget(self.league_label)
 
         self.league_dropdown = QComboBox()
-        self.league_dropdown.addItems([
-            "Premier League", "La Liga", "Serie A", "Ligue 1", "Bundesliga", "Super Lig"
-        ])
+        self.league_dropdown.addItems(list(LEAGUES))
         self.layout.addWidget(self.league_dropdown)
 
         # Dropdown for seasons
@@ -30,16 +102,24 @@ class FootballDataApp(QMainWindow):
         self.layout.addWidget(self.season_label)
 
         self.season_dropdown = QComboBox()
-        self.season_dropdown.addItems([
-            "2017-2018", "2018-2019", "2019-2020", "2020-2021", "2021-2022",
-            "2022-2023", "2023-2024", "2024-2025"
-        ])
+        self.season_dropdown.addItems(season_names())
         self.layout.addWidget(self.season_dropdown)
 
-        # Button to start scraping
+        # Start queues the selection, so several leagues/seasons can be lined up
+        buttons = QHBoxLayout()
         self.scrape_button = QPushButton("Start Scraping")
         self.scrape_button.clicked.connect(self.start_scraping)
-        self.layout.addWidget(self.scrape_button)
+        buttons.addWidget(self.scrape_button)
+
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_scraping)
+        buttons.addWidget(self.cancel_button)
+        self.layout.addLayout(buttons)
+
+        # One line per queued or running job with its progress
+        self.job_list = QListWidget()
+        self.layout.addWidget(self.job_list)
 
         # Text box for logs to see errors or other logs
         self.log_box = QTextEdit()
@@ -58,87 +138,105 @@ class FootballDataApp(QMainWindow):
     def start_scraping(self):
         league = self.league_dropdown.currentText()
         season = self.season_dropdown.currentText()
-
-        league_id = {
-            "Premier League": "9",
-            "La Liga": "12",
-            "Serie A": "11",
-            "Ligue 1": "13",
-            "Bundesliga": "20",
-            "Super Lig": "26"
-        }[league]
-
-        league_url_name = league.replace(" ", "-")
-        url = f'https://fbref.com/en/comps/{league_id}/{season}/schedule/{season}-{league_url_name}-Scores-and-Fixtures'
-
-        self.log(f"Scraping fixtures for {league} ({season})...")
-
-        try:
-            get_fixture_data(url, league, season)
-            match_links = get_match_links(url, league)
-            player_data(match_links, league, season)
-            self.log("Data collection completed!")
-        except Exception as e:
-            self.log(f"Error: {e}")
-
-# Functions for scraping
-
-def get_fixture_data(url, league, season):
-    tables = pd.read_html(url)
-    fixtures = tables[0][['Wk', 'Day', 'Date', 'Time', 'Home', 'Away', 'xG', 'xG.1', 'Score']].dropna()
-    fixtures['season'] = url.split('/')[6]
-    fixtures["game_id"] = fixtures.index
-    fixtures.reset_index(drop=True).to_csv(
-        f'{league.lower()}_{season.lower()}_fixture_data.csv', header=True, index=False, mode='w')
-
-def get_match_links(url, league):
-    match_links = []
-    html = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-    links = soup(html.content, "html.parser").find_all('a')
-    key_words_good = ['/en/matches/', f'{league.replace(" ", "-")}']
-    for l in links:
-        href = l.get('href', '')
-        if all(x in href for x in key_words_good):
-            full_url = 'https://fbref.com' + href
-            if full_url not in match_links:
-                match_links.append(full_url)
-    return match_links
-
-def player_data(match_links, league, season):
-    player_data = pd.DataFrame([])
-    for count, link in enumerate(match_links):
-        try:
-            tables = pd.read_html(link)
-            for table in tables:
-                try:
-                    table.columns = table.columns.droplevel()
-                except Exception:
-                    continue
-
-            def get_team_1_player_data():
-                data_frames = [tables[3], tables[9]]
-                df = reduce(lambda left, right: pd.merge(left, right, 
-                            on=['Player', 'Nation', 'Age', 'Min'], how='outer'), data_frames).iloc[:-1]
-                return df.assign(home=1, game_id=count)
-
-            def get_team_2_player_data():
-                data_frames = [tables[10], tables[16]]
-                df = reduce(lambda left, right: pd.merge(left, right, 
-                            on=['Player', 'Nation', 'Age', 'Min'], how='outer'), data_frames).iloc[:-1]
-                return df.assign(home=0, game_id=count)
-
-            t1 = get_team_1_player_data()
-            t2 = get_team_2_player_data()
-            player_data = pd.concat([player_data, pd.concat([t1, t2]).reset_index()])
-            player_data.to_csv(f'{league.lower()}_{season.lower()}_player_data.csv', 
-                               header=True, index=False, mode='w')
-        except:
-            continue
-        time.sleep(3)
+        if any(job.league == league and job.season == season for job in self.queued + self.running):
+            self.log(f"{league} ({season}) is already queued")
+            return
+
+        job = ScrapeJob(league, season, self.limiter)
+        job.message.connect(self.log)
+        job.progress.connect(lambda done, total, rate, eta, job=job: self.show_progress(job, done, total, rate, eta))
+        job.finished.connect(lambda job=job: self.job_finished(job))
+        self.items[job] = QListWidgetItem(f"{league} ({season}): queued")
+        self.job_list.addItem(self.items[job])
+        self.queued.append(job)
+        self.cancel_button.setEnabled(True)
+        self.start_next_jobs()
+
+    def start_next_jobs(self):
+        while self.queued and len(self.running) < MAX_CONCURRENT_JOBS:
+            job = self.queued.pop(0)
+            self.running.append(job)
+            self.items[job].setText(f"{job.league} ({job.season}): fixtures...")
+            job.start()
+
+    def show_progress(self, job, done, total, rate, eta):
+        self.items[job].setText(
+            f"{job.league} ({job.season}): {done}/{total} matches, {rate:.2f} pages/s, "
+            f"ETA {format_eta(eta if eta >= 0 else None)}")
+
+    def job_finished(self, job):
+        self.running.remove(job)
+        self.items[job].setText(f"{job.league} ({job.season}): {job.status}")
+        self.start_next_jobs()
+        if not self.queued and not self.running:
+            self.cancel_button.setEnabled(False)
+            if self.closing:
+                self.close()
+
+    def cancel_scraping(self):
+        for job in self.queued:
+            job.status = "cancelled"
+            self.items[job].setText(f"{job.league} ({job.season}): cancelled")
+        self.queued.clear()
+        for job in self.running:
+            job.cancel()
+        if self.running:
+            self.log("Cancelling, running jobs stop after their current match...")
+
+    def closeEvent(self, event):
+        # Let running jobs finish their match so no thread is torn down mid-write. A job waiting
+        # out a Retry-After pause can take minutes, so after a short wait the window hides
+        # instead of freezing and closes once job_finished sees the last job end
+        self.cancel_scraping()
+        deadline = time.monotonic() + CLOSE_WAIT_SECONDS
+        for job in list(self.running):
+            job.wait(max(0, int((deadline - time.monotonic()) * 1000)))
+        if any(job.isRunning() for job in self.running):
+            self.closing = True
+            self.hide()
+            event.ignore()
+            return
+        super().closeEvent(event)
+
+# Scraping is left to the core scraper, the window only queues jobs and shows their progress
+
+def get_fixture_data(scraper, league, season):
+    """Download, save and return the fixtures of a season, raising on errors so the job can report them"""
+    fixtures = scraper.parse_fixtures(scraper._make_request(scraper.schedule_url(league, season)), season)
+    scraper.save_fixtures(fixtures, league, season)
+    return fixtures
+
+def player_data(scraper, match_links, league, season, on_match=None, cancelled=None):
+    """Write the player rows of every match not written yet.
+
+    on_match(done, total, fetched) is called after each match, cancelled() is
+    checked as each match arrives and stops the loop when it returns True.
+    """
+    writer = scraper.player_writer(league, season)
+    # fbref's match hash is the game id, it stays the same between runs
+    pending = [link for link in match_links if match_id_from_url(link) not in writer.completed]
+    done = len(match_links) - len(pending)
+    if on_match is not None and done:
+        on_match(done, len(match_links), False)
+    matches = scraper.iter_player_rows(pending)
+    try:
+        for match in matches:
+            if cancelled is not None and cancelled():
+                return
+            writer.write_match(match.match_id, match.rows)
+            done += 1
+            if on_match is not None:
+                on_match(done, len(match_links), True)
+    finally:
+        # Stops the fetches still in flight when the job is cancelled
+        matches.close()
+
+def main(argv=None):
+    app = QApplication(sys.argv[:1] + (sys.argv[1:] if argv is None else list(argv)))
+    main_window = FootballDataApp()
+    main_window.show()
+    return app.exec_()
 
 # Run the app
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    main_window = FootballDataApp()
-    main_window.show()
-    sys.exit(app.exec_())
+    sys.exit(main())
@@ -0,0 +1,257 @@
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """Token bucket that spaces out requests to stay inside a request budget"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self._tokens = capacity
+        # Time _tokens was counted at; a pause moves it into the future
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds the caller has to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return self._updated - now + wait
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next seconds, e.g. after a Retry-After.
+
+        The bucket's clock moves to the end of the pause, so callers queued
+        meanwhile are spaced at 1 / rate after it instead of all waking then.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._updated = max(self._updated, now + seconds)
+
+    def acquire(self) -> None:
+        """Block until a token is available"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Wait for a token without blocking the event loop"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class HostRateLimiter:
+    """One token bucket per host, shared by every thread and coroutine of a scraper"""
+
+    def __init__(self, requests_per_minute: float, burst: float = 1.0):
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.requests_per_minute / 60, self.burst)
+            return self._buckets[host]
+
+    def acquire(self, url: str) -> None:
+        self.bucket(url).acquire()
+
+    async def acquire_async(self, url: str) -> None:
+        await self.bucket(url).acquire_async()
+
+    def rate(self, url: str) -> float:
+        """Current budget of the host in requests per minute"""
+        return self.bucket(url).rate * 60
+
+    def set_rate(self, url: str, requests_per_minute: float) -> None:
+        self.bucket(url).rate = requests_per_minute / 60
+
+    def pause(self, url: str, seconds: float) -> None:
+        self.bucket(url).pause(seconds)
+
+
+class SharedRateLimiter:
+    """Per-host token buckets kept in a SQLite file, so every process that opens
+    the same file (other workers, other machines on a shared disk) draws on one
+    request budget. Rate changes and pauses are shared the same way.
+    """
+
+    def __init__(self, path: str, requests_per_minute: float, burst: float = 1.0):
+        self.path = path
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self._local = threading.local()
+        db = self._connection()
+        # updated is when tokens were counted, the end of a pause when the host is paused
+        db.execute('''CREATE TABLE IF NOT EXISTS rate_budget (
+            host TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, rate REAL)''')
+
+    def _connection(self) -> sqlite3.Connection:
+        if not hasattr(self._local, 'db'):
+            self._local.db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        return self._local.db
+
+    def _update(self, url: str, change: Callable[[float, float, float], Tuple[float, float, float]]) -> float:
+        """Apply change(start, tokens, rate) -> (start, tokens, rate) to a host's row inside one write
+        transaction and return the seconds until its tokens are non-negative.
+
+        start is when the tokens were counted, now or the end of a pause.
+        """
+        host = urlsplit(url).netloc
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            # Wall clock rather than monotonic time, the bucket is shared between machines
+            now = time.time()
+            row = db.execute('SELECT tokens, updated, rate FROM rate_budget WHERE host = ?', (host,)).fetchone()
+            if row is None:
+                row = (self.burst, now, None)
+            rate = (row[2] or self.requests_per_minute) / 60
+            start = max(now, row[1])
+            tokens = min(self.burst, row[0] + (start - row[1]) * rate)
+            start, tokens, rate = change(start, tokens, rate)
+            db.execute('INSERT OR REPLACE INTO rate_budget VALUES (?, ?, ?, ?)', (host, tokens, start, rate * 60))
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return start - now + (0.0 if tokens >= 0 else -tokens / rate)
+
+    def reserve(self, url: str) -> float:
+        """Take one token from the shared bucket and return how long to wait for it"""
+        return self._update(url, lambda start, tokens, rate: (start, tokens - 1, rate))
+
+    def rate(self, url: str) -> float:
+        row = self._connection().execute('SELECT rate FROM rate_budget WHERE host = ?',
+                                         (urlsplit(url).netloc,)).fetchone()
+        return row[0] if row and row[0] else self.requests_per_minute
+
+    def set_rate(self, url: str, requests_per_minute: float) -> None:
+        self._update(url, lambda start, tokens, rate: (start, tokens, requests_per_minute / 60))
+
+    def pause(self, url: str, seconds: float) -> None:
+        # Like TokenBucket.pause, the clock moves to the end of the pause
+        self._update(url, lambda start, tokens, rate: (max(start, time.time() + seconds), tokens, rate))
+
+    def acquire(self, url: str) -> None:
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, url: str) -> None:
+        wait = self.reserve(url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class FetchResult(NamedTuple):
+    url: str
+    text: Optional[str]
+    error: Optional[Exception]
+
+
+# Put on the result queue by the loop thread once it has ended
+_LOOP_DONE = object()
+
+
+class AsyncFetcher:
+    """Run a blocking fetch function over many URLs with a bounded number in flight.
+
+    The fetch function is expected to do its own rate limiting (see
+    FBRefScraper._make_request), so the fetcher only decides how many requests
+    may wait on the network at the same time.
+    """
+
+    def __init__(self, fetch: Callable[[str], str], concurrency: int = 4):
+        self.fetch = fetch
+        self.concurrency = concurrency
+
+    async def _run(self, urls: List[str], emit: Callable[[FetchResult], None],
+                   stop: threading.Event) -> None:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        def fetch_and_emit(url: str) -> None:
+            # Runs on a pool thread, so an emit that waits for the consumer does not stall the loop
+            try:
+                result = FetchResult(url, self.fetch(url), None)
+            except Exception as e:
+                result = FetchResult(url, None, e)
+            emit(result)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            async def fetch_one(url: str) -> None:
+                async with semaphore:
+                    if stop.is_set():
+                        return
+                    await loop.run_in_executor(pool, fetch_and_emit, url)
+
+            await asyncio.gather(*(fetch_one(url) for url in urls))
+
+    def iter_fetch(self, urls: Iterable[str]) -> Iterator[FetchResult]:
+        """Fetch urls concurrently and yield each result as soon as it completes.
+
+        At most concurrency pages wait for the caller: when it falls behind,
+        fetching pauses instead of piling up finished pages in memory.
+        """
+        urls = list(urls)
+        results: queue.Queue = queue.Queue(maxsize=self.concurrency)
+        stop = threading.Event()
+
+        def emit(result: object) -> None:
+            while not stop.is_set():
+                try:
+                    results.put(result, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        failure: List[BaseException] = []
+
+        def run() -> None:
+            try:
+                asyncio.run(self._run(urls, emit, stop))
+            except BaseException as e:
+                failure.append(e)
+            finally:
+                # Wakes the caller up if the loop ended before every url had a result
+                emit(_LOOP_DONE)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            for _ in urls:
+                result = results.get()
+                if result is _LOOP_DONE:
+                    raise RuntimeError('The fetch loop stopped before every url was fetched') from (
+                        failure[0] if failure else None)
+                yield result
+        finally:
+            # Callers that stop early should not keep the remaining requests going
+            stop.set()
+
+    def fetch_all(self, urls: Iterable[str]) -> List[FetchResult]:
+        """Fetch a whole batch and return the results in the order of urls"""
+        urls = list(urls)
+        by_url = {result.url: result for result in self.iter_fetch(urls)}
+        return [by_url[url] for url in urls]
@@ -0,0 +1,133 @@
+from typing import Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+from .csvcombine import fix_mojibake
+from .datafiles import describe_file, drop_index_columns, game_ids
+
+# "2–1", "0â4" (mojibake), and "(4) 1–1 (3)" for games decided on penalties
+SCORE_RE = r'^\s*(?:\((?P<home_pens>\d+)\)\s*)?(?P<home>\d+)\D+?(?P<away>\d+)(?:\s*\((?P<away_pens>\d+)\))?\s*$'
+RESULTS = pd.CategoricalDtype(['H', 'D', 'A'])
+CATEGORY_COLUMNS = ['Day', 'Home', 'Away', 'Score', 'season', 'league']
+
+
+def parse_scores(scores: pd.Series) -> pd.DataFrame:
+    """home_goals, away_goals (Int8) and result (H/D/A) from Score strings.
+
+    A season has a few dozen distinct scorelines, so the regex runs once per
+    distinct value and the result is spread back over the rows by index.
+    Games decided on penalties count as draws; unplayed games are all <NA>.
+    """
+    codes, uniques = pd.factorize(scores)
+    parsed = pd.Series(uniques, dtype='string').str.extract(SCORE_RE)
+    # factorize marks missing scores with -1, which picks the NaN slot appended at the end
+    home = np.append(pd.to_numeric(parsed['home']).to_numpy(dtype=float), np.nan)
+    away = np.append(pd.to_numeric(parsed['away']).to_numpy(dtype=float), np.nan)
+    # sign of the goal difference 1/0/-1 -> category code 0/1/2 (H/D/A), -1 for unplayed
+    result = np.where(np.isnan(home) | np.isnan(away), -1, 1 - np.sign(home - away)).astype('int8')
+    return pd.DataFrame({
+        'home_goals': pd.array(home[codes], dtype='Int8'),
+        'away_goals': pd.array(away[codes], dtype='Int8'),
+        'result': pd.Categorical.from_codes(result[codes], dtype=RESULTS),
+    }, index=scores.index)
+
+
+def compact(fixtures: pd.DataFrame) -> pd.DataFrame:
+    """Fixture rows with parsed goals, categorical text columns and downcast numbers"""
+    df = drop_index_columns(fixtures)
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('category')
+    if 'Score' in df:
+        df['Score'] = _fix_categories(df['Score'])
+        df = df.join(parse_scores(df['Score']))
+    if 'Wk' in df:
+        df['Wk'] = pd.to_numeric(df['Wk'], errors='coerce').astype('Int8')
+    for column in ['xG', 'xG.1']:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float32')
+    if 'Date' in df:
+        df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d', errors='coerce')
+    if 'game_id' in df:
+        df['game_id'] = game_ids(df['game_id'])
+    return df
+
+
+def _str_categories(values: pd.Series) -> pd.Series:
+    """values with str categories.
+
+    A column with no values in a file (the league of a file whose name
+    tells none) gets float categories, which union_categoricals refuses to
+    combine with the str categories of the other files.
+    """
+    categories = values.cat.categories
+    if pd.api.types.is_string_dtype(categories) or pd.api.types.is_object_dtype(categories):
+        return values
+    return values.cat.rename_categories(categories.astype(str))
+
+
+def _fix_categories(values: pd.Series) -> pd.Series:
+    # Only the distinct values need fixing, not every row
+    categories = values.cat.categories
+    fixed = fix_mojibake(pd.Series(categories, dtype='string'))
+    if fixed.equals(pd.Series(categories, dtype='string')):
+        return values
+    return values.map(dict(zip(categories, fixed))).astype('category')
+
+
+def _match_keys(frame: pd.DataFrame) -> pd.Series:
+    # fbref match hash; old files numbered their games 0, 1, ... per file, those fall back to season|date|home|away
+    columns = [column for column in ['season', 'Date', 'Home', 'Away'] if column in frame]
+    text = frame[columns].astype('string')
+    fallback = text.iloc[:, 0].str.cat(text.iloc[:, 1:], sep='|') if columns else pd.Series(pd.NA, index=frame.index)
+    if 'game_id' not in frame or pd.api.types.is_numeric_dtype(frame['game_id']):
+        return fallback.astype('string')
+    return frame['game_id'].astype('string').fillna(fallback)
+
+
+def load_fixtures(paths: Union[str, Iterable[str]]) -> pd.DataFrame:
+    """Read one or more fixture CSVs into one compact frame, see compact().
+
+    Files without a league column get the league their name tells, if any.
+    A match found more than once (serieA.csv repeats a whole season, and the
+    combined file repeats the per-league ones) is kept once, preferring a
+    copy that names its league.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    dtypes = {column: 'category' for column in CATEGORY_COLUMNS}
+    frames = []
+    for path in paths:
+        frame = pd.read_csv(path, dtype=dtypes, encoding_errors='replace')
+        if 'league' not in frame:
+            frame['league'] = pd.Categorical([describe_file(path).league] * len(frame))
+        # Names garbled by an earlier latin-1 read ("AtlÃ©tico Madrid") have to match their clean copies
+        for column in ['Home', 'Away', 'Score']:
+            if column in frame:
+                frame[column] = _fix_categories(frame[column])
+        frames.append(frame.assign(_match_key=_match_keys(frame)))
+    # Categories of the files differ, union them instead of falling back to strings
+    frames = [frame for frame in frames if len(frame)]
+    for column in CATEGORY_COLUMNS:
+        if all(column in frame for frame in frames) and frames:
+            for frame in frames:
+                frame[column] = _str_categories(frame[column])
+            categories = pd.api.types.union_categoricals([frame[column] for frame in frames]).categories
+            for frame in frames:
+                frame[column] = frame[column].cat.set_categories(categories)
+    if not frames:
+        return compact(pd.DataFrame())
+    combined = pd.concat(frames, ignore_index=True)
+    # Stable sort puts rows with a league first, so theirs is the copy drop_duplicates keeps
+    keys = combined['_match_key'].iloc[combined['league'].isna().to_numpy().argsort(kind='stable')]
+    repeated = keys.duplicated() & keys.notna()
+    combined = combined.drop(index=repeated.index[repeated.to_numpy()], columns='_match_key')
+    if all(column in combined for column in ['season', 'Home', 'Away']):
+        # A team hosts each opponent once a season, so a row without a league whose pairing a named league
+        # already has is a copy even when its date differs, and must not form a league of its own
+        pairs = combined['season'].astype('string').str.cat(combined[['Home', 'Away']].astype('string'), sep='|')
+        unnamed = combined['league'].isna().to_numpy()
+        copies = unnamed & pairs.isin(set(pairs[~unnamed].dropna())).to_numpy()
+        combined = combined[~copies]
+    return compact(combined.reset_index(drop=True))
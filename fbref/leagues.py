@@ -0,0 +1,51 @@
+from typing import List, Tuple
+
+# Display name -> (URL name, fbref competition id)
+LEAGUES = {
+    'Premier League': ('Premier-League', '9'),
+    'La Liga': ('La-Liga', '12'),
+    'Serie A': ('Serie-A', '11'),
+    'Ligue 1': ('Ligue-1', '13'),
+    'Bundesliga': ('Bundesliga', '20'),
+    'Super Lig': ('Super-Lig', '26')
+}
+# From 2017 on fbref has xG and the advanced player tables
+START_SEASON = 2017
+END_SEASON = 2024
+BASE_URL = 'https://fbref.com'
+REQUESTS_PER_MINUTE = 10  # fbref asks bots to stay under 10 requests a minute
+
+
+def league_info(league: str) -> Tuple[str, str]:
+    """URL name and id of a league given as 'Premier League' or 'Premier-League'"""
+    if league in LEAGUES:
+        return LEAGUES[league]
+    for league_name, league_id in LEAGUES.values():
+        if league.lower() == league_name.lower():
+            return league_name, league_id
+    raise KeyError(f'Unknown league {league}')
+
+
+def season_names(start_season: int = START_SEASON, end_season: int = END_SEASON) -> List[str]:
+    """'2017-2018', '2018-2019', ... by starting year"""
+    return [f'{season}-{season + 1}' for season in range(start_season, end_season + 1)]
+
+
+def schedule_url(league: str, season: str, base_url: str = BASE_URL) -> str:
+    """Scores-and-Fixtures URL of a season such as '2023-2024'"""
+    league_name, league_id = league_info(league)
+    return f'{base_url}/en/comps/{league_id}/{season}/schedule/{season}-{league_name}-Scores-and-Fixtures'
+
+
+def season_urls(league: str, start_season: int = START_SEASON, end_season: int = END_SEASON,
+                base_url: str = BASE_URL) -> List[Tuple[str, str, str]]:
+    """Scores-and-Fixtures URL, league URL name and season of every season of a league"""
+    league_name, _ = league_info(league)
+    return [(schedule_url(league, season, base_url), league_name, season)
+            for season in season_names(start_season, end_season)]
+
+
+def data_path(league: str, season: str, kind: str) -> str:
+    """CSV a league season's fixture or player rows are written to, e.g. premier-league_2023-2024_fixture_data.csv"""
+    league_name = LEAGUES[league][0] if league in LEAGUES else league
+    return f'{league_name.lower()}_{season.lower()}_{kind}_data.csv'
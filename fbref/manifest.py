@@ -0,0 +1,136 @@
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+STATES = ('pending', 'fetched', 'parsed', 'written', 'failed')
+
+
+class CrawlManifest:
+    """SQLite record of every unit of crawl work and how far it got.
+
+    A unit is either a season's schedule page or one match report, keyed by
+    URL. Units move pending -> fetched -> parsed -> written, or to failed with
+    the error kept; attempts counts how often a unit was tried so a broken page
+    is not retried forever.
+
+    Several workers, also on other machines sharing the file, can take match
+    units from the same manifest: lease() hands each unit to one worker for a
+    limited time, so units of a worker that died are picked up again once its
+    lease expires.
+    """
+
+    def __init__(self, path: str = 'crawl_manifest.db'):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        with self.db:
+            self.db.execute('''CREATE TABLE IF NOT EXISTS units (
+                url TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                league TEXT NOT NULL,
+                season TEXT NOT NULL,
+                schedule_url TEXT,
+                match_id TEXT,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL)''')
+            self.db.execute('CREATE INDEX IF NOT EXISTS units_todo ON units (kind, league, season, state)')
+
+    def add_schedule(self, url: str, league: str, season: str) -> None:
+        with self.db:
+            self.db.execute(
+                'INSERT OR IGNORE INTO units (url, kind, league, season, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (url, 'schedule', league, season, time.time()))
+
+    def add_matches(self, schedule_url: str, league: str, season: str,
+                    matches: Iterable[Tuple[str, str]]) -> None:
+        """Register the match reports (url, match_id) listed on a schedule page"""
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                '''INSERT OR IGNORE INTO units (url, kind, league, season, schedule_url, match_id, updated_at)
+                   VALUES (?, 'match', ?, ?, ?, ?, ?)''',
+                [(url, league, season, schedule_url, match_id, now) for url, match_id in matches])
+
+    def get(self, url: str) -> Optional[sqlite3.Row]:
+        return self.db.execute('SELECT * FROM units WHERE url = ?', (url,)).fetchone()
+
+    def begin(self, url: str) -> None:
+        """Count an attempt at a unit"""
+        with self.db:
+            self.db.execute('UPDATE units SET attempts = attempts + 1, updated_at = ? WHERE url = ?',
+                            (time.time(), url))
+
+    def mark(self, url: str, state: str, error: Optional[str] = None) -> None:
+        """Move a unit to a new state, a written or failed unit is no longer leased"""
+        if state not in STATES:
+            raise ValueError(f'Unknown state {state}')
+        with self.db:
+            if state in ('written', 'failed'):
+                self.db.execute(
+                    '''UPDATE units SET state = ?, last_error = ?, updated_at = ?,
+                       lease_owner = NULL, lease_expires = NULL WHERE url = ?''',
+                    (state, error, time.time(), url))
+            else:
+                self.db.execute('UPDATE units SET state = ?, last_error = ?, updated_at = ? WHERE url = ?',
+                                (state, error, time.time(), url))
+
+    def reset(self, urls: Iterable[str]) -> None:
+        """Make units pending again with a fresh attempt budget, e.g. after a score correction"""
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                '''UPDATE units SET state = 'pending', attempts = 0, last_error = NULL, updated_at = ?
+                   WHERE url = ?''', [(now, url) for url in urls])
+
+    def mark_many(self, urls: Iterable[str], state: str) -> None:
+        now = time.time()
+        with self.db:
+            self.db.executemany('UPDATE units SET state = ?, last_error = NULL, updated_at = ? WHERE url = ?',
+                                [(state, now, url) for url in urls])
+
+    def todo(self, kind: str, league: str, season: str, max_attempts: int) -> List[sqlite3.Row]:
+        """Units not written yet that still have attempts left"""
+        return self.db.execute(
+            '''SELECT * FROM units WHERE kind = ? AND league = ? AND season = ?
+               AND state != 'written' AND attempts < ? ORDER BY rowid''',
+            (kind, league, season, max_attempts)).fetchall()
+
+    def lease(self, owner: str, limit: int, ttl: float, max_attempts: int) -> List[sqlite3.Row]:
+        """Hand up to limit unleased (or expired) match units to owner for ttl seconds"""
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock first, so two workers never lease the same unit
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            rows = self.db.execute(
+                '''SELECT * FROM units WHERE kind = 'match' AND state != 'written' AND attempts < ?
+                   AND (lease_expires IS NULL OR lease_expires < ?)
+                   ORDER BY rowid LIMIT ?''',
+                (max_attempts, now, limit)).fetchall()
+            self.db.executemany('UPDATE units SET lease_owner = ?, lease_expires = ? WHERE url = ?',
+                                [(owner, now + ttl, row['url']) for row in rows])
+            self.db.execute('COMMIT')
+        except Exception:
+            self.db.execute('ROLLBACK')
+            raise
+        return rows
+
+    def remaining(self, max_attempts: int) -> int:
+        """Match units that are not written and still have attempts left, leased or not"""
+        return self.db.execute(
+            '''SELECT COUNT(*) FROM units WHERE kind = 'match' AND state != 'written' AND attempts < ?''',
+            (max_attempts,)).fetchone()[0]
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Number of units per kind and state"""
+        result: Dict[str, Dict[str, int]] = {}
+        for kind, state, count in self.db.execute(
+                'SELECT kind, state, COUNT(*) FROM units GROUP BY kind, state'):
+            result.setdefault(kind, {})[state] = count
+        return result
+
+    def close(self) -> None:
+        self.db.close()
@@ -0,0 +1,222 @@
+import re
+import time
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import lxml.html
+import pandas as pd
+
+from .telemetry import default_metrics
+
+BASE_URL = 'https://fbref.com'
+
+# data-stat attribute of a schedule cell -> column name used in the fixture CSVs
+SCHEDULE_COLUMNS = {
+    'gameweek': 'Wk',
+    'dayofweek': 'Day',
+    'date': 'Date',
+    'start_time': 'Time',
+    'home_team': 'Home',
+    'away_team': 'Away',
+    'score': 'Score',
+    'home_xg': 'xG',
+    'away_xg': 'xG.1',
+}
+# fbref match URLs look like /en/matches/3a6836b4/Burnley-Manchester-City-August-11-2023-Premier-League
+MATCH_ID_RE = r'/en/matches/([0-9a-f]{8})/'
+FIXTURE_COLUMNS = ['Wk', 'Day', 'Date', 'Time', 'Home', 'Away', 'Score']
+XG_COLUMNS = ['xG', 'xG.1']
+
+
+def match_id_from_url(url: str) -> Optional[str]:
+    """Stable id of a match, the hash fbref puts in its match report URL"""
+    match = re.search(MATCH_ID_RE, url)
+    return match.group(1) if match else None
+
+
+def site_root(url: str) -> str:
+    """scheme://host part of a page URL, the base its relative links resolve against"""
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+def find_table(doc, id_prefix: str):
+    """First table whose id starts with id_prefix, also looking inside HTML comments.
+
+    fbref ships most secondary tables commented out and renders them with
+    JavaScript, so they are invisible to a plain DOM search.
+    """
+    tables = doc.xpath('//table[starts-with(@id, $prefix)]', prefix=id_prefix)
+    if tables:
+        return tables[0]
+    for comment in doc.xpath('//comment()'):
+        if id_prefix in (comment.text or ''):
+            tables = lxml.html.fromstring(comment.text).xpath(
+                'descendant-or-self::table[starts-with(@id, $prefix)]', prefix=id_prefix)
+            if tables:
+                return tables[0]
+    return None
+
+
+def _cell_text(cell) -> str:
+    # Kick-off cells hold the venue time plus an empty span filled in by JavaScript
+    venue_time = cell.find_class('venuetime')
+    if venue_time:
+        return venue_time[0].text_content().strip()
+    return cell.text_content().strip()
+
+
+def parse_schedule(html: str, base_url: str = BASE_URL) -> pd.DataFrame:
+    """Fixtures and match report URLs from a Scores-and-Fixtures page in a single pass.
+
+    Returns one row per fixture with the usual fixture columns (xG only when
+    the league has it) plus match_url, which is None for games without a report.
+    """
+    started = time.perf_counter()
+    doc = lxml.html.fromstring(html)
+    table = find_table(doc, 'sched_')
+    if table is None:
+        raise ValueError('No schedule table found')
+
+    rows: List[Dict[str, Optional[str]]] = []
+    has_xg = False
+    for tr in table.iterfind('tbody/tr'):
+        # Skip spacer rows and the repeated header rows between matchweeks
+        if 'thead' in tr.get('class', '') or 'spacer' in tr.get('class', ''):
+            continue
+        row: Dict[str, Optional[str]] = {'match_url': None}
+        for cell in tr:
+            stat = cell.get('data-stat')
+            if stat in SCHEDULE_COLUMNS:
+                row[SCHEDULE_COLUMNS[stat]] = _cell_text(cell) or None
+                has_xg = has_xg or stat == 'home_xg'
+            elif stat == 'match_report':
+                for link in cell.iterfind('.//a'):
+                    href = link.get('href', '')
+                    if '/en/matches/' in href:
+                        row['match_url'] = base_url + href
+        rows.append(row)
+
+    columns = FIXTURE_COLUMNS + (XG_COLUMNS if has_xg else []) + ['match_url']
+    fixtures = pd.DataFrame(rows, columns=columns).dropna(subset=['Home', 'Away'])
+    for column in ['Wk'] + (XG_COLUMNS if has_xg else []):
+        fixtures[column] = pd.to_numeric(fixtures[column], errors='coerce')
+    default_metrics().observe('fbref_parse_seconds', time.perf_counter() - started, kind='schedule')
+    return fixtures.reset_index(drop=True)
+
+
+# Kinds of per-team tables on a match report and the id each one carries
+MATCH_TABLE_IDS = {
+    'summary': 'stats_{team}_summary',
+    'passing': 'stats_{team}_passing',
+    'passing_types': 'stats_{team}_passing_types',
+    'defense': 'stats_{team}_defense',
+    'possession': 'stats_{team}_possession',
+    'misc': 'stats_{team}_misc',
+    'keeper': 'keeper_stats_{team}',
+}
+# Player table columns that stay text, everything else is numeric
+TEXT_STATS = {'player', 'nationality', 'position', 'age'}
+# Goalkeeper columns whose header repeats one of the summary table (launched passes and goal kicks against
+# passes and take-ons), renamed so the two never share a column
+KEEPER_RENAMES = {'Cmp': 'Cmp (GK)', 'Att': 'Att (Launched)', 'Cmp%': 'Cmp% (GK)', 'Att.1': 'Att (Goal Kicks)'}
+# Columns of the player CSVs: the summary table of leagues with advanced stats, the extra columns of the basic
+# summary table (Super Lig), then the goalkeeper table, so every league's rows fit one schema
+PLAYER_COLUMNS = [
+    'Player', '#', 'Nation', 'Pos', 'Age', 'Min', 'Gls', 'Ast', 'PK', 'PKatt', 'Sh', 'SoT', 'CrdY', 'CrdR',
+    'Touches', 'Tkl', 'Int', 'Blocks', 'xG', 'npxG', 'xAG', 'SCA', 'GCA', 'Cmp', 'Att', 'Cmp%', 'PrgP', 'Carries',
+    'PrgC', 'Att.1', 'Succ',
+    'Fls', 'Fld', 'Off', 'Crs', 'TklW', 'OG', 'PKwon', 'PKcon',
+    'SoTA', 'GA', 'Saves', 'Save%', 'PSxG', 'Cmp (GK)', 'Att (Launched)', 'Cmp% (GK)', 'Att (GK)', 'Thr', 'Launch%',
+    'AvgLen', 'Att (Goal Kicks)', 'Launch%.1', 'AvgLen.1',
+    'Opp', 'Stp', 'Stp%', '#OPA', 'AvgDist',
+    'home', 'game_id',
+]
+TEAM_ID_RE = re.compile(r'id="stats_([0-9a-f]{8})_summary"')
+
+
+def _table_html(html: str, table_id: str) -> Optional[str]:
+    """Raw markup of the table with the given id, whether it sits in the DOM or in a comment"""
+    idx = html.find(f'id="{table_id}"')
+    if idx < 0:
+        return None
+    start = html.rfind('<table', 0, idx)
+    end = html.find('</table>', idx)
+    if start < 0 or end < 0:
+        return None
+    return html[start:end + len('</table>')]
+
+
+def _dedupe(columns: List[str]) -> List[str]:
+    """Suffix repeated column names with .1, .2, ... the way pandas does"""
+    seen: Dict[str, int] = {}
+    result = []
+    for column in columns:
+        if column in seen:
+            seen[column] += 1
+            result.append(f'{column}.{seen[column]}')
+        else:
+            seen[column] = 0
+            result.append(column)
+    return result
+
+
+def parse_stats_table(markup: str) -> pd.DataFrame:
+    """Player rows of one stats table with numeric columns already converted.
+
+    The Team Total row lives in the table footer and is left out.
+    """
+    table = lxml.html.fragment_fromstring(markup)
+    header = table.xpath('thead/tr')[-1]
+    stats = [th.get('data-stat') for th in header]
+    columns = _dedupe([th.text_content().strip() for th in header])
+
+    rows = []
+    for tr in table.iterfind('tbody/tr'):
+        row = [cell.text_content().strip() or None for cell in tr]
+        # Repeated header rows and colspan filler rows do not line up with the header
+        if 'thead' in tr.get('class', '') or len(row) != len(columns):
+            continue
+        rows.append(row)
+
+    df = pd.DataFrame(rows, columns=columns)
+    for column, stat in zip(columns, stats):
+        if stat not in TEXT_STATS:
+            values = df[column].astype('string').str.replace(',', '')
+            df[column] = pd.to_numeric(values, errors='coerce')
+    return df
+
+
+def extract_match_tables(html: str, kinds: Iterable[str] = ('summary', 'keeper')) -> List[Dict[str, pd.DataFrame]]:
+    """Requested stat tables of a match report, one dict per team with the home team first.
+
+    Tables are located by id and only their markup is parsed, so the rest of
+    the page (and tables nobody asked for) is never built. Kinds a league does
+    not publish, like the advanced tables for Super Lig, are left out of the dict.
+    """
+    started = time.perf_counter()
+    team_ids = list(dict.fromkeys(TEAM_ID_RE.findall(html)))
+    teams = []
+    for team in team_ids:
+        tables = {}
+        for kind in kinds:
+            markup = _table_html(html, MATCH_TABLE_IDS[kind].format(team=team))
+            if markup is not None:
+                tables[kind] = parse_stats_table(markup)
+                if kind == 'keeper':
+                    tables[kind] = tables[kind].rename(columns=KEEPER_RENAMES)
+        teams.append(tables)
+    default_metrics().observe('fbref_parse_seconds', time.perf_counter() - started, kind='match')
+    return teams
+
+
+def match_player_rows(html: str, game_id: str) -> pd.DataFrame:
+    """Summary and goalkeeper rows of both teams, flagged home=1/0.
+
+    Raises KeyError or ValueError if the match report lacks the tables. This is
+    a plain function so it can be sent to a process pool.
+    """
+    home, away = extract_match_tables(html, ('summary', 'keeper'))
+    home_data = pd.concat([home['summary'], home['keeper']], ignore_index=True).assign(home=1, game_id=game_id)
+    away_data = pd.concat([away['summary'], away['keeper']], ignore_index=True).assign(home=0, game_id=game_id)
+    return pd.concat([home_data, away_data], ignore_index=True)
@@ -0,0 +1,314 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .database import KEEPER_COLUMNS
+from .datafiles import describe_file, drop_index_columns, game_ids
+
+PLAYER_STORE_DIR = os.environ.get('FBREF_PLAYER_STORE_DIR', 'fbref_players')
+
+KEYS = ['game_id', 'home', 'Player']
+# Text columns of the player CSVs that are interned rather than stored as stats; # is the shirt number
+LABEL_COLUMNS = ['Player', 'Nation', 'Pos', 'Age', '#', 'home', 'game_id']
+# Per row code arrays and their types, each saved as <name>.npy next to stats.npy
+CODE_TYPES = {
+    'player': np.int32,
+    'team': np.int16,
+    'nation': np.int16,
+    'position': np.int16,
+    'league': np.int8,
+    'season': np.int8,
+    'match': np.int32,
+    'home': np.int8,
+    'date': np.int32,  # days since 1970-01-01, -1 when the fixture file is missing
+    'age': np.int8,    # years, -1 when unknown
+    'team_first': np.bool_,  # the first row of each team and match, to count matches
+}
+# code array -> list in meta.json its codes index
+DICTIONARIES = {'player': 'players', 'team': 'teams', 'nation': 'nations', 'position': 'positions',
+                'league': 'leagues', 'season': 'seasons', 'match': 'matches'}
+
+
+def merge_keeper_rows(players: pd.DataFrame) -> pd.DataFrame:
+    """One row per player and match: a goalkeeper's keeper row is folded into the summary row"""
+    keeper = players[[c for c in KEEPER_COLUMNS if c in players]].notna().any(axis=1)
+    if 'Pos' in players:
+        keeper &= players['Pos'].isna()
+    if not keeper.any():
+        return players
+    summary = players[~keeper].drop_duplicates(KEYS).set_index(KEYS)
+    keepers = players[keeper].drop_duplicates(KEYS).set_index(KEYS)
+    return summary.combine_first(keepers)[summary.columns].reset_index()
+
+
+def load_season(player_path: str, fixture_path: Optional[str] = None) -> pd.DataFrame:
+    """Player rows of one season CSV with the team and date of each row's match from its fixture CSV"""
+    df = pd.read_csv(player_path, encoding='utf-8', encoding_errors='replace', low_memory=False)
+    df = drop_index_columns(df)
+    df = df[df['Player'].notna()]
+    df['game_id'] = game_ids(df['game_id'])
+    df['home'] = pd.to_numeric(df['home'], errors='coerce').fillna(0).astype(np.int8)
+    df = merge_keeper_rows(df)
+    if fixture_path is not None and os.path.exists(fixture_path):
+        fixtures = pd.read_csv(fixture_path, usecols=lambda c: c in ('Date', 'Home', 'Away', 'game_id'),
+                               encoding='utf-8', encoding_errors='replace')
+        fixtures = fixtures.assign(game_id=game_ids(fixtures['game_id'])).drop_duplicates('game_id')
+        match = df[['game_id']].merge(fixtures, on='game_id', how='left')
+        df['team'] = np.where(df['home'].to_numpy() == 1, match['Home'].to_numpy(), match['Away'].to_numpy())
+        df['date'] = pd.to_datetime(match['Date'], errors='coerce').to_numpy()
+    else:
+        df['team'] = None
+        df['date'] = pd.NaT
+    return df
+
+
+def _codes(values: pd.Series, sort: bool = True):
+    codes, uniques = pd.factorize(values, sort=sort)
+    return codes, [str(value) for value in uniques]
+
+
+def build(paths: Sequence[str], root: str = PLAYER_STORE_DIR) -> int:
+    """Intern and pack the player CSVs in paths (fixture CSVs next to them give teams and dates) into root.
+
+    The store is rebuilt as a whole and swapped in when complete. Returns the row count.
+    """
+    frames = []
+    for path in paths:
+        data_file = describe_file(path)
+        if data_file.kind != 'player' or data_file.league is None or data_file.season is None:
+            print(f'{path}: not a <league>_<season>_player_data.csv file, skipped')
+            continue
+        fixture_path = os.path.join(os.path.dirname(path),
+                                    os.path.basename(path).replace('_player_data', '_fixture_data'))
+        df = load_season(path, fixture_path)
+        frames.append(df.assign(league=data_file.league, season=data_file.season))
+        print(f'{path}: {len(df)} player rows')
+    if not frames:
+        raise ValueError('No player CSVs to store')
+    df = pd.concat(frames, ignore_index=True)
+    stats = [c for c in df.columns
+             if c not in LABEL_COLUMNS + ['team', 'date', 'league', 'season'] and not c.startswith('Unnamed:')]
+
+    meta: Dict = {'rows': len(df), 'stats': stats}
+    arrays: Dict[str, np.ndarray] = {}
+    for name, column in (('player', 'Player'), ('team', 'team'), ('nation', 'Nation'), ('position', 'Pos'),
+                         ('league', 'league'), ('season', 'season'), ('match', 'game_id')):
+        codes, meta[DICTIONARIES[name]] = _codes(df[column].astype('object'))
+        arrays[name] = codes
+    arrays['home'] = df['home'].to_numpy()
+    dates = pd.to_datetime(df['date'])
+    arrays['date'] = np.where(dates.isna(), -1, dates.to_numpy('datetime64[D]').astype(np.int64))
+    arrays['age'] = pd.to_numeric(df['Age'].astype('string').str.split('-').str[0],
+                                  errors='coerce').fillna(-1).to_numpy()
+
+    # Rows of a player are contiguous and in date order, offsets[p]:offsets[p + 1] are player p's rows
+    order = np.lexsort((arrays['date'], arrays['player']))
+    arrays = {name: values[order].astype(CODE_TYPES[name]) for name, values in arrays.items()}
+    arrays['team_first'] = ~pd.DataFrame({'team': arrays['team'], 'match': arrays['match']}).duplicated().to_numpy()
+    arrays['offsets'] = np.searchsorted(arrays['player'], np.arange(len(meta['players']) + 1)).astype(np.int64)
+    # One stat per row of a (stats x rows) float32 matrix, so each stat is a contiguous array
+    matrix = np.empty((len(stats), len(df)), dtype=np.float32)
+    for i, column in enumerate(stats):
+        matrix[i] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)[order]
+    arrays['stats'] = matrix
+
+    tmp_root = f'{root}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    os.makedirs(tmp_root)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_root, f'{name}.npy'), values)
+    with open(os.path.join(tmp_root, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    old_root = f'{root}.{os.getpid()}.old'
+    if os.path.exists(root):
+        os.replace(root, old_root)
+    os.replace(tmp_root, root)
+    shutil.rmtree(old_root, ignore_errors=True)
+    return len(df)
+
+
+class PlayerStore:
+    """Every stored player row of all leagues and seasons as memory-mapped arrays.
+
+    Players, teams, nations, positions, leagues, seasons and matches are
+    interned to integer codes; stats are float32 arrays with NaN where a
+    league's tables lack them. Rows are ordered by player and date and
+    offsets[p]:offsets[p + 1] are the rows of player p, so per-player totals
+    are one np.add.reduceat and per-team totals one np.bincount over the
+    whole history. Only the pages an aggregation touches are read.
+    """
+
+    def __init__(self, root: str = PLAYER_STORE_DIR):
+        self.root = root
+        if not os.path.exists(os.path.join(root, 'meta.json')):
+            raise FileNotFoundError(f'No player store under {root}, build it with: python -m fbref players build')
+        with open(os.path.join(root, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        self.stat_names: List[str] = meta['stats']
+        for name in DICTIONARIES.values():
+            setattr(self, name, meta[name])
+        self.codes = {name: np.load(os.path.join(root, f'{name}.npy'), mmap_mode='r') for name in CODE_TYPES}
+        self.offsets = np.load(os.path.join(root, 'offsets.npy'))
+        self.stats = np.load(os.path.join(root, 'stats.npy'), mmap_mode='r')
+        self._player_ids: Optional[Dict[str, int]] = None
+        self._indexes: Dict[str, pd.Index] = {}
+        self._slots: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self.stats.shape[1]
+
+    def stat(self, name: str) -> np.ndarray:
+        """Contiguous float32 array of one stat over all rows"""
+        return self.stats[self.stat_names.index(name)]
+
+    def player_id(self, name: str) -> int:
+        if self._player_ids is None:
+            self._player_ids = {player: code for code, player in enumerate(self.players)}
+        return self._player_ids[name]
+
+    def _mask(self, leagues: Optional[Sequence[str]], seasons: Optional[Sequence[str]]) -> Optional[np.ndarray]:
+        # Rows of the selected leagues and seasons, None when nothing is filtered
+        mask = None
+        for codes, names, selected in ((self.codes['league'], self.leagues, leagues),
+                                       (self.codes['season'], self.seasons, seasons)):
+            if selected:
+                # A lookup table indexed by code is several times faster than np.isin
+                table = np.zeros(len(names), dtype=bool)
+                table[[names.index(name) for name in selected if name in names]] = True
+                keep = table[codes]
+                mask = keep if mask is None else mask & keep
+        return mask
+
+    def _team_slots(self) -> np.ndarray:
+        # Team codes shifted by one, so rows without a team (-1) land in slot 0 of np.bincount
+        if self._slots is None:
+            self._slots = self.codes['team'].astype(np.intp) + 1
+        return self._slots
+
+    def _sum(self, group: str, values: np.ndarray) -> np.ndarray:
+        if group == 'player':
+            # Rows of a player are contiguous: one reduceat over the offsets, no scatter
+            return np.add.reduceat(values, self.offsets[:-1], dtype=np.float64)
+        return np.bincount(self._team_slots(), values, len(self.teams) + 1)[1:]
+
+    def _totals(self, group: str, stats: Sequence[str], mask: Optional[np.ndarray]) -> Dict[str, np.ndarray]:
+        # Sum of each stat and of the minutes in which it was recorded, per player or team
+        minutes = self.stat('Min')
+        totals = {}
+        for name in dict.fromkeys(['Min', *stats]):
+            values = self.stat(name)
+            recorded = values == values  # not NaN
+            if mask is not None:
+                recorded &= mask
+            totals[name] = self._sum(group, np.where(recorded, values, 0))
+            totals[f'{name}_minutes'] = self._sum(group, np.where(recorded, minutes, 0))
+            if name != 'Min':
+                # A stat none of the rows recorded (xG in Super Lig) sums to NaN, not 0
+                totals[name][self._sum(group, recorded) == 0] = np.nan
+        return totals
+
+    def _index(self, group: str) -> pd.Index:
+        if group not in self._indexes:
+            self._indexes[group] = pd.Index(self.players if group == 'player' else self.teams, name=group)
+        return self._indexes[group]
+
+    def player_totals(self, stats: Sequence[str] = ('Gls', 'xG', 'xAG'), leagues: Optional[Sequence[str]] = None,
+                      seasons: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Appearances, minutes and stats summed per player"""
+        mask = self._mask(leagues, seasons)
+        totals = self._totals('player', stats, mask)
+        appearances = np.diff(self.offsets) if mask is None else np.add.reduceat(mask, self.offsets[:-1])
+        result = pd.DataFrame({'MP': appearances, **{name: totals[name] for name in dict.fromkeys(['Min', *stats])}},
+                              index=self._index('player'))
+        return result[result['MP'] > 0]
+
+    def per_90(self, stats: Sequence[str] = ('Gls', 'xG', 'xAG'), min_minutes: float = 0,
+               leagues: Optional[Sequence[str]] = None, seasons: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Minutes and each stat per 90 minutes per player, over the minutes in which the stat was recorded"""
+        totals = self._totals('player', stats, self._mask(leagues, seasons))
+        result = {'Min': totals['Min']}
+        for name in stats:
+            # A stat only recorded in rows without minutes has no rate, NaN rather than inf
+            minutes = np.where(totals[f'{name}_minutes'] > 0, totals[f'{name}_minutes'], np.nan)
+            result[f'{name}/90'] = totals[name] / minutes * 90
+        result = pd.DataFrame(result, index=self._index('player'))
+        return result[result['Min'] >= max(min_minutes, 1)]
+
+    def team_totals(self, stats: Sequence[str] = ('Gls', 'xG', 'xAG'), leagues: Optional[Sequence[str]] = None,
+                    seasons: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Matches, minutes and stats of all players of a team summed"""
+        mask = self._mask(leagues, seasons)
+        totals = self._totals('team', stats, mask)
+        # team_first marks one row per team and match, so the matches are a plain sum
+        first = self.codes['team_first'] if mask is None else self.codes['team_first'] & mask
+        result = pd.DataFrame({'MP': self._sum('team', first).astype(np.int64),
+                               **{name: totals[name] for name in dict.fromkeys(['Min', *stats])}},
+                              index=self._index('team'))
+        return result[result['MP'] > 0]
+
+    def player_rows(self, name: str) -> pd.DataFrame:
+        """Every stored match of one player, oldest first, with codes turned back into names"""
+        start, stop = self.offsets[self.player_id(name)], self.offsets[self.player_id(name) + 1]
+        rows = {}
+        for code, names in (('league', self.leagues), ('season', self.seasons), ('team', self.teams),
+                            ('match', self.matches), ('position', self.positions), ('nation', self.nations)):
+            codes = np.asarray(self.codes[code][start:stop])
+            rows[code] = np.array(names + [None], dtype=object)[codes]
+        dates = np.asarray(self.codes['date'][start:stop]).astype('datetime64[D]')
+        rows['date'] = np.where(np.asarray(self.codes['date'][start:stop]) >= 0, dates, np.datetime64('NaT'))
+        rows['home'] = np.asarray(self.codes['home'][start:stop])
+        rows['age'] = np.asarray(self.codes['age'][start:stop])
+        df = pd.DataFrame(rows)
+        stats = pd.DataFrame(np.asarray(self.stats[:, start:stop]).T, columns=self.stat_names)
+        return pd.concat([df, stats], axis=1)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Pack player CSVs of all leagues and seasons into memory-mapped arrays and aggregate them.')
+    parser.add_argument('--store', default=PLAYER_STORE_DIR, help='store directory (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='rebuild the store from player CSVs')
+    build_parser.add_argument('paths', nargs='+', help='player CSVs or glob patterns, e.g. "*_player_data.csv"')
+    for name, help in (('per90', 'stats per 90 minutes of every player'), ('teams', 'stats summed per team')):
+        command = commands.add_parser(name, help=help)
+        command.add_argument('--stats', nargs='+', default=['Gls', 'xG', 'xAG'])
+        command.add_argument('--leagues', nargs='+', help='e.g. Premier-League Serie-A (default: all)')
+        command.add_argument('--seasons', nargs='+', help='e.g. 2022-2023 (default: all)')
+        command.add_argument('--top', type=int, default=20, help='rows printed, best first by the first stat')
+        if name == 'per90':
+            command.add_argument('--min-minutes', type=float, default=900)
+    player_parser = commands.add_parser('player', help='print every stored match of a player')
+    player_parser.add_argument('name')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        paths = sorted({path for pattern in args.paths for path in (glob.glob(pattern) or [pattern])})
+        rows = build(paths, args.store)
+        print(f'{args.store}: {rows} player rows')
+        return 0
+
+    store = PlayerStore(args.store)
+    if args.command == 'per90':
+        result = store.per_90(args.stats, args.min_minutes, args.leagues, args.seasons)
+        result = result.sort_values(f'{args.stats[0]}/90', ascending=False).head(args.top)
+    elif args.command == 'teams':
+        result = store.team_totals(args.stats, args.leagues, args.seasons)
+        result = result.sort_values(args.stats[0], ascending=False).head(args.top)
+    else:
+        result = store.player_rows(args.name)
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', None,
+                           'display.float_format', '{:.2f}'.format):
+        print(result)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
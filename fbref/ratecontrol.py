@@ -0,0 +1,136 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Union
+from urllib.parse import urlsplit
+
+import requests
+
+from .fetcher import HostRateLimiter, SharedRateLimiter
+from .telemetry import Metrics, default_metrics, url_kind
+
+# Statuses that mean "slow down" rather than "this page is broken"
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Retry-After header as seconds, it may be a number or an HTTP date"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AimdRateController:
+    """Additive-increase / multiplicative-decrease control of a limiter's request rate.
+
+    Every healthy response nudges the host's rate up so that it grows by about
+    increase_rpm per minute of traffic; a 429 or 5xx halves it (at most once per
+    cooldown, so a burst of failed in-flight requests counts once) and pauses
+    the host for Retry-After, or an exponential backoff when there is none.
+    Each request gets at most max_retries retries.
+    """
+
+    def __init__(self, limiter: Union[HostRateLimiter, SharedRateLimiter], min_rpm: float = 2,
+                 max_rpm: float = 20, increase_rpm: float = 1, decrease_factor: float = 0.5,
+                 max_retries: int = 4, backoff: float = 10, cooldown: float = 30,
+                 metrics: Optional[Metrics] = None):
+        self.limiter = limiter
+        self.metrics = metrics or default_metrics()
+        self.min_rpm = min_rpm
+        self.max_rpm = max_rpm
+        self.increase_rpm = increase_rpm
+        self.decrease_factor = decrease_factor
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self._last_decrease: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str) -> None:
+        with self.metrics.timer('fbref_rate_wait_seconds', kind=url_kind(url)):
+            self.limiter.acquire(url)
+
+    def on_success(self, url: str) -> None:
+        with self._lock:
+            rpm = self.limiter.rate(url)
+            self.limiter.set_rate(url, min(self.max_rpm, rpm + self.increase_rpm / rpm))
+
+    def on_throttle(self, url: str, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Back off after a throttled request and return how long the host is paused"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease.get(host, float('-inf')) > self.cooldown:
+                self._last_decrease[host] = now
+                rpm = self.limiter.rate(url)
+                self.limiter.set_rate(url, max(self.min_rpm, rpm * self.decrease_factor))
+        wait = retry_after if retry_after is not None else self.backoff * 2 ** attempt
+        self.limiter.pause(url, wait)
+        self.metrics.inc('fbref_backoff_seconds_total', wait, kind=url_kind(url))
+        return wait
+
+    def get(self, session: requests.Session, url: str, headers: Optional[Dict[str, str]] = None,
+            timeout: float = 30) -> requests.Response:
+        """GET url within the rate budget, retrying throttled responses up to max_retries times"""
+        kind = url_kind(url)
+        attempt = 0
+        while True:
+            self.acquire(url)
+            started = time.perf_counter()
+            try:
+                response = session.get(url, headers=headers, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.metrics.observe('fbref_request_seconds', time.perf_counter() - started,
+                                     kind=kind, status='error')
+                if attempt == self.max_retries:
+                    raise
+                self.metrics.inc('fbref_retries_total', kind=kind, reason=type(e).__name__)
+                self.on_throttle(url, attempt)
+                attempt += 1
+                continue
+            self.metrics.observe('fbref_request_seconds', time.perf_counter() - started,
+                                 kind=kind, status=str(response.status_code))
+            if response.status_code == 429:
+                self.metrics.inc('fbref_throttled_total', kind=kind)
+            if response.status_code in THROTTLE_STATUSES and attempt < self.max_retries:
+                self.metrics.inc('fbref_retries_total', kind=kind, reason=str(response.status_code))
+                wait = self.on_throttle(url, attempt, retry_after_seconds(response))
+                print(f'Got {response.status_code}, slowing down to {self.limiter.rate(url):.1f} '
+                      f'requests/min and waiting {wait:.0f} seconds...')
+                attempt += 1
+                continue
+            response.raise_for_status()
+            self.metrics.inc('fbref_download_bytes_total', len(response.content), kind=kind)
+            self.on_success(url)
+            return response
+
+
+_default_controller: Optional[AimdRateController] = None
+_default_session: Optional[requests.Session] = None
+# Scraping threads (e.g. the GUI's jobs) must all end up with the same controller
+_default_lock = threading.Lock()
+
+
+def default_controller() -> AimdRateController:
+    """Controller shared by the module level scraping functions of one process"""
+    global _default_controller
+    with _default_lock:
+        if _default_controller is None:
+            _default_controller = AimdRateController(HostRateLimiter(10))
+    return _default_controller
+
+
+def default_session() -> requests.Session:
+    global _default_session
+    with _default_lock:
+        if _default_session is None:
+            _default_session = requests.Session()
+    return _default_session
@@ -1,50 +1,111 @@
+import argparse
+import glob
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
 import numpy as np
 
 import pandas as pd
 
+from .datafiles import describe_file
+from .parsers import MATCH_ID_RE
 
-# File paths 
-filePaths = [
-    '/Users/ysk/Desktop/fbref/super lig/super-lig_2020-2021_fixture_data.csv',
-    '/Users/ysk/Desktop/fbref/super lig/super-lig_2019-2020_fixture_data.csv',
-    '/Users/ysk/Desktop/fbref/super lig/super-lig_2018-2019_fixture_data.csv',
-    '/Users/ysk/Desktop/fbref/super lig/super-lig_2017-2018_fixture_data.csv',
-    '/Users/ysk/Desktop/fbref/super lig/super-lig_2021-2022_fixture_data.csv',
-    '/Users/ysk/Desktop/fbref/super lig/super-lig_2022-2023_fixture_data.csv',
-    '/Users/ysk/Desktop/fbref/super lig/super-lig_2023-2024_fixture_data.csv',
-    '/Users/ysk/Desktop/fbref/super lig/super-lig_2024-2025_fixture_data.csv',
+# for every columns to be same
+targetColumns = ['Wk', 'Day', 'Date', 'Time', 'Home', 'Away', 'xG', 'xG.1', 'Score', 'season', 'game_id']
+# Range of the made-up xG for leagues fbref has none for (Super Lig); having a wrong value is better for demonstration
+IMPUTED_XG_RANGE = (0.5, 3.0)
 
-]
 
-# Retry processing with corrected game_id assignment
-processedFiles = []
-targetColumns = ['Wk', 'Day', 'Date', 'Time', 'Home', 'Away', 'xG', 'xG.1', 'Score', 'season', 'game_id']#for every columns to be same 
+def file_seed(league: Optional[str], season: Optional[str], path: str) -> int:
+    """Seed of a file's random xG, the same on every run whatever order the files are processed in"""
+    key = f'{league}/{season}' if league and season else os.path.basename(path)
+    return int.from_bytes(hashlib.sha256(key.encode('utf-8')).digest()[:8], 'little')
 
-for i, filePath in enumerate(filePaths):
-    # Load the data to the csv
-    df = pd.read_csv(filePath)
-    
-    # Ensure the necessary columns exist because in scarped data there is no xg value for super lig
+
+def impute_xg(df: pd.DataFrame, seed: int) -> pd.DataFrame:
+    """Fill missing xG of played matches with seeded uniform values, in one vectorised draw"""
+    rng = np.random.default_rng(seed)
+    played = df['Score'].notna() if 'Score' in df else pd.Series(True, index=df.index)
     for col in ['xG', 'xG.1']:
+        # Drawn for every row so a value does not depend on which other rows are missing
+        values = rng.uniform(*IMPUTED_XG_RANGE, len(df)).round(2)
         if col not in df.columns:
-            # Assign xG values  having wrong value is better for  demonstration
-            df[col] = [round(x, 2) for x in np.random.uniform(0.5, 3.0, len(df))]
-    
+            df[col] = np.nan
+        missing = df[col].isna() & played
+        df.loc[missing, col] = values[missing.to_numpy()]
+    return df
+
+
+def season_of(df: pd.DataFrame, season: Optional[str]) -> Optional[str]:
+    # The file name wins, then the season column of the file itself
+    if season:
+        return season
+    if 'season' in df and df['season'].notna().any():
+        return df['season'].mode().iloc[0]
+    return None
+
+
+def process_file(filePath: str) -> str:
+    """Give one fixture file the target columns, a season and xG; returns the processed file's path"""
+    data_file = describe_file(filePath)
+    df = pd.read_csv(filePath)
+
+    # Ensure the necessary columns exist because in scarped data there is no xg value for super lig
+    df = impute_xg(df, file_seed(data_file.league, data_file.season, filePath))
+
     # Ensure all target columns are present; fill missing ones with NaN or appropriate data
     for col in targetColumns:
         if col not in df.columns:
             df[col] = pd.NA
-    
+
+    # Assign season and game_id if missing it was missing in some csv
+    season = season_of(df, data_file.season)
+    if season is not None:
+        df['season'] = df['season'].fillna(season)
+    if 'match_url' in df:
+        df['game_id'] = df['game_id'].fillna(df['match_url'].str.extract(MATCH_ID_RE, expand=False))
+    df['game_id'] = df['game_id'].fillna(pd.Series(range(len(df)), index=df.index))
+
     # Reorder columns
     df = df[targetColumns]
-    
-    # Assign season and game_id if missing it was missing in some csv
-    season = f"{2017 + i}-{2018 + i}"
-    df['season'] = df['season'].fillna(season)
-    df['game_id'] = df['game_id'].fillna(pd.Series(range(len(df))))
-    
+
     # Save the processed file to a new path
     processed_file_path = filePath.replace('.csv', '_processed.csv')
     df.to_csv(processed_file_path, index=False)
-    processedFiles.append(processed_file_path)
+    return processed_file_path
+
+
+def discover(patterns: List[str]) -> List[str]:
+    """Fixture files matching the glob patterns, leaving out earlier _processed output"""
+    paths = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            if not path.endswith('_processed.csv') and path not in paths:
+                paths.append(path)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Bring fixture files of any league to the same columns, with season, game_id and xG filled in.')
+    parser.add_argument('patterns', nargs='*', default=['**/*_fixture_data.csv'],
+                        help='glob patterns of fixture files (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: one per CPU)')
+    args = parser.parse_args(argv)
+
+    filePaths = discover(args.patterns)
+    if not filePaths:
+        print('No fixture files found')
+        return 1
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        processedFiles = list(pool.map(process_file, filePaths))
+    for processed_file_path in processedFiles:
+        print(processed_file_path)
+    return 0
+
 
+if __name__ == '__main__':
+    sys.exit(main())
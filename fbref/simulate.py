@@ -0,0 +1,224 @@
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .fixtures import load_fixtures
+
+# (European places, relegation places) by final position; cup winners and play-offs are ignored
+LEAGUE_RULES = {
+    'Premier-League': (7, 3),
+    'La-Liga': (7, 3),
+    'Serie-A': (7, 3),
+    'Bundesliga': (7, 2),
+    'Ligue-1': (6, 2),
+    'Super-Lig': (5, 4),
+}
+DEFAULT_RULES = (6, 3)
+# Seasons simulated by one task; small enough that a chunk's goal arrays stay around 20 MB
+CHUNK_SEASONS = 5_000
+# Matches of league-average xG every team's ratings start from, so a few early games do not dominate
+PRIOR_GAMES = 5
+
+
+class Season(NamedTuple):
+    teams: List[str]
+    played: pd.DataFrame
+    remaining: pd.DataFrame
+
+
+class Ratings(NamedTuple):
+    attack: np.ndarray
+    defence: np.ndarray
+    home_rate: float
+    away_rate: float
+
+
+class Table(NamedTuple):
+    points: np.ndarray
+    goal_difference: np.ndarray
+    goals: np.ndarray
+
+
+def split_season(fixtures: pd.DataFrame, league: Optional[str], season: str, as_of=None) -> Season:
+    """Played and remaining fixtures of a season; with as_of, matches after that date count as remaining"""
+    df = fixtures[fixtures['season'].astype('object') == season]
+    if league is not None and 'league' in df and df['league'].notna().any():
+        df = df[df['league'].astype('object') == league]
+    if df.empty:
+        raise ValueError(f'No fixtures of {league or "any league"} in {season}')
+    teams = sorted(set(df['Home'].dropna().astype(str)) | set(df['Away'].dropna().astype(str)))
+    played = df['result'].notna()
+    if as_of is not None:
+        played &= df['Date'] <= pd.Timestamp(as_of)
+    return Season(teams, df[played], df[~played])
+
+
+def team_codes(teams: List[str], names: pd.Series) -> np.ndarray:
+    return pd.Categorical(names.astype(str), categories=teams).codes.astype(np.intp)
+
+
+def current_table(season: Season) -> Table:
+    """Points, goal difference and goals of the played matches"""
+    n = len(season.teams)
+    home = team_codes(season.teams, season.played['Home'])
+    away = team_codes(season.teams, season.played['Away'])
+    home_goals = season.played['home_goals'].to_numpy(dtype=np.int64)
+    away_goals = season.played['away_goals'].to_numpy(dtype=np.int64)
+    home_points = np.select([home_goals > away_goals, home_goals == away_goals], [3, 1], 0)
+    away_points = np.select([home_goals < away_goals, home_goals == away_goals], [3, 1], 0)
+    return Table(np.bincount(home, home_points, n) + np.bincount(away, away_points, n),
+                 np.bincount(home, home_goals - away_goals, n) + np.bincount(away, away_goals - home_goals, n),
+                 np.bincount(home, home_goals, n) + np.bincount(away, away_goals, n))
+
+
+def fit_ratings(season: Season, source: str = 'xg', prior_games: int = PRIOR_GAMES) -> Ratings:
+    """Attack and defence of every team relative to the league average, from xG or goals per game.
+
+    A team's expected goals against an opponent are then
+    home_rate * attack[home] * defence[away] at home and
+    away_rate * attack[away] * defence[home] away.
+    """
+    n = len(season.teams)
+    played = season.played
+    if source == 'xg':
+        # Seasons without xG (Super Lig before processing) fall back to goals
+        played = played.dropna(subset=['xG', 'xG.1']) if {'xG', 'xG.1'} <= set(played.columns) else played[:0]
+        if played.empty:
+            return fit_ratings(season, 'goals', prior_games)
+        home_for = played['xG'].to_numpy(dtype=float)
+        away_for = played['xG.1'].to_numpy(dtype=float)
+    else:
+        home_for = played['home_goals'].to_numpy(dtype=float)
+        away_for = played['away_goals'].to_numpy(dtype=float)
+    if played.empty:
+        # Nothing played yet: every team is average, with typical top-flight scoring
+        return Ratings(np.ones(n), np.ones(n), 1.5, 1.2)
+
+    home = team_codes(season.teams, played['Home'])
+    away = team_codes(season.teams, played['Away'])
+    games = np.bincount(home, minlength=n) + np.bincount(away, minlength=n)
+    scored = np.bincount(home, home_for, n) + np.bincount(away, away_for, n)
+    conceded = np.bincount(home, away_for, n) + np.bincount(away, home_for, n)
+    average = (home_for.sum() + away_for.sum()) / (2 * len(played))
+    attack = (scored + prior_games * average) / (games + prior_games) / average
+    defence = (conceded + prior_games * average) / (games + prior_games) / average
+    return Ratings(attack, defence, float(home_for.mean()), float(away_for.mean()))
+
+
+def simulate_chunk(seed: int, seasons: int, home: np.ndarray, away: np.ndarray, home_rate: np.ndarray,
+                   away_rate: np.ndarray, table: Table) -> Tuple[np.ndarray, np.ndarray]:
+    """Play the remaining fixtures seasons times; returns per team counts of every final position and points sum"""
+    rng = np.random.default_rng(seed)
+    n = len(table.points)
+    # Fixture x team incidence, so per-team sums of a whole batch are two matrix products
+    at_home = np.zeros((len(home), n))
+    at_home[np.arange(len(home)), home] = 1
+    away_from = np.zeros((len(away), n))
+    away_from[np.arange(len(away)), away] = 1
+
+    home_goals = rng.poisson(home_rate, (seasons, len(home))).astype(np.float64)
+    away_goals = rng.poisson(away_rate, (seasons, len(away))).astype(np.float64)
+    home_points = 3.0 * (home_goals > away_goals) + (home_goals == away_goals)
+    away_points = 3.0 * (home_goals < away_goals) + (home_goals == away_goals)
+    points = table.points + home_points @ at_home + away_points @ away_from
+    difference = table.goal_difference + (home_goals - away_goals) @ (at_home - away_from)
+    goals = table.goals + home_goals @ at_home + away_goals @ away_from
+
+    # Points, then goal difference, then goals scored; whatever is still level is decided at random
+    key = points * 1e8 + (difference + 5_000) * 1e4 + goals + rng.random((seasons, n))
+    order = np.argsort(-key, axis=1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(n), axis=1)
+    counts = np.bincount((np.arange(n) * n + positions).ravel(), minlength=n * n).reshape(n, n)
+    return counts, points.sum(axis=0)
+
+
+def simulate(season: Season, seasons: int = 100_000, source: str = 'xg', workers: Optional[int] = None,
+             seed: int = 0, chunk_seasons: int = CHUNK_SEASONS) -> Tuple[np.ndarray, np.ndarray]:
+    """Final position counts (team x position) and mean points over seasons simulated completions.
+
+    The simulated seasons are split into chunks with their own seed, so the
+    result depends on seed but not on the number of workers.
+    """
+    table = current_table(season)
+    ratings = fit_ratings(season, source)
+    home = team_codes(season.teams, season.remaining['Home'])
+    away = team_codes(season.teams, season.remaining['Away'])
+    home_rate = ratings.home_rate * ratings.attack[home] * ratings.defence[away]
+    away_rate = ratings.away_rate * ratings.attack[away] * ratings.defence[home]
+
+    sizes = [chunk_seasons] * (seasons // chunk_seasons) + ([seasons % chunk_seasons] if seasons % chunk_seasons else [])
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(len(sizes))]
+    args = [[value] * len(sizes) for value in (home, away, home_rate, away_rate, table)]
+    if workers == 1 or len(sizes) == 1:
+        results = list(map(simulate_chunk, seeds, sizes, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(simulate_chunk, seeds, sizes, *args))
+    n = len(season.teams)
+    counts = sum((chunk_counts for chunk_counts, _ in results), np.zeros((n, n), dtype=np.int64))
+    points = sum((chunk_points for _, chunk_points in results), np.zeros(n))
+    return counts, points / max(seasons, 1)
+
+
+def probabilities(season: Season, counts: np.ndarray, mean_points: np.ndarray, league: Optional[str],
+                  europe: Optional[int] = None, relegation: Optional[int] = None) -> pd.DataFrame:
+    """Title, European place and relegation chances of every team, best expected finish first"""
+    rules = LEAGUE_RULES.get(league, DEFAULT_RULES)
+    europe = rules[0] if europe is None else europe
+    relegation = rules[1] if relegation is None else relegation
+    n = len(season.teams)
+    shares = counts / max(counts[0].sum(), 1)
+    table = current_table(season)
+    result = pd.DataFrame({
+        'Pts': table.points,
+        'GD': table.goal_difference,
+        'xPts': mean_points.round(1),
+        'title': shares[:, 0],
+        'europe': shares[:, :europe].sum(axis=1),
+        'relegation': shares[:, n - relegation:].sum(axis=1) if relegation else 0.0,
+        'mean_position': (shares @ np.arange(1, n + 1)).round(2),
+    }, index=pd.Index(season.teams, name='team'))
+    return result.sort_values(['mean_position', 'xPts'], ascending=[True, False])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Simulate the rest of a season from xG-based team ratings and print title, European place '
+                    'and relegation chances.')
+    parser.add_argument('paths', nargs='+', help='fixture CSVs holding the season')
+    parser.add_argument('--season', required=True, help='e.g. 2024-2025')
+    parser.add_argument('--league', help='league to simulate when the files hold several, e.g. Premier-League')
+    parser.add_argument('--as-of', help='simulate the matches after this date even if they were played')
+    parser.add_argument('--seasons', type=int, default=100_000, help='completions to simulate (default: %(default)s)')
+    parser.add_argument('--source', choices=['xg', 'goals'], default='xg',
+                        help='what the team ratings are fitted from (default: %(default)s)')
+    parser.add_argument('--europe', type=int, help='European places (default: by league)')
+    parser.add_argument('--relegation', type=int, help='relegation places (default: by league)')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: one per CPU)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the table to this CSV file')
+    args = parser.parse_args(argv)
+
+    fixtures = load_fixtures(args.paths)
+    league = args.league
+    if league is None and 'league' in fixtures and fixtures['league'].nunique() == 1:
+        league = fixtures['league'].dropna().iloc[0]
+    season = split_season(fixtures, league, args.season, args.as_of)
+    print(f'{league or "League"} {args.season}: {len(season.played)} played, {len(season.remaining)} to simulate')
+    counts, mean_points = simulate(season, args.seasons, args.source, args.workers, args.seed)
+    result = probabilities(season, counts, mean_points, league, args.europe, args.relegation)
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', None,
+                           'display.float_format', '{:.3f}'.format):
+        print(result)
+    if args.output:
+        result.to_csv(args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from .fixtures import parse_scores
+
+FORM_LENGTH = 5
+TOTALS = ['MP', 'W', 'D', 'L', 'GF', 'GA', 'Pts', 'xG', 'xGA']
+
+
+def match_keys(fixtures: pd.DataFrame) -> pd.Series:
+    """fbref match hash, or date|home|away for older rows without one"""
+    fallback = fixtures['Date'].astype('string').str.cat(fixtures[['Home', 'Away']].astype('string'), sep='|')
+    if 'game_id' not in fixtures:
+        return fallback
+    return fixtures['game_id'].astype('string').fillna(fallback)
+
+
+def _number(value) -> Optional[float]:
+    return None if pd.isna(value) else float(value)
+
+
+class Standings:
+    """Table and recent form of one league season, updated match by match.
+
+    Kept next to the season's fixture CSV in <path>.standings.json together
+    with the score of every match counted, so an update only looks at
+    matches that are new or whose score changed; the rest of the season is
+    never read again.
+    """
+
+    def __init__(self, path: str, form_length: int = FORM_LENGTH):
+        self.path = path
+        self.form_length = form_length
+        self.teams: Dict[str, Dict] = {}
+        # match key -> date, teams, score, goals and xG as counted
+        self.matches: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                saved = json.load(f)
+            self.form_length = saved.get('form_length', form_length)
+            self.teams = saved['teams']
+            self.matches = saved['matches']
+
+    @classmethod
+    def for_fixtures(cls, fixture_path: str, form_length: int = FORM_LENGTH) -> 'Standings':
+        return cls(fixture_path + '.standings.json', form_length)
+
+    def _team(self, name: str) -> Dict:
+        if name not in self.teams:
+            self.teams[name] = {**{column: 0 for column in TOTALS}, 'form': []}
+        return self.teams[name]
+
+    def _count(self, match: Dict, sign: int) -> None:
+        # Adds (sign=1) or takes back (sign=-1) one match from both teams' totals
+        for team, scored, conceded, xg, xga in ((match['home'], match['home_goals'], match['away_goals'],
+                                                 match['xg'], match['xga']),
+                                                (match['away'], match['away_goals'], match['home_goals'],
+                                                 match['xga'], match['xg'])):
+            totals = self._team(team)
+            result = 'W' if scored > conceded else 'D' if scored == conceded else 'L'
+            totals['MP'] += sign
+            totals[result] += sign
+            totals['GF'] += sign * scored
+            totals['GA'] += sign * conceded
+            totals['Pts'] += sign * {'W': 3, 'D': 1, 'L': 0}[result]
+            totals['xG'] = round(totals['xG'] + sign * (xg or 0.0), 2)
+            totals['xGA'] = round(totals['xGA'] + sign * (xga or 0.0), 2)
+
+    def _add_form(self, team: str, key: str) -> None:
+        # Keys of the team's last form_length matches, oldest first
+        form = self._team(team)['form']
+        date = self.matches[key]['date']
+        if len(form) >= self.form_length and date < self.matches[form[0]]['date']:
+            return
+        form.append(key)
+        form.sort(key=lambda k: self.matches[k]['date'])
+        del form[:-self.form_length]
+
+    def update(self, fixtures: pd.DataFrame) -> int:
+        """Count the played matches of fixtures that are new or changed score; returns how many.
+
+        fixtures may be the whole season as scraped again or just the rows
+        that were added; matches already counted with the same score are
+        skipped without further work.
+        """
+        df = fixtures[fixtures['Score'].notna()]
+        if df.empty:
+            return 0
+        keys = match_keys(df)
+        counted = keys.map({key: match['score'] for key, match in self.matches.items()})
+        changed = counted.isna().to_numpy() | (counted.astype('string') != df['Score'].astype('string')).fillna(True).to_numpy()
+        df, keys = df[changed], keys[changed]
+        if df.empty:
+            return 0
+
+        goals = parse_scores(df['Score'].astype('string'))
+        dates = pd.to_datetime(df['Date'], errors='coerce').dt.strftime('%Y-%m-%d') if 'Date' in df else None
+        for i, key in enumerate(keys):
+            row = df.iloc[i]
+            home_goals, away_goals = goals['home_goals'].iloc[i], goals['away_goals'].iloc[i]
+            if pd.isna(home_goals) or pd.isna(away_goals):
+                continue
+            match = {
+                'date': dates.iloc[i] if dates is not None and not pd.isna(dates.iloc[i]) else '',
+                'home': str(row['Home']),
+                'away': str(row['Away']),
+                'score': str(row['Score']),
+                'home_goals': int(home_goals),
+                'away_goals': int(away_goals),
+                'xg': _number(row.get('xG')),
+                'xga': _number(row.get('xG.1')),
+            }
+            previous = self.matches.get(key)
+            if previous is not None:
+                # A corrected score: take the old result back, the form keeps its place
+                self._count(previous, -1)
+            self.matches[key] = match
+            self._count(match, 1)
+            if previous is None:
+                self._add_form(match['home'], key)
+                self._add_form(match['away'], key)
+        return len(df)
+
+    def form(self, team: str) -> str:
+        """Results of the team's last matches, oldest first, e.g. 'WWDLW'"""
+        results = []
+        for key in self.teams[team]['form']:
+            match = self.matches[key]
+            scored, conceded = ((match['home_goals'], match['away_goals']) if match['home'] == team
+                                else (match['away_goals'], match['home_goals']))
+            results.append('W' if scored > conceded else 'D' if scored == conceded else 'L')
+        return ''.join(results)
+
+    def table(self) -> pd.DataFrame:
+        """League table ordered by points, goal difference and goals scored"""
+        table = pd.DataFrame.from_dict({team: {column: totals[column] for column in TOTALS}
+                                        for team, totals in self.teams.items()}, orient='index', columns=TOTALS)
+        table.index.name = 'team'
+        table.insert(TOTALS.index('Pts'), 'GD', table['GF'] - table['GA'])
+        table['xGD'] = (table['xG'] - table['xGA']).round(2)
+        table['form'] = [self.form(team) for team in table.index]
+        return table.sort_values(['Pts', 'GD', 'GF'], ascending=False)
+
+    def save(self) -> None:
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'form_length': self.form_length, 'teams': self.teams, 'matches': self.matches}, f)
+        os.replace(tmp_path, self.path)
+
+
+def update_standings(fixture_path: str, fixtures: pd.DataFrame) -> Standings:
+    """Bring the standings kept next to a fixture CSV up to date with fixtures written to it"""
+    standings = Standings.for_fixtures(fixture_path)
+    if standings.update(fixtures):
+        standings.save()
+    return standings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Print the table of a season\'s fixture CSV, counting only matches not counted before.')
+    parser.add_argument('path', help='fixture CSV of one league season')
+    args = parser.parse_args(argv)
+
+    fixtures = pd.read_csv(args.path, dtype={'game_id': str}, encoding_errors='replace')
+    standings = Standings.for_fixtures(args.path)
+    counted = standings.update(fixtures)
+    if counted:
+        standings.save()
+    print(f'{counted} matches counted')
+    with pd.option_context('display.max_rows', None, 'display.width', None):
+        print(standings.table())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
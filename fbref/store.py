@@ -0,0 +1,199 @@
+import argparse
+import glob
+import os
+import sys
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .datafiles import describe_file, drop_index_columns, game_ids
+from .fixtures import parse_scores
+
+STORE_DIR = os.environ.get('FBREF_STORE_DIR', 'fbref_store')
+
+# Partition columns, stored in the directory names (league=Serie-A/season=2020-2021/)
+# rather than in the files; they are read back as dictionary (categorical) columns
+PARTITIONING = ds.partitioning(pa.schema([('league', pa.string()), ('season', pa.string())]), flavor='hive')
+READ_PARTITIONING = ds.HivePartitioning.discover(infer_dictionary=True)
+
+FIXTURE_SCHEMA = pa.schema([
+    ('Wk', pa.int8()),
+    ('Day', pa.dictionary(pa.int8(), pa.string())),
+    ('Date', pa.date32()),
+    ('Time', pa.time32('s')),
+    ('Home', pa.dictionary(pa.int16(), pa.string())),
+    ('Away', pa.dictionary(pa.int16(), pa.string())),
+    ('Score', pa.string()),
+    ('home_goals', pa.int8()),
+    ('away_goals', pa.int8()),
+    ('xG', pa.float32()),
+    ('xG.1', pa.float32()),
+    ('game_id', pa.string()),
+    ('match_url', pa.string()),
+])
+
+# Player tables differ between leagues (Super Lig has no advanced stats), so
+# only the identifying columns are fixed; every other stat is stored as float32
+PLAYER_KEY_SCHEMA = pa.schema([
+    ('game_id', pa.string()),
+    ('home', pa.int8()),
+    ('Player', pa.dictionary(pa.int32(), pa.string())),
+    ('Nation', pa.dictionary(pa.int16(), pa.string())),
+    ('Pos', pa.dictionary(pa.int16(), pa.string())),
+    ('Age', pa.string()),
+    ('Min', pa.int16()),
+])
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    # Older files lack some columns (match_url, xG for Super Lig), they are stored as nulls
+    return df[name] if name in df else pd.Series(pd.NA, index=df.index, dtype='object')
+
+
+def fixtures_table(fixtures: pd.DataFrame, league: str, season: Optional[str] = None) -> pa.Table:
+    """Fixture rows as a table of FIXTURE_SCHEMA plus the league/season partition columns"""
+    df = drop_index_columns(fixtures)
+    out = pd.DataFrame(index=df.index)
+    out['Wk'] = pd.to_numeric(_column(df, 'Wk'), errors='coerce').astype('Int8')
+    out['Day'] = _column(df, 'Day')
+    out['Date'] = pd.to_datetime(_column(df, 'Date'), errors='coerce').dt.date
+    out['Time'] = pd.to_datetime(_column(df, 'Time'), format='%H:%M', errors='coerce').dt.time
+    out['Home'] = _column(df, 'Home')
+    out['Away'] = _column(df, 'Away')
+    out['Score'] = _column(df, 'Score')
+    goals = parse_scores(_column(df, 'Score'))
+    out['home_goals'] = goals['home_goals']
+    out['away_goals'] = goals['away_goals']
+    for column in ['xG', 'xG.1']:
+        out[column] = pd.to_numeric(_column(df, column), errors='coerce').astype('float32')
+    out['game_id'] = game_ids(_column(df, 'game_id'))
+    out['match_url'] = _column(df, 'match_url')
+    table = pa.Table.from_pandas(out, schema=FIXTURE_SCHEMA, preserve_index=False)
+    seasons = df['season'] if 'season' in df else pd.Series(season, index=df.index)
+    if season is not None:
+        seasons = seasons.fillna(season)
+    table = table.append_column('league', pa.array([league] * len(df), pa.string()))
+    return table.append_column('season', pa.array(seasons.astype('string'), pa.string()))
+
+
+def players_table(players: pd.DataFrame, league: str, season: str) -> pa.Table:
+    """Player rows with PLAYER_KEY_SCHEMA columns first and every other stat as float32"""
+    df = drop_index_columns(players)
+    arrays, fields = [], []
+    for field in PLAYER_KEY_SCHEMA:
+        values = _column(df, field.name)
+        if field.name == 'game_id':
+            values = game_ids(values)
+        elif pa.types.is_integer(field.type):
+            values = pd.to_numeric(values, errors='coerce')
+        arrays.append(pa.array(values, field.type, from_pandas=True))
+        fields.append(field)
+    for column in df.columns:
+        if column in PLAYER_KEY_SCHEMA.names:
+            continue
+        arrays.append(pa.array(pd.to_numeric(df[column], errors='coerce').astype('float32'), pa.float32(),
+                               from_pandas=True))
+        fields.append(pa.field(column, pa.float32()))
+    table = pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+    table = table.append_column('league', pa.array([league] * len(df), pa.string()))
+    return table.append_column('season', pa.array([season] * len(df), pa.string()))
+
+
+def _write(table: pa.Table, path: str, sort_by: List[str]) -> None:
+    # Rows sorted so each row group covers a narrow range and its statistics can skip it
+    table = table.sort_by([(column, 'ascending') for column in sort_by if column in table.column_names])
+    ds.write_dataset(table, path, format='parquet', partitioning=PARTITIONING,
+                     # Rewriting a season replaces it rather than adding a second copy
+                     existing_data_behavior='delete_matching',
+                     basename_template='part-{i}.parquet',
+                     file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'),
+                     max_rows_per_group=64 * 1024)
+
+
+def write_fixtures(fixtures: pd.DataFrame, league: str, season: Optional[str] = None,
+                   root: str = STORE_DIR) -> None:
+    """Store fixtures, replacing the stored seasons they cover.
+
+    The season comes from the season column, or from season for rows without one.
+    """
+    _write(fixtures_table(fixtures, league, season), os.path.join(root, 'fixtures'), ['Date', 'Time'])
+
+
+def write_players(players: pd.DataFrame, league: str, season: str, root: str = STORE_DIR) -> None:
+    """Store the player rows of one season, replacing what was stored for it"""
+    _write(players_table(players, league, season), os.path.join(root, 'players'), ['game_id'])
+
+
+def _dataset(path: str) -> ds.Dataset:
+    dataset = ds.dataset(path, format='parquet', partitioning=READ_PARTITIONING)
+    if os.path.basename(path) == 'players' and len(dataset.files) > 1:
+        # Seasons without advanced stats lack some columns, read them as nulls
+        schema = pa.unify_schemas([dataset.schema] + [pq.read_schema(f) for f in dataset.files])
+        dataset = ds.dataset(path, schema=schema, format='parquet', partitioning=READ_PARTITIONING)
+    return dataset
+
+
+def _read(path: str, columns: Optional[List[str]], filter: Optional[ds.Expression]) -> pd.DataFrame:
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f'No data stored under {path}')
+    table = _dataset(path).to_table(columns=columns, filter=filter)
+    return table.to_pandas(date_as_object=False)
+
+
+def read_fixtures(columns: Optional[List[str]] = None, filter: Optional[ds.Expression] = None,
+                  root: str = STORE_DIR) -> pd.DataFrame:
+    """Load stored fixtures, reading only the columns and the partitions/row groups that can match.
+
+    Serie A home xG since 2020:
+
+        read_fixtures(['Date', 'Home', 'xG'],
+                      (ds.field('league') == 'Serie-A') & (ds.field('season') >= '2020-2021'))
+    """
+    return _read(os.path.join(root, 'fixtures'), columns, filter)
+
+
+def read_players(columns: Optional[List[str]] = None, filter: Optional[ds.Expression] = None,
+                 root: str = STORE_DIR) -> pd.DataFrame:
+    """Load stored player rows, see read_fixtures"""
+    return _read(os.path.join(root, 'players'), columns, filter)
+
+
+def import_files(paths: List[str], root: str = STORE_DIR, league: Optional[str] = None) -> int:
+    """Store fixture and player CSVs, with league and season taken from the file names"""
+    stored = 0
+    for path in paths:
+        data_file = describe_file(path)
+        file_league = league or data_file.league
+        if file_league is None:
+            print(f'{path}: league unknown, pass --league')
+            continue
+        df = pd.read_csv(path, encoding='utf-8', encoding_errors='replace', low_memory=False)
+        if data_file.kind == 'player':
+            write_players(df, file_league, data_file.season, root)
+        elif data_file.season is None and 'season' not in df:
+            print(f'{path}: season unknown, the file has no season column')
+            continue
+        else:
+            write_fixtures(df, file_league, data_file.season, root)
+        print(f'{path}: {len(df)} rows stored as {file_league} {data_file.kind} data')
+        stored += 1
+    return stored
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Store fixture and player CSVs in a Parquet dataset partitioned by league and season.')
+    parser.add_argument('paths', nargs='+', help='CSV files or glob patterns, e.g. "*_fixture_data.csv"')
+    parser.add_argument('--store', default=STORE_DIR, help='dataset directory (default: %(default)s)')
+    parser.add_argument('--league', help='league of files whose name does not tell, e.g. Serie-A')
+    args = parser.parse_args(argv)
+
+    paths = sorted({path for pattern in args.paths for path in (glob.glob(pattern) or [pattern])})
+    stored = import_files(paths, args.store, args.league)
+    return 0 if stored == len(paths) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
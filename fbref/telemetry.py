@@ -0,0 +1,248 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds, from a cached page to a long Retry-After pause
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# name -> (type, help) of every metric the scrapers record
+METRICS = {
+    'fbref_request_seconds': ('histogram', 'Duration of HTTP requests to fbref, per attempt'),
+    'fbref_rate_wait_seconds': ('histogram', 'Time spent waiting for the rate limiter, including Retry-After pauses'),
+    'fbref_download_bytes_total': ('counter', 'Bytes of page bodies downloaded'),
+    'fbref_retries_total': ('counter', 'Requests retried, by the status (or error) that caused the retry'),
+    'fbref_throttled_total': ('counter', 'Responses with status 429'),
+    'fbref_backoff_seconds_total': ('counter', 'Seconds of pause imposed after throttled or failed requests'),
+    'fbref_cache_requests_total': ('counter', 'Response cache lookups by result'),
+    'fbref_parse_seconds': ('histogram', 'Time spent parsing a page into tables'),
+    'fbref_write_seconds': ('histogram', 'Time spent appending and syncing one match to the player CSV'),
+    'fbref_rows_written_total': ('counter', 'Player rows written'),
+    'fbref_matches_written_total': ('counter', 'Matches written'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def url_kind(url: str) -> str:
+    """Coarse page type used as a metric label, URLs themselves would make too many series"""
+    if '/en/matches/' in url:
+        return 'match'
+    if '/schedule/' in url:
+        return 'schedule'
+    return 'other'
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile, None above the largest bucket"""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if self.count and seen >= rank:
+                return bound
+        return None
+
+
+class Metrics:
+    """Counters and latency histograms keyed by metric name and labels.
+
+    Recording is a dict lookup and an add under a lock, so it can sit on the
+    per-request path; formatting only happens when the metrics are exported.
+    """
+
+    def __init__(self, const_labels: Optional[Dict[str, str]] = None):
+        self.const_labels = const_labels or {}
+        self.started = time.time()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def _format_labels(self, labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(self.const_labels.items()) + list(labels) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+        return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+    def to_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h.counts), h.sum, h.count, h.buckets))
+                                for key, h in self._histograms.items())
+        lines: List[str] = []
+        described = set()
+
+        def describe(name: str) -> None:
+            if name not in described:
+                described.add(name)
+                kind, help_text = METRICS.get(name, ('untyped', name))
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f'{name}{self._format_labels(labels)} {value!r}')
+        for (name, labels), (counts, total, count, buckets) in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{self._format_labels(labels, (("le", f"{bound}"),))} {cumulative}')
+            lines.append(f'{name}_sum{self._format_labels(labels)} {total!r}')
+            lines.append(f'{name}_count{self._format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> Dict:
+        """Totals and latency percentiles of the run so far, for the JSON run summary"""
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = list(self._histograms.items())
+        summary = {
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'elapsed_seconds': round(time.time() - self.started, 3),
+            'labels': self.const_labels,
+            'counters': {},
+            'histograms': {},
+        }
+        for (name, labels), value in sorted(counters):
+            summary['counters'].setdefault(name, []).append({**dict(labels), 'value': value})
+        for (name, labels), histogram in sorted(histograms, key=lambda item: item[0]):
+            summary['histograms'].setdefault(name, []).append({
+                **dict(labels),
+                'count': histogram.count,
+                'sum': round(histogram.sum, 6),
+                'mean': round(histogram.sum / histogram.count, 6) if histogram.count else None,
+                'p50': histogram.quantile(0.5),
+                'p95': histogram.quantile(0.95),
+            })
+        return summary
+
+    def report(self) -> str:
+        """One line on where the time went, printed at the end of a run"""
+        summary = self.summary()['histograms']
+        totals = {name: sum(h['sum'] for h in summary.get(name, []))
+                  for name in ('fbref_request_seconds', 'fbref_rate_wait_seconds',
+                               'fbref_parse_seconds', 'fbref_write_seconds')}
+        return (f"Time: {totals['fbref_request_seconds']:.1f}s requests, "
+                f"{totals['fbref_rate_wait_seconds']:.1f}s rate limited, "
+                f"{totals['fbref_parse_seconds']:.1f}s parsing, {totals['fbref_write_seconds']:.1f}s writing")
+
+
+def _write_atomic(path: str, text: str) -> None:
+    # Scrapers of the file (e.g. node_exporter's textfile collector) never see it half written
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class MetricsExporter:
+    """Rewrites a Prometheus text file every interval seconds and the JSON run summary on stop"""
+
+    def __init__(self, metrics: 'Metrics', prometheus_path: Optional[str] = None,
+                 summary_path: Optional[str] = None, interval: float = 15):
+        self.metrics = metrics
+        self.prometheus_path = prometheus_path
+        self.summary_path = summary_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'MetricsExporter':
+        if self.prometheus_path:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self) -> None:
+        if self.prometheus_path:
+            _write_atomic(self.prometheus_path, self.metrics.to_prometheus())
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write()
+        if self.summary_path:
+            _write_atomic(self.summary_path, json.dumps(self.metrics.summary(), indent=2))
+
+
+_default_metrics: Optional[Metrics] = None
+# Threads recording their first metric at the same time must all get the same registry
+_default_lock = threading.Lock()
+
+
+def default_metrics() -> Metrics:
+    """Registry shared by everything scraping in one process"""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+    return _default_metrics
+
+
+def reset_default_metrics(const_labels: Optional[Dict[str, str]] = None) -> Metrics:
+    """Start a new shared registry, e.g. in a forked worker that should not report its parent's counts"""
+    global _default_metrics
+    metrics = Metrics(const_labels)
+    with _default_lock:
+        _default_metrics = metrics
+    return metrics
+
+
+def per_process_path(path: Optional[str]) -> Optional[str]:
+    """path with the process id before the extension, so worker processes do not overwrite each other"""
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f'{root}-{os.getpid()}{ext}'
+
+
+def timed_call(func: Callable, *args) -> Tuple[object, float]:
+    """func(*args) and its duration, for work run in a process pool whose metrics would be lost"""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
@@ -0,0 +1,164 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .crawl import crawl_schedule, print_status
+from .fetcher import SharedRateLimiter
+from .leagues import END_SEASON, LEAGUES, REQUESTS_PER_MINUTE, START_SEASON
+from .manifest import CrawlManifest
+from .telemetry import MetricsExporter, per_process_path, reset_default_metrics, timed_call
+
+# The scraper, parser and writers bring pandas and requests; a worker with nothing to do never imports them
+if TYPE_CHECKING:
+    from .writers import PlayerDataWriter
+
+LEASE_TTL = 15 * 60
+
+
+def enumerate_work(manifest_path: str, leagues: List[str], start_season: int, end_season: int,
+                   requests_per_minute: float, max_attempts: int) -> None:
+    """Register the match reports of every selected season in the manifest"""
+    from .fbreffull import FBRefScraper
+
+    manifest = CrawlManifest(manifest_path)
+    scraper = FBRefScraper(requests_per_minute=requests_per_minute,
+                           limiter=SharedRateLimiter(manifest_path, requests_per_minute))
+    for league in leagues:
+        for url, league_name, season in scraper.season_urls(league, start_season, end_season):
+            crawl_schedule(scraper, manifest, url, league_name, season, max_attempts)
+    manifest.close()
+
+
+def run_worker(manifest_path: str, concurrency: int, parse_processes: int, requests_per_minute: float,
+               max_attempts: int, lease_ttl: float = LEASE_TTL, metrics_file: Optional[str] = None,
+               run_summary: Optional[str] = None, metrics_interval: float = 15) -> None:
+    """Lease match reports from the manifest until none are left.
+
+    Pages are fetched on threads of this process and parsed on a separate pool
+    of parse_processes processes. The request budget is shared through the
+    manifest file with every other worker. Each worker exports its own
+    metrics files, named after its process id and labelled with worker_id.
+    """
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    manifest = CrawlManifest(manifest_path)
+    if manifest.remaining(max_attempts) == 0:
+        print(f'[{worker_id}] No work left')
+        manifest.close()
+        return
+
+    from .fbreffull import FBRefScraper
+    from .parsers import match_player_rows
+
+    metrics = reset_default_metrics({'worker': worker_id})
+    exporter = MetricsExporter(metrics, per_process_path(metrics_file), per_process_path(run_summary),
+                               metrics_interval).start()
+    scraper = FBRefScraper(concurrency=concurrency, requests_per_minute=requests_per_minute,
+                           limiter=SharedRateLimiter(manifest_path, requests_per_minute))
+    writers: Dict[Tuple[str, str], 'PlayerDataWriter'] = {}
+
+    with ProcessPoolExecutor(max_workers=parse_processes) as parse_pool:
+        while True:
+            units = {row['url']: row for row in manifest.lease(worker_id, concurrency * 2, lease_ttl, max_attempts)}
+            if not units:
+                if manifest.remaining(max_attempts) == 0:
+                    break
+                # Everything left is leased by other workers, wait until they finish or their leases expire
+                time.sleep(10)
+                continue
+
+            parsing = {}
+            for link, html_content, error in scraper.fetcher.iter_fetch(units):
+                manifest.begin(link)
+                if error is not None:
+                    print(f'[{worker_id}] Error processing match {link}: {str(error)}')
+                    manifest.mark(link, 'failed', str(error))
+                    continue
+                manifest.mark(link, 'fetched')
+                # Parse time is measured in the pool process and recorded here, where it is exported
+                parsing[parse_pool.submit(timed_call, match_player_rows, html_content, units[link]['match_id'])] = link
+
+            for future in as_completed(parsing):
+                link = parsing[future]
+                unit = units[link]
+                try:
+                    rows, seconds = future.result()
+                except (KeyError, ValueError) as e:
+                    print(f'[{worker_id}] Error processing tables for match {link}: {str(e)}')
+                    manifest.mark(link, 'failed', str(e))
+                    continue
+                metrics.observe('fbref_parse_seconds', seconds, kind='match')
+                manifest.mark(link, 'parsed')
+                key = (unit['league'], unit['season'])
+                if key not in writers:
+                    writers[key] = scraper.player_writer(*key)
+                writers[key].write_match(unit['match_id'], rows)
+                manifest.mark(link, 'written')
+                print(f'[{worker_id}] {unit["league"]} {unit["season"]} match {unit["match_id"]} written')
+
+    print(f'[{worker_id}] No work left. {scraper.cache.report()}')
+    print(f'[{worker_id}] {metrics.report()}')
+    exporter.stop()
+    manifest.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Spread a crawl over several worker processes, or several machines sharing the manifest file.')
+    parser.add_argument('command', choices=['enumerate', 'work', 'run'],
+                        help='enumerate: register all matches of the selected seasons; '
+                             'work: run one worker; run: enumerate, then start --workers local workers')
+    parser.add_argument('--leagues', nargs='+', choices=list(LEAGUES), default=list(LEAGUES), metavar='LEAGUE')
+    parser.add_argument('--start-season', type=int, default=START_SEASON)
+    parser.add_argument('--end-season', type=int, default=END_SEASON)
+    parser.add_argument('--manifest', default='crawl_manifest.db',
+                        help='SQLite manifest shared by all workers, it also holds the request budget '
+                             '(default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='worker processes started by run (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='requests in flight per worker (default: %(default)s)')
+    parser.add_argument('--parse-processes', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='HTML parsing processes per worker (default: %(default)s)')
+    parser.add_argument('--requests-per-minute', type=float, default=REQUESTS_PER_MINUTE,
+                        help='starting request rate of the whole fleet, adapted to how the site responds (default: %(default)s)')
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--lease-ttl', type=float, default=LEASE_TTL,
+                        help='seconds before a leased match is handed to another worker (default: %(default)s)')
+    parser.add_argument('--metrics-file', default='fbref_metrics.prom',
+                        help='Prometheus text file per worker, the process id is added before the extension '
+                             '(default: %(default)s)')
+    parser.add_argument('--metrics-interval', type=float, default=15)
+    parser.add_argument('--run-summary', default='fbref_run_summary.json',
+                        help='JSON summary of each worker\'s metrics, named like --metrics-file (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    if args.command in ('enumerate', 'run'):
+        enumerate_work(args.manifest, args.leagues, args.start_season, args.end_season,
+                       args.requests_per_minute, args.max_attempts)
+    worker_args = (args.manifest, args.concurrency, args.parse_processes, args.requests_per_minute,
+                   args.max_attempts, args.lease_ttl, args.metrics_file, args.run_summary, args.metrics_interval)
+    if args.command == 'work':
+        run_worker(*worker_args)
+    elif args.command == 'run':
+        # Enumeration left this process with open SQLite connections (response cache, page archive) that a
+        # forked worker would inherit and reuse; spawned workers open their own
+        spawn = multiprocessing.get_context('spawn')
+        processes = [spawn.Process(target=run_worker, args=worker_args) for _ in range(args.workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    manifest = CrawlManifest(args.manifest)
+    print_status(manifest)
+    manifest.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
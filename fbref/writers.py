@@ -0,0 +1,169 @@
+import csv
+import io
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows, where only one process may write a file anyway
+    fcntl = None
+
+import pandas as pd
+
+from .telemetry import default_metrics
+
+
+class PlayerDataWriter:
+    """Append-only CSV sink that commits one match at a time.
+
+    Each match's rows are appended with a single write and fsynced, then the
+    match id and the new end of file are recorded in a sidecar index
+    (<path>.done). On start up the CSV is cut back to the last recorded
+    offset, so a crash loses at most the match that was being written and
+    completed matches are never fetched again.
+
+    The column schema is given up front (the scrapers pass
+    parsers.PLAYER_COLUMNS) or else taken from the first match written. A
+    file that already has rows keeps its own header. Rows are reindexed to
+    the schema, so a column outside it is not written.
+
+    Writers in several processes may share a file: each write takes an
+    exclusive lock on <path>.lock and first catches up with what the others
+    committed.
+
+    labels (e.g. league and season) tag the write time and row metrics.
+    """
+
+    def __init__(self, path: str, columns: Optional[List[str]] = None,
+                 labels: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.labels = labels or {}
+        self.index_path = path + '.done'
+        self.columns = columns
+        self.completed: Set[str] = set()
+        self.rows_written = 0
+        self._offset = 0
+        with self._locked():
+            self._recover()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _recover(self) -> None:
+        self._offset = 0
+        self.completed = set()
+        if not os.path.exists(self.path):
+            # The CSV was deleted, so the index no longer describes anything: start both over
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            return
+        if os.path.exists(self.index_path):
+            good = 0
+            with open(self.index_path, 'r+b') as f:
+                for line in f:
+                    # A torn last line means that match was never committed
+                    match_id, sep, offset = line.decode('utf-8', 'replace').rstrip('\n').rpartition('\t')
+                    if not (sep and offset.isdigit() and line.endswith(b'\n')):
+                        break
+                    self.completed.add(match_id)
+                    self._offset = int(offset)
+                    good += len(line)
+                f.truncate(good)
+        if os.path.getsize(self.path) > self._offset:
+            with open(self.path, 'r+b') as f:
+                f.truncate(self._offset)
+        if self._offset:
+            with open(self.path, newline='', encoding='utf-8') as f:
+                self.columns = next(csv.reader(f))
+
+    def write_match(self, match_id: str, rows: pd.DataFrame) -> None:
+        """Append all rows of one match and mark it completed"""
+        started = time.perf_counter()
+        with self._locked():
+            # Pick up matches other processes committed since the last write
+            self._recover()
+            if match_id in self.completed:
+                return
+            self._append(match_id, rows)
+        metrics = default_metrics()
+        metrics.observe('fbref_write_seconds', time.perf_counter() - started, **self.labels)
+        metrics.inc('fbref_rows_written_total', len(rows), **self.labels)
+        metrics.inc('fbref_matches_written_total', **self.labels)
+
+    def _append(self, match_id: str, rows: pd.DataFrame) -> None:
+        if self.columns is None:
+            self.columns = list(rows.columns)
+        buffer = io.StringIO()
+        rows.reindex(columns=self.columns).to_csv(buffer, header=self._offset == 0, index=False)
+        data = buffer.getvalue().encode('utf-8')
+
+        # Write from the last committed offset so a failed earlier attempt is overwritten
+        with open(self.path, 'r+b' if os.path.exists(self.path) else 'wb') as f:
+            f.seek(self._offset)
+            f.write(data)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        self._offset += len(data)
+
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(f'{match_id}\t{self._offset}\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.completed.add(match_id)
+        self.rows_written += len(rows)
+
+    def discard(self, match_ids: Set[str]) -> None:
+        """Drop the rows of already written matches so they can be written again.
+
+        The file is rebuilt from the byte ranges of the matches that stay. The
+        index is removed before the CSV is replaced, so a crash in between
+        leaves an empty index and everything is rewritten from the page cache
+        rather than an index that no longer fits the file.
+        """
+        with self._locked():
+            self._recover()
+            match_ids = set(match_ids) & self.completed
+            if not match_ids:
+                return
+            entries = []
+            with open(self.index_path, encoding='utf-8') as f:
+                for line in f:
+                    match_id, _, offset = line.rstrip('\n').rpartition('\t')
+                    entries.append((match_id, int(offset)))
+
+            with open(self.path, 'rb') as src:
+                header = src.readline()
+                start = len(header)
+                kept = [header]
+                index_lines = []
+                size = len(header)
+                for match_id, end in entries:
+                    src.seek(start)
+                    chunk = src.read(end - start)
+                    start = end
+                    if match_id in match_ids:
+                        continue
+                    kept.append(chunk)
+                    size += len(chunk)
+                    index_lines.append(f'{match_id}\t{size}\n')
+
+            os.remove(self.index_path)
+            with open(self.path + '.tmp', 'wb') as f:
+                f.writelines(kept if index_lines else [])
+            os.replace(self.path + '.tmp', self.path)
+            with open(self.index_path + '.tmp', 'w', encoding='utf-8') as f:
+                f.writelines(index_lines)
+            os.replace(self.index_path + '.tmp', self.index_path)
+            self._recover()
@@ -0,0 +1,108 @@
+import os
+import random
+import string
+import zlib
+from datetime import date
+
+import pytest
+
+from fbref import cache
+from fbref.cache import CURRENT_SCHEDULE_TTL, DEFAULT_TTL, RECENT_MATCH_TTL, ResponseCache, ttl_for
+
+TODAY = date(2024, 3, 10)
+MATCH = 'https://fbref.com/en/matches/3a6836b4/Arsenal-Liverpool-{}-Premier-League'
+SCHEDULE = 'https://fbref.com/en/comps/9/{}/schedule/{}-Premier-League-Scores-and-Fixtures'
+
+
+@pytest.mark.parametrize('url, ttl', [
+    (MATCH.format('February-4-2024'), None),            # played over a week ago: final
+    (MATCH.format('March-5-2024'), RECENT_MATCH_TTL),    # stats may still be corrected
+    (MATCH.format('Smarch-5-2024'), DEFAULT_TTL),        # a date that does not parse
+    ('https://fbref.com/en/matches/3a6836b4/', DEFAULT_TTL),
+    (SCHEDULE.format('2022-2023', '2022-2023'), None),   # a closed season
+    (SCHEDULE.format('2023-2024', '2023-2024'), CURRENT_SCHEDULE_TTL),
+    ('https://fbref.com/en/comps/9/Premier-League-Stats', DEFAULT_TTL),
+])
+def test_ttl_for(url, ttl):
+    assert ttl_for(url, TODAY) == ttl
+
+
+def test_season_closes_in_july():
+    url = SCHEDULE.format('2023-2024', '2023-2024')
+    assert ttl_for(url, date(2024, 6, 30)) == CURRENT_SCHEDULE_TTL
+    assert ttl_for(url, date(2024, 7, 1)) is None
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'time', clock)
+    return clock
+
+
+def page(seed, size=4000):
+    # Random text barely compresses, so every page takes about the same room on disk
+    rng = random.Random(seed)
+    return ''.join(rng.choice(string.ascii_letters) for _ in range(size))
+
+
+def blob_count(root):
+    return sum(len(files) for _, _, files in os.walk(os.path.join(root, 'objects')))
+
+
+def test_evict_drops_least_recently_used_pages(tmp_path, clock):
+    size = len(zlib.compress(page(0).encode(), 6))
+    store = ResponseCache(str(tmp_path), max_bytes=int(size * 3.5))
+    urls = [f'https://fbref.com/en/comps/9/p{i}' for i in range(4)]
+    for i, url in enumerate(urls[:3]):
+        store.put(url, page(i))
+    # Reading the oldest page makes the second one the least recently used
+    assert store.get(urls[0]) == page(0)
+
+    store.put(urls[3], page(3))
+
+    assert store.get(urls[1]) is None
+    assert [store.get(url) for url in (urls[0], urls[2], urls[3])] == [page(0), page(2), page(3)]
+    assert store.stats()['entries'] == 3
+    assert store.stats()['bytes'] <= store.max_bytes * 0.9
+    assert blob_count(tmp_path) == 3
+
+
+def test_release_keeps_blobs_other_urls_share(tmp_path, clock):
+    store = ResponseCache(str(tmp_path))
+    first, second = 'https://fbref.com/en/comps/9/a', 'https://fbref.com/en/comps/9/b'
+    store.put(first, page(0))
+    store.put(second, page(0))
+    assert blob_count(tmp_path) == 1
+
+    store.invalidate(first)
+    assert store.get(second) == page(0)
+    assert blob_count(tmp_path) == 1
+
+    # A changed page replaces the blob it no longer shares
+    store.put(second, page(1))
+    assert store.get(second) == page(1)
+    assert blob_count(tmp_path) == 1
+    store.invalidate(second)
+    assert blob_count(tmp_path) == 0
+    assert store.stats() == {'hits': 2, 'misses': 0, 'entries': 0, 'bytes': 0}
+
+
+def test_get_treats_an_expired_page_as_missing(tmp_path, clock):
+    store = ResponseCache(str(tmp_path))
+    url = 'https://fbref.com/en/comps/9/Premier-League-Stats'
+    store.put(url, page(0))
+    assert store.is_fresh(url)
+
+    clock.now += DEFAULT_TTL
+    assert not store.is_fresh(url)
+    assert store.get(url) is None
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from fbref.fetcher import AsyncFetcher, FetchResult
+
+URLS = [f'https://fbref.com/en/matches/m{i}/' for i in range(10)]
+
+
+def test_fetch_all_keeps_url_order_and_errors():
+    def fetch(url):
+        if url == URLS[3]:
+            raise ValueError('broken page')
+        return url.upper()
+
+    results = AsyncFetcher(fetch, concurrency=3).fetch_all(URLS)
+
+    assert [result.url for result in results] == URLS
+    assert results[0].text == URLS[0].upper()
+    assert isinstance(results[3].error, ValueError) and results[3].text is None
+
+
+def test_iter_fetch_raises_when_the_loop_dies(monkeypatch):
+    async def run(self, urls, emit, stop):
+        for url in urls[:2]:
+            emit(FetchResult(url, url, None))
+        raise MemoryError
+
+    monkeypatch.setattr(AsyncFetcher, '_run', run)
+    results = []
+    with pytest.raises(RuntimeError) as raised:
+        for result in AsyncFetcher(lambda url: url).iter_fetch(URLS):
+            results.append(result.url)
+    assert isinstance(raised.value.__cause__, MemoryError)
+    assert results == URLS[:2]
+
+
+def test_iter_fetch_stops_fetching_when_the_caller_stops():
+    fetched = []
+    lock = threading.Lock()
+
+    def fetch(url):
+        with lock:
+            fetched.append(url)
+        return url
+
+    results = AsyncFetcher(fetch, concurrency=2).iter_fetch(URLS)
+    next(results)
+    results.close()
+
+    # The queue holds at most concurrency pages and each pool thread at most one more
+    assert len(fetched) <= 1 + 2 + 2
@@ -0,0 +1,67 @@
+import glob
+import os
+
+import pandas as pd
+
+from fbref.fbref_analysis import analyze_match_data
+from fbref.fixtures import load_fixtures
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLUMNS = 'Wk,Day,Date,Time,Home,Away,xG,xG.1,Score,season,game_id'
+
+
+def write_fixtures(path, *rows):
+    path.write_text('\n'.join([COLUMNS, *rows]) + '\n', encoding='utf-8')
+    return str(path)
+
+
+def test_load_fixtures_mixes_files_with_and_without_league(tmp_path):
+    # all-csv-fixture.csv names no league, serieA.csv does; their league categories used to differ in dtype
+    unnamed = write_fixtures(tmp_path / 'all-csv-fixture.csv',
+                             '1,Fri,2023-08-18,20:30,Werder Bremen,Bayern Munich,0.6,2.8,0–4,2023-2024,a1')
+    named = write_fixtures(tmp_path / 'serieA.csv',
+                           '1,Sat,2020-09-19,18:00,Fiorentina,Torino,1.9,0.7,1–0,2020-2021,b1',
+                           '1,Sun,2020-09-20,12:30,Parma,Napoli,0.3,1.6,0–2,2020-2021,b2')
+
+    df = load_fixtures([unnamed, named])
+
+    assert isinstance(df['league'].dtype, pd.CategoricalDtype)
+    assert df['league'].isna().tolist() == [True, False, False]
+    assert df['league'].iloc[1:].tolist() == ['Serie-A', 'Serie-A']
+    assert df['Home'].tolist() == ['Werder Bremen', 'Fiorentina', 'Parma']
+    assert df['home_goals'].tolist() == [0, 1, 0]
+
+
+def test_load_fixtures_keeps_each_match_once(tmp_path):
+    # serieA.csv repeats a season with the same numbered game ids, the combined file repeats it without a league
+    season = ['1,Sat,2020-09-19,18:00,Fiorentina,Torino,1.9,0.7,1–0,2020-2021,0',
+              '1,Sun,2020-09-20,12:30,Parma,Napoli,0.3,1.6,0–2,2020-2021,1']
+    named = write_fixtures(tmp_path / 'serieA.csv', *season, *season)
+    unnamed = write_fixtures(tmp_path / 'all-csv-fixture.csv', *season,
+                             '1,Fri,2023-08-18,20:30,Werder Bremen,Bayern Munich,0.6,2.8,0–4,2023-2024,1')
+
+    df = load_fixtures([unnamed, named])
+
+    assert df['Home'].tolist() == ['Werder Bremen', 'Fiorentina', 'Parma']
+    assert df['league'].iloc[1:].tolist() == ['Serie-A', 'Serie-A']
+
+
+def test_load_fixtures_of_the_repository_keeps_each_match_once():
+    # all-csv-fixture.csv repeats the league files with mojibake names ("AtlÃ©tico Madrid") and no league
+    paths = sorted(glob.glob(os.path.join(REPO, '*.csv')))
+
+    df = load_fixtures(paths)
+
+    assert df['league'].notna().all()
+    assert not df.duplicated(['season', 'Home', 'Away']).any()
+    assert len(df) == len(load_fixtures([path for path in paths if 'all-csv' not in path]))
+    assert not df['Home'].astype('string').str.contains('Ã').any()
+
+
+def test_analysis_tables_of_the_repository_have_no_unnamed_league():
+    analysis = analyze_match_data(sorted(glob.glob(os.path.join(REPO, '*.csv'))))
+
+    assert '' not in set(analysis.summary.index.get_level_values('league'))
+    table = analysis.table('2017-2018', 'La-Liga')
+    assert len(table) == 20 and (table['MP'] == 38).all()
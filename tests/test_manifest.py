@@ -0,0 +1,84 @@
+import threading
+from collections import Counter
+
+import pytest
+
+from fbref import manifest as manifest_module
+from fbref.manifest import CrawlManifest
+
+SCHEDULE = 'https://fbref.com/en/comps/9/2023-2024/schedule/2023-2024-Premier-League-Scores-and-Fixtures'
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+def add_season(manifest, count):
+    urls = [f'https://fbref.com/en/matches/m{i:03d}/' for i in range(count)]
+    manifest.add_matches(SCHEDULE, 'Premier-League', '2023-2024', [(url, url[-5:-1]) for url in urls])
+    return urls
+
+
+def test_expired_lease_is_handed_out_again(tmp_path, monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(manifest_module, 'time', clock)
+    path = str(tmp_path / 'manifest.db')
+    first, second = CrawlManifest(path), CrawlManifest(path)
+    urls = add_season(first, 3)
+
+    assert [row['url'] for row in first.lease('dead', 2, ttl=60, max_attempts=3)] == urls[:2]
+    assert [row['url'] for row in second.lease('alive', 10, ttl=60, max_attempts=3)] == urls[2:]
+    second.mark(urls[2], 'written')
+    assert second.lease('alive', 10, ttl=60, max_attempts=3) == []
+    assert second.remaining(max_attempts=3) == 2
+
+    clock.now += 61
+    leased = second.lease('alive', 10, ttl=60, max_attempts=3)
+    assert [row['url'] for row in leased] == urls[:2]
+    assert {second.get(url)['lease_owner'] for url in urls[:2]} == {'alive'}
+
+
+def test_units_out_of_attempts_are_not_leased(tmp_path):
+    manifest = CrawlManifest(str(tmp_path / 'manifest.db'))
+    urls = add_season(manifest, 2)
+    manifest.begin(urls[0])
+    manifest.begin(urls[0])
+
+    assert [row['url'] for row in manifest.lease('w', 10, ttl=0, max_attempts=2)] == urls[1:]
+    assert manifest.remaining(max_attempts=2) == 1
+
+
+@pytest.mark.parametrize('workers', [2, 4])
+def test_workers_never_write_the_same_match(tmp_path, workers):
+    path = str(tmp_path / 'manifest.db')
+    urls = add_season(CrawlManifest(path), 200)
+    written = Counter()
+    lock = threading.Lock()
+
+    def work(owner):
+        # Each worker has its own connection, as separate processes would
+        manifest = CrawlManifest(path)
+        while True:
+            rows = manifest.lease(owner, 5, ttl=600, max_attempts=3)
+            if not rows:
+                break
+            for row in rows:
+                manifest.begin(row['url'])
+                with lock:
+                    written[row['url']] += 1
+                manifest.mark(row['url'], 'written')
+        manifest.close()
+
+    threads = [threading.Thread(target=work, args=(f'worker-{i}',)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(written) == urls
+    assert set(written.values()) == {1}
+    assert CrawlManifest(path).counts() == {'match': {'written': 200}}
@@ -0,0 +1,27 @@
+import os
+import sys
+
+from fbref.parsers import PLAYER_COLUMNS, match_player_rows
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import corpus  # noqa: E402
+
+
+def match_rows(league):
+    fixture = corpus.fixtures(league, '2023-2024', 2)[0]
+    return match_player_rows(corpus.match_page(corpus.match_path(league, *fixture)), fixture[0])
+
+
+def test_keeper_columns_do_not_share_summary_columns():
+    rows = match_rows('Premier-League')
+    keepers = rows[rows['Pos'].isna()]
+
+    assert len(keepers) == 2
+    # Launches and goal kicks land in their own columns, not in the passes and take-ons of the summary table
+    assert keepers[['Cmp', 'Att', 'Cmp%', 'Att.1']].isna().all().all()
+    assert keepers[['Cmp (GK)', 'Att (Launched)', 'Cmp% (GK)', 'Att (Goal Kicks)']].notna().all().all()
+
+
+def test_player_columns_cover_every_league():
+    for league in ('Premier-League', 'Super-Lig'):
+        assert set(match_rows(league).columns) <= set(PLAYER_COLUMNS)
@@ -0,0 +1,152 @@
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from fbref import fetcher, ratecontrol
+from fbref.fetcher import HostRateLimiter, SharedRateLimiter, TokenBucket
+from fbref.ratecontrol import AimdRateController, retry_after_seconds
+from fbref.telemetry import Metrics
+
+URL = 'https://fbref.com/en/matches/3a6836b4/'
+
+
+class FakeTime:
+    """Stands in for the time module: sleeping only moves the clock on"""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def monotonic(self):
+        return self.now
+
+    time = perf_counter = monotonic
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(fetcher, 'time', clock)
+    monkeypatch.setattr(ratecontrol, 'time', clock)
+    return clock
+
+
+def response(status, retry_after=None):
+    result = requests.Response()
+    result.status_code = status
+    result.url = URL
+    result._content = b'<html></html>'
+    if retry_after is not None:
+        result.headers['Retry-After'] = retry_after
+    return result
+
+
+class FakeSession:
+    """Answers GETs from a script of responses and exceptions, the last one repeats"""
+
+    def __init__(self, clock, *script):
+        self.clock = clock
+        self.script = list(script)
+        self.calls = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls.append(self.clock.now)
+        answer = self.script.pop(0) if len(self.script) > 1 else self.script[0]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def controller(**kwargs):
+    return AimdRateController(HostRateLimiter(10), metrics=Metrics(), **kwargs)
+
+
+def test_pause_spaces_queued_requests_after_it(clock):
+    bucket = TokenBucket(10 / 60)
+    bucket.pause(60)
+    assert [bucket.reserve() for _ in range(3)] == [60, 66, 72]
+
+    clock.sleep(60)
+    assert bucket.reserve() == 18
+
+
+def test_shared_limiter_pause_spaces_queued_requests(tmp_path, clock):
+    limiter = SharedRateLimiter(str(tmp_path / 'budget.db'), 10)
+    limiter.pause(URL, 60)
+    assert [limiter.reserve(URL) for _ in range(3)] == [60, 66, 72]
+
+
+def test_success_adds_about_increase_rpm_per_minute(clock):
+    control = controller()
+    for _ in range(10):
+        control.on_success(URL)
+    # Ten requests at about 10/min are a minute of traffic
+    assert 10.9 < control.limiter.rate(URL) < 11
+
+    for _ in range(1000):
+        control.on_success(URL)
+    assert control.limiter.rate(URL) == control.max_rpm
+
+
+def test_throttle_halves_the_rate_once_per_cooldown(clock):
+    control = controller(cooldown=30)
+    assert control.on_throttle(URL, 0) == 10
+    assert control.limiter.rate(URL) == 5
+    # Another in-flight request failing right after counts as the same event
+    assert control.on_throttle(URL, 1) == 20
+    assert control.limiter.rate(URL) == 5
+
+    clock.sleep(31)
+    control.on_throttle(URL, 0)
+    assert control.limiter.rate(URL) == 2.5
+    clock.sleep(31)
+    control.on_throttle(URL, 0)
+    assert control.limiter.rate(URL) == control.min_rpm
+
+
+def test_retry_after_seconds(clock):
+    assert retry_after_seconds(response(429, '7')) == 7
+    assert retry_after_seconds(response(429, formatdate(clock.now + 30, usegmt=True))) == 30
+    assert retry_after_seconds(response(429, 'soon')) is None
+    assert retry_after_seconds(response(429)) is None
+
+
+def test_get_waits_out_retry_after(clock):
+    session = FakeSession(clock, response(429, '45'), response(200))
+    control = controller()
+
+    assert control.get(session, URL).status_code == 200
+    # The pause, then the token spacing of the halved rate
+    assert session.calls[1] - session.calls[0] == 45 + 60 / 5
+    assert control.limiter.rate(URL) == 5 + 1 / 5
+
+
+def test_get_backs_off_exponentially_without_retry_after(clock):
+    session = FakeSession(clock, response(503), response(502), response(200))
+    control = controller()
+
+    assert control.get(session, URL).status_code == 200
+    # Backoffs of 10 and 20 seconds, each followed by the token spacing of the halved rate
+    assert [b - a for a, b in zip(session.calls, session.calls[1:])] == [10 + 12, 20 + 12]
+
+
+def test_get_gives_up_after_max_retries(clock):
+    session = FakeSession(clock, response(503))
+    with pytest.raises(requests.HTTPError):
+        controller(max_retries=2).get(session, URL)
+    assert len(session.calls) == 3
+
+    session = FakeSession(clock, requests.ConnectionError())
+    with pytest.raises(requests.ConnectionError):
+        controller(max_retries=2).get(session, URL)
+    assert len(session.calls) == 3
+
+
+def test_get_does_not_retry_a_missing_page(clock):
+    session = FakeSession(clock, response(404))
+    with pytest.raises(requests.HTTPError):
+        controller().get(session, URL)
+    assert len(session.calls) == 1
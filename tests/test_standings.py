@@ -0,0 +1,58 @@
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from fbref.standings import Standings
+
+COLUMNS = ['Date', 'Home', 'Away', 'xG', 'xG.1', 'Score', 'game_id']
+
+
+def fixtures(*rows):
+    return pd.DataFrame(list(rows), columns=COLUMNS)
+
+
+SEASON = [
+    ('2023-08-11', 'Burnley', 'Manchester City', 0.3, 2.2, '0–3', 'a1'),
+    ('2023-08-12', 'Arsenal', 'Nott\'ham Forest', 0.8, 1.2, '2–1', 'a2'),
+    ('2023-08-19', 'Manchester City', 'Newcastle Utd', 1.5, 0.2, '1–0', 'a3'),
+    ('2023-08-21', 'Crystal Palace', 'Arsenal', 0.6, 1.4, '0–1', 'a4'),
+    ('2023-08-26', 'Arsenal', 'Fulham', None, None, None, 'a5'),
+]
+
+
+def fresh_table(tmp_path, rows):
+    standings = Standings(str(tmp_path / 'fresh.standings.json'))
+    standings.update(fixtures(*rows))
+    return standings.table()
+
+
+def test_update_counts_only_new_or_changed_matches(tmp_path):
+    path = str(tmp_path / 'season.csv.standings.json')
+    standings = Standings(path)
+    assert standings.update(fixtures(*SEASON)) == 4
+    assert standings.update(fixtures(*SEASON)) == 0
+    standings.save()
+
+    # fbref corrects the second match to a draw
+    corrected = list(SEASON)
+    corrected[1] = corrected[1][:5] + ('2–2',) + corrected[1][6:]
+    standings = Standings(path)
+    assert standings.update(fixtures(*corrected)) == 1
+
+    table = standings.table()
+    assert table.loc['Arsenal', ['MP', 'W', 'D', 'L', 'GF', 'GA', 'Pts']].tolist() == [2, 1, 1, 0, 3, 2, 4]
+    assert table.loc['Nott\'ham Forest', ['MP', 'D', 'L', 'GA', 'Pts']].tolist() == [1, 1, 0, 2, 1]
+    # The corrected match keeps its place in the form
+    assert table.loc['Arsenal', 'form'] == 'DW'
+    assert table.index[0] == 'Manchester City'
+    assert_frame_equal(table, fresh_table(tmp_path, corrected))
+
+
+def test_form_keeps_the_latest_matches_in_date_order(tmp_path):
+    standings = Standings(str(tmp_path / 'form.standings.json'), form_length=2)
+    # Rows added out of date order, as after a postponed match is played
+    standings.update(fixtures(SEASON[3], SEASON[1]))
+    standings.update(fixtures(('2023-08-02', 'Arsenal', 'Monaco', 1.0, 1.0, '1–1', 'x1')))
+    assert standings.form('Arsenal') == 'WW'
+    standings.update(fixtures(('2023-09-03', 'Arsenal', 'Manchester Utd', 2.1, 0.9, '3–1', 'a6')))
+    assert standings.form('Arsenal') == 'WW'
+    assert standings.teams['Arsenal']['form'] == ['a4', 'a6']
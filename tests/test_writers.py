@@ -0,0 +1,86 @@
+import pandas as pd
+
+from fbref.writers import PlayerDataWriter
+
+COLUMNS = ['Player', 'Min', 'game_id']
+
+
+def rows(match_id, *players):
+    return pd.DataFrame([[player, 90, match_id] for player in players], columns=COLUMNS)
+
+
+def read_index(writer):
+    with open(writer.index_path, encoding='utf-8') as f:
+        return [line.rstrip('\n').split('\t') for line in f]
+
+
+def test_recover_cuts_a_torn_match_back_to_the_last_commit(tmp_path):
+    path = str(tmp_path / 'players.csv')
+    writer = PlayerDataWriter(path, columns=COLUMNS)
+    writer.write_match('m1', rows('m1', 'Saka', 'Rice'))
+    after_m1 = writer._offset
+    writer.write_match('m2', rows('m2', 'Kane'))
+    committed = (tmp_path / 'players.csv').read_bytes()
+
+    # A crash halfway through the third match: part of a row, and a torn index line
+    with open(path, 'ab') as f:
+        f.write(b'Salah,9')
+    with open(writer.index_path, 'a', encoding='utf-8') as f:
+        f.write('m3\t99')
+
+    recovered = PlayerDataWriter(path)
+
+    assert recovered.completed == {'m1', 'm2'}
+    assert recovered.columns == COLUMNS
+    assert (tmp_path / 'players.csv').read_bytes() == committed
+    assert read_index(recovered) == [['m1', str(after_m1)], ['m2', str(len(committed))]]
+
+    recovered.write_match('m3', rows('m3', 'Salah'))
+    df = pd.read_csv(path)
+    assert df['Player'].tolist() == ['Saka', 'Rice', 'Kane', 'Salah']
+    assert read_index(recovered)[-1] == ['m3', str(len((tmp_path / 'players.csv').read_bytes()))]
+
+
+def test_recover_drops_the_index_of_a_deleted_csv(tmp_path):
+    path = str(tmp_path / 'players.csv')
+    PlayerDataWriter(path, columns=COLUMNS).write_match('m1', rows('m1', 'Saka'))
+    (tmp_path / 'players.csv').unlink()
+
+    writer = PlayerDataWriter(path, columns=COLUMNS)
+
+    assert writer.completed == set()
+    assert not (tmp_path / 'players.csv.done').exists()
+
+
+def test_discard_rebuilds_the_file_without_the_dropped_matches(tmp_path):
+    path = str(tmp_path / 'players.csv')
+    writer = PlayerDataWriter(path, columns=COLUMNS)
+    writer.write_match('m1', rows('m1', 'Saka', 'Rice'))
+    writer.write_match('m2', rows('m2', 'Kane'))
+    writer.write_match('m3', rows('m3', 'Salah'))
+
+    writer.discard({'m2', 'unknown'})
+
+    assert writer.completed == {'m1', 'm3'}
+    assert pd.read_csv(path)['game_id'].tolist() == ['m1', 'm1', 'm3']
+    index = read_index(writer)
+    assert [match_id for match_id, _ in index] == ['m1', 'm3']
+    assert int(index[-1][1]) == len((tmp_path / 'players.csv').read_bytes()) == writer._offset
+
+    # The discarded match is written again, after the ones that stayed
+    writer.write_match('m2', rows('m2', 'Kane'))
+    assert pd.read_csv(path)['game_id'].tolist() == ['m1', 'm1', 'm3', 'm2']
+    assert PlayerDataWriter(path).completed == {'m1', 'm2', 'm3'}
+
+
+def test_discard_of_every_match_leaves_an_empty_file(tmp_path):
+    path = str(tmp_path / 'players.csv')
+    writer = PlayerDataWriter(path, columns=COLUMNS)
+    writer.write_match('m1', rows('m1', 'Saka'))
+
+    writer.discard({'m1'})
+
+    assert writer.completed == set()
+    assert (tmp_path / 'players.csv').read_bytes() == b''
+    writer.write_match('m1', rows('m1', 'Saka'))
+    assert pd.read_csv(path)['Player'].tolist() == ['Saka']